@@ -0,0 +1,68 @@
+import json
+from urllib.parse import parse_qs
+from gdb import sessions, current_session
+from gdb.sessions import DEFAULT_SESSION
+
+PREFIX = "/sessions/"
+HEADER = b"x-gdb-session"
+
+
+def _session_of(scope) -> tuple:
+    """(session ID, path for the routers) of a request"""
+    path = scope["path"]
+    if path.startswith(PREFIX):
+        session_id, sep, rest = path[len(PREFIX):].partition("/")
+        if sep and rest:
+            return session_id, "/" + rest
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if query.get("session"):
+        return query["session"][0], path
+    for name, value in scope.get("headers", []):
+        if name == HEADER:
+            return value.decode("latin-1"), path
+    return DEFAULT_SESSION, path
+
+
+class SessionMiddleware:
+    """
+    Makes the session of every request current for the routers (gdb,
+    get_db_manager...). The session comes from the path prefix
+    (/sessions/<id>/memory/read -> /memory/read), a ?session=<id> query
+    (what WebSockets use) or an X-GDB-Session header; default otherwise.
+    Only the default session exists without POST /sessions: other unknown
+    IDs get a 404 (WebSockets: closed with 1008).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        session_id, path = _session_of(scope)
+        session = sessions.get(session_id)
+        if session is None:
+            await _reject(scope, send, f"No session {session_id}")
+            return
+
+        session.touch()
+        if path != scope["path"]:
+            scope = dict(scope, path=path, raw_path=path.encode())
+        token = current_session.set(session)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_session.reset(token)
+            session.touch()
+
+
+async def _reject(scope, send, error: str):
+    if scope["type"] == "websocket":
+        await send({"type": "websocket.close", "code": 1008, "reason": error[:120]})
+        return
+    body = json.dumps({"error": error}).encode()
+    await send({"type": "http.response.start", "status": 404,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
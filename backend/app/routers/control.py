@@ -1,10 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Body
 from gdb import gdb
+from gdb.stepping import MAX_STEPS
 
 router = APIRouter()
 
 async def broadcast_log(msg: str):
-    await gdb.msg_queue.put({"type": "system_log", "payload": msg})
+    gdb.logs.info("api", msg)
 
 @router.post("/control/run")
 async def run_program():
@@ -14,12 +15,77 @@ async def run_program():
 
 @router.post("/control/step_into")
 async def step_into():
+    if gdb.stepping.active:
+        return {"error": "Already stepping"}
     await broadcast_log("CMD: Step Into")
     await gdb.send_command("-exec-step-instruction")
     return {"status": "stepping"}
 
 @router.post("/control/step_over")
 async def step_over():
+    if gdb.stepping.active:
+        return {"error": "Already stepping"}
     await broadcast_log("CMD: Step Over")
     await gdb.send_command("-exec-next-instruction")
     return {"status": "stepping"}
+
+def step_options(payload: dict) -> dict:
+    """
+    Stop conditions of a stepping run (shared with /trace/start):
+      {count: N}                       step N instructions
+      {until: "$rax == 0"}             step until a GDB expression holds
+      {leave: {start, end}}            step until the PC leaves [start, end)
+    Options: over (step over calls), maxSteps. Raises ValueError.
+    """
+    count = payload.get("count")
+    leave = payload.get("leave")
+    try:
+        if count is not None:
+            count = int(count)
+            if count <= 0:
+                raise ValueError("count must be positive")
+        if leave is not None:
+            leave = (int(leave["start"], 16), int(leave["end"], 16))
+        max_steps = int(payload.get("maxSteps", MAX_STEPS))
+        if max_steps <= 0:
+            raise ValueError("maxSteps must be positive")
+        max_steps = min(max_steps, MAX_STEPS)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid parameters: {e}")
+
+    return {
+        "count": count,
+        "over": bool(payload.get("over")),
+        "until": payload.get("until") or None,
+        "leave": leave,
+        "max_steps": max_steps,
+    }
+
+@router.post("/control/step_many")
+async def step_many(payload: dict = Body(...)):
+    """
+    Server-side stepping, one request for the whole run (see step_options).
+    Progress streams as step_progress, the end as one step_result message.
+    """
+    try:
+        options = step_options(payload)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    if not gdb.process:
+        return {"error": "GDB not running"}
+
+    try:
+        gdb.stepping.start(**options)
+    except Exception as e:
+        return {"error": str(e)}
+
+    await broadcast_log(f"CMD: Step many (count={options['count']}, until={options['until']}, leave={payload.get('leave')})")
+    return {"status": "stepping"}
+
+@router.post("/control/step_cancel")
+async def step_cancel():
+    if await gdb.stepping.cancel():
+        await broadcast_log("CMD: Cancel stepping")
+        return {"status": "cancelling"}
+    return {"error": "Not stepping"}
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Body
+from gdb import gdb
+from gdb.log_buffer import LEVELS, parse_levels
+
+router = APIRouter()
+
+@router.get("/logs")
+async def get_logs(after: int = None, before: int = None, limit: int = 200,
+                   component: str = None, level: str = "debug"):
+    """
+    One page of the server-side log buffer, oldest first.
+    `after` follows the tail (entries newer than that seq), `before` scrolls
+    back; with neither, the newest `limit` entries.
+    """
+    if level.lower() not in LEVELS:
+        return {"error": f"Unknown log level: {level}"}
+    limit = max(1, min(limit, 5000))
+    return gdb.logs.page(after, before, limit, component, LEVELS[level.lower()])
+
+@router.get("/logs/stats")
+async def get_log_stats():
+    return gdb.logs.stats()
+
+@router.post("/logs/levels")
+async def set_log_levels(payload: dict = Body(...)):
+    """{"levels": "rx=debug,tx=debug"} or {"levels": {"rx": "debug"}}"""
+    levels = payload.get("levels") or {}
+    try:
+        if isinstance(levels, dict):
+            levels = ",".join(f"{k}={v}" for k, v in levels.items())
+        gdb.logs.set_levels(parse_levels(levels))
+    except ValueError as e:
+        return {"error": str(e)}
+    return gdb.logs.stats()
@@ -1,40 +1,315 @@
+import os
+import re
+import time
+import asyncio
 from fastapi import APIRouter, Body
+from fastapi.responses import StreamingResponse
 from gdb import gdb
+from gdb.maps import find_mapping
+from gdb.search import compile_pattern, SKIPPED_KINDS, MAX_RESULTS
 from app.state import get_db_manager
-from app.utils.formatting import bytes_to_hex_str, int_to_hex_addr
+from app.utils.formatting import bytes_to_hex_str
+from app.utils.patches import apply_saved_patches
+from app.routers.websocket import MAX_WS_READ
 
 router = APIRouter()
 
+MAX_DISASSEMBLE = 1000   # instructions of one /memory/disassemble, each side
+
 async def broadcast_log(msg: str):
-    await gdb.msg_queue.put({"type": "system_log", "payload": msg})
+    gdb.logs.info("api", msg)
 
 @router.post("/memory/disassemble")
 async def get_disassembly(payload: dict = Body(...)):
+    """
+    Returns exactly `count` instructions from `start` (mostly served from cache),
+    preceded by the `before` instructions that end at `start`.
+    Both neighbouring pages are prefetched afterwards.
+    """
     start = payload.get("start")
     count = payload.get("count", 100)
+    before = payload.get("before", 0)
     
     if not start:
         return {"error": "Missing start address"}
 
     try:
         start_int = int(start, 16)
-        end_int = start_int + (count * 8) 
-        end_hex = hex(end_int)
-        
-        cmd = f"-data-disassemble -s {start} -e {end_hex} -- 2"
-        await gdb.send_command(cmd)
-        return {"status": "requested", "cmd": cmd}
+    except ValueError:
+        return {"error": "Invalid address format"}
+
+    for value in (count, before):
+        if type(value) is not int or not 0 <= value <= MAX_DISASSEMBLE:
+            return {"error": f"count and before must be integers from 0 to {MAX_DISASSEMBLE}"}
+
+    previous = await gdb.disassembly.get_before(start_int, before)
+    instructions = await gdb.disassembly.get(start_int, count)
+
+    if payload.get("prefetch", True):
+        view = previous + instructions
+        if view:
+            last = view[-1]
+            end = int(last['address'], 16) + len(last.get('opcodes', '').split())
+            gdb.disassembly.prefetch(int(view[0]['address'], 16), end)
+
+    return {
+        "status": "ok",
+        "start": start,
+        # instructions[anchor] is the one at `start`
+        "anchor": len(previous),
+        "instructions": previous + instructions
+    }
+
+@router.post("/memory/read")
+async def read_memory(payload: dict = Body(...)):
+    """Reads inferior memory (served from the stop-epoch page cache when possible)."""
+    address = payload.get("address") # hex string "0x4000"
+    length = payload.get("length", 256)
+
+    if not address or not isinstance(length, int) or length <= 0:
+        return {"error": "Invalid parameters"}
+    if length > MAX_WS_READ:
+        # The reply is a JSON list of ints: bigger ranges go through the streaming dump
+        return {"error": f"length above {MAX_WS_READ} bytes, use /memory/dump"}
+
+    data = await gdb.read_memory(address, length)
+    if data is None:
+        return {"error": f"Failed to read memory at {address}"}
+
+    return {"address": address, "bytes": list(data), "epoch": gdb.memory_cache.epoch}
+
+MAX_DUMP = 4 << 30   # 4 GB
+DUMP_DIR = "database/dumps"
+
+async def _dump_range(address: str = None, length: int = None, mapping: str = None):
+    """(start, length, error) of a dump request: an address + length, or a whole mapping"""
+    if not gdb.process:
+        return None, None, "GDB not running"
+    if mapping:
+        if not await gdb.regions.refresh():
+            return None, None, "Memory mappings unavailable"
+        region = find_mapping(gdb.regions.regions, mapping)
+        if not region:
+            return None, None, f"No mapping matches {mapping}"
+        return region["start"], region["end"] - region["start"], None
+    try:
+        start = int(address, 16)
+        length = int(length)
+    except (TypeError, ValueError):
+        return None, None, "Invalid parameters"
+    if not 0 < length <= MAX_DUMP:
+        return None, None, "Invalid length"
+    return start, length, None
+
+@router.get("/memory/dump")
+async def dump_memory(address: str = None, length: int = None, mapping: str = None):
+    """
+    Streams raw memory to the client: ?address=0x...&length=N, or
+    ?mapping=[heap] / a path / any address inside a mapping.
+    Unreadable parts are zero-filled (X-Dump-Address / X-Dump-Length tell
+    where it starts and how long it is). Sent chunked, without Content-Length:
+    a dump that fails halfway ends without the final chunk, so the client
+    sees a broken transfer rather than a short file.
+    """
+    start, length, error = await _dump_range(address, length, mapping)
+    if error:
+        return {"error": error}
+
+    async def body():
+        try:
+            async for _, size, data in gdb.iter_memory(start, length):
+                yield data if data is not None else bytes(size)
+        except Exception as e:
+            # Headers are gone: the only way to tell is aborting the transfer
+            await broadcast_log(f"Dump at 0x{start:x} aborted: {e}")
+            raise
+
+    await broadcast_log(f"REQ: Dump {length} bytes at 0x{start:x}")
+    return StreamingResponse(body(), media_type="application/octet-stream", headers={
+        "X-Dump-Length": str(length),
+        "Content-Disposition": f'attachment; filename="mem_{start:x}_{length:x}.bin"',
+        "X-Dump-Address": hex(start),
+    })
+
+@router.post("/memory/dump")
+async def dump_memory_to_file(payload: dict = Body(...)):
+    """
+    Same as GET /memory/dump, written to database/dumps/<file> on the server.
+    Returns where it went and which ranges could not be read (zero-filled).
+    File I/O runs in worker threads; a dump that fails halfway is deleted.
+    """
+    start, length, error = await _dump_range(payload.get("address"), payload.get("length"), payload.get("mapping"))
+    if error:
+        return {"error": error}
+    name = re.sub(r"[^\w.\-]", "_", os.path.basename(payload.get("file") or f"mem_{start:x}_{length:x}.bin"))
+    path = os.path.join(DUMP_DIR, name)
+
+    await broadcast_log(f"REQ: Dump {length} bytes at 0x{start:x} -> {path}")
+    started = time.perf_counter()
+    unreadable = []
+    f = None
+    try:
+        await asyncio.to_thread(os.makedirs, DUMP_DIR, exist_ok=True)
+        f = await asyncio.to_thread(open, path, "wb")
+        async for addr, size, data in gdb.iter_memory(start, length):
+            if data is None:
+                if unreadable and unreadable[-1][1] == addr:
+                    unreadable[-1][1] = addr + size
+                else:
+                    unreadable.append([addr, addr + size])
+                data = bytes(size)
+            await asyncio.to_thread(f.write, data)
+        await asyncio.to_thread(f.close)
+    except Exception as e:
+        if f:
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.remove, path)
+        msg = f"Dump to {path} failed: {e}"
+        await broadcast_log(msg)
+        return {"error": msg}
+
+    elapsed = time.perf_counter() - started
+    await broadcast_log(f"Dump written: {path} ({length} bytes, {len(unreadable)} unreadable ranges, {elapsed:.1f}s)")
+    return {
+        "path": path,
+        "address": hex(start),
+        "size": length,
+        "unreadable": [[hex(a), hex(b)] for a, b in unreadable],
+        "elapsedMs": round(elapsed * 1000, 1),
+    }
+
+@router.get("/memory/regions")
+async def memory_regions(refresh: bool = False):
+    """
+    The inferior's mappings as the region map sees them. The map follows stops
+    on its own; ?refresh=1 forces a re-read (e.g. after an mprotect).
+    """
+    if not gdb.process:
+        return {"error": "GDB not running"}
+    if not await gdb.regions.refresh(force=refresh):
+        return {"error": "Memory mappings unavailable"}
+    return {
+        "generation": gdb.regions.generation,
+        "regions": [{**r, "start": hex(r["start"]), "end": hex(r["end"])} for r in gdb.regions.regions],
+    }
+
+@router.post("/memory/classify")
+async def classify_addresses(payload: dict = Body(...)):
+    """
+    Bulk pointer classification for the views: {addresses: ["0x...", ...]} ->
+    kinds (code/image/library/heap/stack/anon/system/unmapped) and region
+    indexes into /memory/regions of the same generation (-1 = unmapped).
+    """
+    if not gdb.process:
+        return {"error": "GDB not running"}
+    try:
+        addresses = [a if isinstance(a, int) else int(a, 16) for a in payload.get("addresses", [])]
+    except (TypeError, ValueError):
+        return {"error": "Invalid addresses"}
+    if not await gdb.regions.refresh():
+        return {"error": "Memory mappings unavailable"}
+    kinds, indexes = gdb.regions.classify(addresses)
+    return {"generation": gdb.regions.generation, "kinds": kinds, "regions": indexes}
+
+def _search_ranges(payload: dict):
+    """
+    [(start, size)] to search: address + length, or the readable mappings,
+    optionally only some `kinds` (heap, stack...) or `mappings` (find_mapping specs)
+    """
+    if payload.get("address") is not None:
+        start = int(payload["address"], 16)
+        length = int(payload.get("length", 0))
+        if not 0 < length <= MAX_DUMP:
+            raise ValueError("Invalid length")
+        return [(start, length)]
+
+    regions = [r for r in gdb.regions.regions if "r" in r["perms"]]
+    if payload.get("writable"):
+        regions = [r for r in regions if "w" in r["perms"]]
+    if payload.get("mappings"):
+        picked = []
+        for spec in payload["mappings"]:
+            region = find_mapping(regions, spec)
+            if not region:
+                raise ValueError(f"No readable mapping matches {spec}")
+            picked.append(region)
+        regions = picked
+    elif payload.get("kinds"):
+        regions = [r for r in regions if r["kind"] in payload["kinds"]]
+    else:
+        regions = [r for r in regions if r["kind"] not in SKIPPED_KINDS]
+    return [(r["start"], r["end"] - r["start"]) for r in regions]
+
+@router.post("/memory/search")
+async def start_search(payload: dict = Body(...)):
+    """
+    Searches inferior memory in the background. Pattern: {kind, value} with
+    kind bytes ("48 8b ?? 24"), ascii, utf16 or int (+ width, bigEndian);
+    ignoreCase for strings, align for hits. Where: see _search_ranges.
+    Matches stream as `search_results` events and end with `search_done`;
+    GET /memory/search pages through them, /memory/search/cancel stops it.
+    """
+    if not gdb.process:
+        return {"error": "GDB not running"}
+    if gdb.inferior_running:
+        return {"error": "Target is running"}
+    try:
+        needle, regex, length = compile_pattern(
+            payload.get("kind", "bytes"), payload.get("value"),
+            width=int(payload.get("width", 4)),
+            big_endian=bool(payload.get("bigEndian")),
+            ignore_case=bool(payload.get("ignoreCase")),
+        )
+        if payload.get("address") is None and not await gdb.regions.refresh():
+            return {"error": "Memory mappings unavailable, give an address and length"}
+        ranges = _search_ranges(payload)
+        search_id = gdb.search.start(ranges, needle, regex, length,
+                                     limit=int(payload.get("limit", MAX_RESULTS)),
+                                     align=max(1, int(payload.get("align", 1))))
+    except (TypeError, ValueError) as e:
+        return {"error": str(e) or "Invalid parameters"}
     except Exception as e:
         return {"error": str(e)}
 
+    await broadcast_log(f"REQ: Search {payload.get('kind', 'bytes')} {payload.get('value')!r} "
+                        f"in {len(ranges)} ranges ({gdb.search.status['total'] / 1e6:.1f} MB)")
+    return {"status": "searching", **gdb.search.status}
+
+@router.post("/memory/search/cancel")
+async def cancel_search():
+    if gdb.search.cancel():
+        return {"status": "cancelling"}
+    return {"error": "Not searching"}
+
+@router.get("/memory/search")
+async def search_results(offset: int = 0, limit: int = 1000):
+    """State of the last search and a page of its matches"""
+    if gdb.search.status is None:
+        return {"error": "No search"}
+    return {
+        **gdb.search.status,
+        "offset": offset,
+        "results": [hex(a) for a in gdb.search.results[offset:offset + limit]],
+    }
+
+@router.get("/memory/cache")
+async def memory_cache_stats():
+    direct = gdb.proc_memory.stats() if gdb.proc_memory else None
+    return {
+        "memory": gdb.memory_cache.stats(),
+        "disassembly": gdb.disassembly.stats(),
+        "backend": "proc" if direct else "mi",
+        "direct": direct,
+        "regions": gdb.regions.stats(),
+    }
+
 @router.post("/memory/write")
 async def write_memory(payload: dict = Body(...)):
     """
-    Byte-level patching logic:
+    Range patching logic:
     1. Read original memory from GDB (chunk).
-    2. Check DB for existing patches to preserve 'original' byte.
-    3. Update DB with new bytes.
-    4. Write bytes to GDB.
+    2. Save the patch range to DB (existing patches preserve their 'original' bytes).
+    3. Write bytes to GDB.
     """
     address_str = payload.get("address") # hex string "0x4000"
     raw_bytes = payload.get("bytes")     # list of ints [144] or strings ["0x90"]
@@ -72,29 +347,20 @@ async def write_memory(payload: dict = Body(...)):
     if not db_manager:
         return {"error": "DB not loaded"}
 
-    # 2. Process byte-by-byte
-    for i, byte_val in enumerate(new_bytes):
-        curr_addr = start_addr + i
-        curr_addr_hex = int_to_hex_addr(curr_addr)
-        
-        # Check if we already have a patch here
-        existing_patch = await db_manager.get_patch_byte(curr_addr_hex)
-        
-        orig_byte = 0
-        
-        if existing_patch:
-            # If patch exists, the 'orig_byte' in DB is the true original.
-            # Do NOT overwrite it with current_mem_bytes[i] (which is the previous patch)
-            orig_byte = existing_patch['orig_byte']
-        else:
-            # If no patch, the current GDB memory IS the original
-            if i < len(current_mem_bytes):
-                orig_byte = current_mem_bytes[i]
-            else:
-                orig_byte = 0 # Should not happen if read succeeded
-        
-        # Save to DB
-        await db_manager.save_patch_byte(curr_addr_hex, orig_byte, byte_val)
+    try:
+        new_data = bytes(new_bytes)
+    except ValueError:
+        return {"error": "Byte values must be in range 0-255"}
+
+    # 2. Save the whole range in one transaction.
+    # Bytes that are already patched keep their true original from the DB;
+    # for the others, the current GDB memory IS the original.
+    try:
+        await db_manager.save_patch(start_addr, new_data, bytes(current_mem_bytes))
+    except Exception as e:
+        msg = f"Failed to save patch at {address_str}: {e}. Aborting patch."
+        await broadcast_log(msg)
+        return {"error": msg}
 
     # 3. Apply to GDB
     success = await gdb.write_memory(address_str, new_bytes)
@@ -105,34 +371,81 @@ async def write_memory(payload: dict = Body(...)):
     else:
         return {"error": "Failed to write to GDB"}
 
+def _parse_ranges(payload: dict) -> list:
+    """{address, length} or {ranges: [{address, length}]} -> sorted, merged [(start, end)]"""
+    items = payload.get("ranges")
+    if items is None:
+        items = [{"address": payload.get("address"), "length": payload.get("length", 1)}]
+
+    ranges = []
+    for item in items:
+        start = int(item["address"], 16)
+        length = int(item.get("length", 1))
+        if length <= 0:
+            raise ValueError("length must be positive")
+        ranges.append((start, start + length))
+
+    # Overlapping requests would revert (and count) the same bytes twice
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
 @router.post("/memory/revert")
 async def revert_memory(payload: dict = Body(...)):
     """
-    Reverts a SINGLE BYTE at specific address.
+    Reverts the patched bytes inside {address, length} (length defaults to 1)
+    or inside every range of {ranges: [{address, length}]}.
+    Original bytes are written back with the minimal set of pipelined MI writes,
+    then the reverted bytes are removed from the DB in one transaction.
     """
-    address = payload.get("address") # hex string "0x..."
-    
     db_manager = get_db_manager()
-    if not address or not db_manager:
+    if not db_manager:
         return {"error": "Invalid params"}
-    
-    # 1. Get patch info
-    patch = await db_manager.get_patch_byte(address)
-    if not patch:
-        await broadcast_log(f"Revert ignore: No patch at {address}")
+
+    try:
+        ranges = _parse_ranges(payload)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return {"error": "Invalid params"}
+
+    # 1. Original bytes of what is actually patched in there
+    pieces = await db_manager.originals_in(ranges)
+    if not pieces:
+        await broadcast_log(f"Revert ignore: No patch in {len(ranges)} range(s)")
         return {"error": "No patch found"}
-    
-    orig_byte = patch['orig_byte']
-    
-    await broadcast_log(f"REQ: Revert {address} to 0x{orig_byte:02x}")
-    
-    # 2. Write original byte to GDB
-    success = await gdb.write_memory(address, [orig_byte])
-    
-    if not success:
+
+    total = sum(len(orig) for _, orig in pieces)
+    await broadcast_log(f"REQ: Revert {total} bytes in {len(pieces)} run(s)")
+
+    # 2. Write them back to GDB
+    written = await gdb.write_memory_many(pieces)
+    if not written:
         return {"error": "Failed to revert memory in GDB"}
 
-    # 3. Delete from DB
-    await db_manager.delete_patch(address)
-    
-    return {"status": "reverted"}
+    # 3. Forget the runs that made it into memory
+    reverted = [(addr, addr + len(data)) for addr, data in written]
+    try:
+        await db_manager.delete_patch_ranges(reverted)
+    except Exception as e:
+        # Memory holds the originals again but the DB still has the patches
+        msg = f"Reverted in memory but failed to update the DB: {e}"
+        await broadcast_log(msg)
+        return {"error": msg}
+
+    done = sum(end - start for start, end in reverted)
+    return {
+        "status": "reverted" if done == total else "partial",
+        "ranges": [{"address": f"0x{s:x}", "length": e - s} for s, e in reverted]
+    }
+
+@router.post("/memory/patches/apply")
+async def apply_patches():
+    """Writes every saved patch of the session into the inferior again."""
+    db_manager = get_db_manager()
+    if not db_manager:
+        return {"error": "DB not loaded"}
+    result = await apply_saved_patches(db_manager)
+    return {"status": "ok", **result}
@@ -1,60 +1,43 @@
 import os
 import stat
-import hashlib
 import asyncio
 from fastapi import APIRouter, Body
-from gdb import gdb
+from gdb import gdb, sessions
 from app.utils.formatting import bytes_to_hex_str
 from app.utils.logging import broadcast_log, broadcast_progress
+from app.utils.patches import apply_saved_patches
 from db_manager import DBManager
+from db_writer import DBWriteError
+from settings_manager import SettingsManager
+from fingerprint import fingerprint
+from target_catalog import TargetCatalog
 from app.state import set_db_manager, get_db_manager, get_last_opened_path, set_last_opened_path
 
 router = APIRouter()
+settings_manager = SettingsManager()
+target_catalog = TargetCatalog("/targets")
 
 
 
 @router.get("/targets/list")
-async def list_targets():
-    """List all files in /targets directory with metadata"""
-    targets_dir = "/targets"
-    if not os.path.exists(targets_dir):
-        return {"files": []}
-    
-    files = []
+async def list_targets(offset: int = 0, limit: int = None, name: str = None,
+                       format: str = None, machine: str = None,
+                       executable: bool = None, stripped: bool = None):
+    """
+    List files in /targets with header metadata (ELF/PE/Mach-O class,
+    endianness, machine, type, stripped). Optional pagination and filters.
+    """
+    if not os.path.isdir(target_catalog.directory):
+        return {"files": [], "total": 0, "offset": 0}
+
     try:
-        for item in os.listdir(targets_dir):
-            item_path = os.path.join(targets_dir, item)
-            if os.path.isfile(item_path):
-                stat_info = os.stat(item_path)
-                
-                # Get file type info using `file` command
-                file_type = ""
-                try:
-                    import subprocess
-                    result = subprocess.run(['file', item_path], capture_output=True, text=True, timeout=2)
-                    if result.returncode == 0:
-                        # Parse output: "path: ELF 64-bit LSB executable, x86-64, ..."
-                        output = result.stdout.strip()
-                        if ':' in output:
-                            file_type = output.split(':', 1)[1].strip()
-                            # Extract just the key parts (e.g., "ELF 64-bit LSB executable, x86-64")
-                            parts = file_type.split(',')
-                            if len(parts) >= 2:
-                                file_type = ', '.join(parts[:2])
-                except Exception:
-                    file_type = ""
-                
-                files.append({
-                    "name": item,
-                    "size": stat_info.st_size,
-                    "executable": os.access(item_path, os.X_OK),
-                    "fileType": file_type
-                })
+        await target_catalog.refresh()
     except Exception as e:
         await broadcast_log(f"Error listing targets: {e}")
         return {"error": str(e), "files": []}
-    
-    return {"files": sorted(files, key=lambda x: x['name'])}
+
+    return target_catalog.query(offset=max(offset, 0), limit=limit, name=name, fmt=format,
+                                machine=machine, executable=executable, stripped=stripped)
 
 @router.post("/session/load")
 async def load_binary(payload: dict = Body(None)):
@@ -107,15 +90,27 @@ async def load_binary(payload: dict = Body(None)):
             await broadcast_log(f"Compilation Error ({type(e).__name__}): {str(e)}")
             return {"error": str(e)}
     
-    try:
-        with open(path, "rb") as f:
-            file_hash = hashlib.md5(f.read()).hexdigest()[:8]
-    except FileNotFoundError:
-        file_hash = "000"
+    # Hashed off the event loop (and only once per file version)
+    target_name = os.path.basename(path)
+    progress_tasks = set()
+    def hash_progress(percent):
+        task = asyncio.create_task(broadcast_progress(f"Hashing {target_name}... {percent}%", 30 + percent // 5))
+        progress_tasks.add(task)
+        task.add_done_callback(progress_tasks.discard)
+    file_hash = await fingerprint(path, settings_manager, on_progress=hash_progress)
+    # Sent before the next step's progress
+    await asyncio.gather(*progress_tasks)
 
     await broadcast_progress("Initializing Database...", 50)
-    target_name = os.path.basename(path)
-    new_db_manager = DBManager(target_name, file_hash)
+    # Previous target's queued writes go to disk before anything else opens it
+    old_db_manager = get_db_manager()
+    if old_db_manager:
+        set_db_manager(None)
+        await asyncio.to_thread(old_db_manager.close)
+    # Failed queued writes (comments) show up in this session's log
+    logs = gdb.logs
+    new_db_manager = DBManager(target_name, file_hash,
+                               on_error=lambda message: logs.error("db", "Write failed: %s", message))
     await new_db_manager.init_db()
     
     set_db_manager(new_db_manager)
@@ -124,26 +119,35 @@ async def load_binary(payload: dict = Body(None)):
     await broadcast_log(f"GDB Started for {path}")
     
     # Restore settings (Disassembly Flavor)
-    settings_manager = get_db_manager().settings_manager if hasattr(get_db_manager(), 'settings_manager') else None
-    # Actually, settings are in global app_settings.db, managed by SettingsManager, not target DB.
-    # We should use SettingsManager().
-    from settings_manager import SettingsManager
-    global_settings = await SettingsManager().get_all_settings()
+    # Settings are in global app_settings.db, managed by SettingsManager, not target DB.
+    global_settings = await settings_manager.get_all_settings()
     flavor = global_settings.get("disassemblyFlavor", "att")
     try:
-        await gdb.send_command(f"-gdb-set disassembly-flavor {flavor}")
+        await gdb.set_disassembly_flavor(flavor)
         await broadcast_log(f"Applied setting: disassembly-flavor={flavor}")
     except Exception as e:
         await broadcast_log(f"Error applying flavor: {e}")
 
     await broadcast_progress("Starting Debugger...", 80)
+
+    # Saved patches live in the DB only: put them back into the fresh inferior,
+    # once it stopped (at main or the entry point), not while it runs there
+    patches_failed = []
+    if await gdb.wait_started():
+        patches_failed = (await apply_saved_patches(new_db_manager))["failed"]
+    else:
+        patches_failed = [{"address": f"0x{start:x}", "length": len(new)}
+                          for start, _, new in await new_db_manager.get_patch_ranges()]
+        if patches_failed:
+            await broadcast_log("Saved patches not applied: the target didn't stop after start")
     
     # Update last opened path on successful load
     set_last_opened_path(path)
     
-    comments = await new_db_manager.get_comments()
-    patches = await new_db_manager.get_patches()
-    await broadcast_log(f"DB Loaded: {len(comments)} comments, {len(patches)} patched bytes")
+    # Annotations are not shipped here: the views fetch what they show via /session/annotations
+    comment_count = await new_db_manager.count_comments()
+    patched_count = await new_db_manager.count_patched_bytes()
+    await broadcast_log(f"DB Loaded: {comment_count} comments, {patched_count} patched bytes")
     
     await broadcast_progress("Ready", 100, show=False)
     
@@ -154,11 +158,18 @@ async def load_binary(payload: dict = Body(None)):
         "status": "ok", 
         "message": f"Loaded {path}",
         "path": path,
-        "comments": comments,
-        "patches": patches,
-        "metadata": metadata
+        "commentCount": comment_count,
+        "patchedCount": patched_count,
+        "patchesFailed": patches_failed,
+        "metadata": metadata,
+        "startup": gdb.startup
     }
 
+@router.get("/session/startup")
+async def startup_metrics():
+    """Timings of the last GDB start (acquire, load, time to first stop) and pool state"""
+    return {"startup": gdb.startup, "pool": gdb.pool.stats()}
+
 @router.post("/database/reset")
 async def reset_database():
     mgr = get_db_manager()
@@ -169,9 +180,37 @@ async def reset_database():
         return {"status": "ok"}
     return {"error": "No DB loaded"}
 
+@router.post("/database/flush")
+async def flush_database():
+    """Waits until every queued comment / patch write is committed"""
+    mgr = get_db_manager()
+    if not mgr:
+        return {"error": "No DB loaded"}
+    try:
+        await mgr.flush()
+    except DBWriteError as e:
+        return {"error": str(e), **mgr.stats()}
+    return {"status": "ok", **mgr.stats()}
+
+@router.get("/database/stats")
+async def database_stats():
+    """Write journal counters: queued writes, batches committed, coalesced writes"""
+    mgr = get_db_manager()
+    if not mgr:
+        return {"error": "No DB loaded"}
+    return mgr.stats()
+
 @router.post("/database/reset_all")
 async def reset_all_databases():
     """Deletes all session databases in /database folder, keeping app_settings.db"""
+    current = sessions.current()
+    busy = [s.id for s in sessions.sessions.values() if s.db_manager and s is not current]
+    if busy:
+        return {"error": f"Targets loaded in other sessions: {', '.join(busy)}"}
+    if current.db_manager:
+        # Its files are about to go: close the writer and reader connections first
+        await asyncio.to_thread(current.db_manager.close)
+        current.db_manager = None
     try:
         if os.path.exists("database"):
             count = 0
@@ -179,6 +218,8 @@ async def reset_all_databases():
                 if f.endswith(".db") and f != "app_settings.db":
                     os.remove(os.path.join("database", f))
                     count += 1
+                elif f.endswith((".db-wal", ".db-shm")) and not f.startswith("app_settings.db"):
+                    os.remove(os.path.join("database", f)) # WAL leftovers of a target DB
             await broadcast_log(f"Cleared {count} target databases.")
             return {"status": "ok", "deleted_count": count}
         return {"status": "ok", "deleted_count": 0}
@@ -192,14 +233,68 @@ async def save_comment(payload: dict = Body(...)):
     comment = payload.get("comment")
     mgr = get_db_manager()
     if mgr and address:
-        await mgr.save_comment(address, comment)
+        try:
+            await mgr.save_comment(address, comment)
+        except ValueError:
+            return {"error": "Invalid address format"}
         await broadcast_log(f"Comment saved for {address}: {comment}")
+
+@router.get("/session/annotations")
+async def get_annotations(start: str, end: str):
+    """Comments and patched addresses with start <= address < end (the visible viewport)"""
+    mgr = get_db_manager()
+    if not mgr:
+        return {"error": "No DB loaded"}
+    try:
+        start_int, end_int = int(start, 16), int(end, 16)
+    except ValueError:
+        return {"error": "Invalid address format"}
+
+    comments = await mgr.comments_in(start_int, end_int)
+    patches = []
+    for r_start, _, r_new in await mgr.patches_in(start_int, end_int):
+        lo = max(start_int, r_start)
+        hi = min(end_int, r_start + len(r_new))
+        patches.extend(f"0x{addr:x}" for addr in range(lo, hi))
+
+    return {"start": start, "end": end, "comments": comments, "patches": patches}
+
 @router.post("/session/stop")
 async def stop_session():
     """Stops the current debug session and unloads the target"""
     await gdb.stop()
+    mgr = get_db_manager()
+    if mgr:
+        await asyncio.to_thread(mgr.close) # Commits queued writes
     set_db_manager(None) # Unload DB manager
     set_last_opened_path(None) # Clear last opened path so it doesn't auto-load
     await broadcast_log("Session closed. Target unloaded.")
     return {"status": "ok"}
 
+@router.get("/sessions")
+async def list_sessions():
+    """Every debugging session of this server, with the registry limits"""
+    return {
+        **sessions.stats(),
+        "current": sessions.current().id,
+        "list": [s.info() for s in sessions.sessions.values()],
+    }
+
+@router.post("/sessions")
+async def create_session(payload: dict = Body(None)):
+    """
+    New empty session, {id} or a random ID: use it as /sessions/<id>/...
+    or ?session=<id>. Only existing sessions are accepted there.
+    """
+    try:
+        session = sessions.create((payload or {}).get("id"))
+    except Exception as e:
+        return {"error": str(e)}
+    return session.info()
+
+@router.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    """Stops the session's GDB, closes its DB and drops it (its WebSockets are closed)"""
+    if not await sessions.close(session_id):
+        return {"error": f"No session {session_id}"}
+    return {"status": "ok"}
@@ -26,7 +26,7 @@ async def save_setting_endpoint(payload: dict = Body(...)):
                 # We can't use -gdb-set directly via pygdbmi nicely for everything, 
                 # but we can run CLI command via interpreter-exec or -gdb-set
                 # pygdbmi write returns a future.
-                await gdb.send_command(f"-gdb-set disassembly-flavor {flavor}")
+                await gdb.set_disassembly_flavor(flavor)
             except Exception as e:
                 print(f"Failed to set disassembly flavor: {e}")
 
@@ -0,0 +1,164 @@
+import os
+import asyncio
+from fastapi import APIRouter, Body
+from gdb import gdb, sessions
+from gdb.sessions import DEFAULT_SESSION
+from gdb.trace import TraceStore, TraceRecorder, DEFAULT_REGISTERS_64, DEFAULT_REGISTERS_32
+from app.state import get_db_manager
+from app.routers.control import step_options
+
+router = APIRouter()
+
+async def broadcast_log(msg: str):
+    gdb.logs.info("api", msg)
+
+# Trace of the current session, lives next to its DB: database/<target>_<hash>.trace,
+# <target>_<hash>.<session>.trace outside the default session (same target, own trace)
+# Indexing tasks waiting for their recording to end (the loop only keeps weak references)
+index_tasks = set()
+
+def get_trace_store():
+    mgr = get_db_manager()
+    if not mgr:
+        return None
+    session = sessions.current()
+    suffix = ".trace" if session.id == DEFAULT_SESSION else f".{session.id}.trace"
+    path = os.path.splitext(mgr.db_path)[0] + suffix
+    if session.trace_store is None or session.trace_store.path != path:
+        if session.trace_store:
+            session.trace_store.close()
+        session.trace_store = TraceStore(path)
+    return session.trace_store
+
+async def ensure_indexes(store: TraceStore):
+    async with sessions.current().trace_lock:
+        if not store.indexed():
+            await asyncio.to_thread(store.build_indexes)
+
+async def _index_when_done(task, store: TraceStore):
+    await asyncio.wait([task])
+    try:
+        await ensure_indexes(store)
+        await broadcast_log(f"Trace indexed: {store.count} records")
+    except Exception as e:
+        await broadcast_log(f"Trace indexing failed: {e}")
+
+def _not_queryable(store: TraceStore):
+    """Error message if the indexes can't be used now, else None"""
+    if not store:
+        return "DB not loaded"
+    if store.recording or (gdb.stepping.active and gdb.stepping.recorder):
+        return "Trace is still recording"
+    if store.record is None:
+        return "No trace recorded"
+    return None
+
+@router.post("/trace/start")
+async def start_trace(payload: dict = Body(...)):
+    """
+    Records a trace while stepping: PC, memory write and selected registers
+    for every step. Takes the stepping conditions of /control/step_many;
+    without any, it records until /trace/stop (or maxSteps).
+    Optional `registers`: names to record (default: general purpose + eflags).
+    """
+    store = get_trace_store()
+    if not store:
+        return {"error": "DB not loaded"}
+    if not gdb.process:
+        return {"error": "GDB not running"}
+
+    try:
+        options = step_options(payload)
+    except ValueError as e:
+        return {"error": str(e)}
+    if options["count"] is None and options["until"] is None and options["leave"] is None:
+        options["count"] = options["max_steps"]
+
+    registers = payload.get("registers")
+    if not registers:
+        registers = DEFAULT_REGISTERS_64 if "rip" in gdb.register_names else DEFAULT_REGISTERS_32
+
+    recorder = TraceRecorder(gdb, store, registers)
+    try:
+        gdb.stepping.start(recorder=recorder, **options)
+    except Exception as e:
+        return {"error": str(e)}
+
+    task = asyncio.create_task(_index_when_done(gdb.stepping.task, store))
+    index_tasks.add(task)
+    task.add_done_callback(index_tasks.discard)
+    await broadcast_log(f"CMD: Trace start ({', '.join(registers)})")
+    return {"status": "recording", "path": store.path, "registers": registers}
+
+@router.post("/trace/stop")
+async def stop_trace():
+    if await gdb.stepping.cancel():
+        return {"status": "stopping"}
+    return {"error": "Not recording"}
+
+@router.get("/trace/info")
+async def trace_info():
+    store = get_trace_store()
+    if not store:
+        return {"error": "DB not loaded"}
+    return {
+        "path": store.path,
+        "records": store.count,
+        "registers": store.registers,
+        "recording": store.recording,
+        "indexed": store.indexed(),
+    }
+
+@router.get("/trace/step/{step}")
+async def trace_step(step: int):
+    store = get_trace_store()
+    record = store.get(step) if store else None
+    if record is None:
+        return {"error": f"No step {step}"}
+    return record
+
+@router.get("/trace/register")
+async def trace_register(name: str, step: int):
+    """Value of a recorded register after step N"""
+    store = get_trace_store()
+    if not store:
+        return {"error": "DB not loaded"}
+    try:
+        value = store.register_at(step, name)
+    except KeyError:
+        return {"error": f"Register {name} is not in the trace"}
+    if value is None:
+        return {"error": f"No step {step}"}
+    return {"step": step, "name": name, "value": value}
+
+@router.get("/trace/executed")
+async def trace_executed(address: str, offset: int = 0, limit: int = 100):
+    """Steps at which the instruction at `address` was executed"""
+    store = get_trace_store()
+    error = _not_queryable(store)
+    if error:
+        return {"error": error}
+    try:
+        pc = int(address, 16)
+    except ValueError:
+        return {"error": "Invalid address format"}
+
+    await ensure_indexes(store)
+    steps, total = store.executions(pc, max(offset, 0), max(limit, 0))
+    return {"address": address, "total": total, "offset": offset, "steps": steps}
+
+@router.get("/trace/last_write")
+async def trace_last_write(address: str, before: int = None):
+    """Last step (before step `before`, if given) that wrote the byte at `address`"""
+    store = get_trace_store()
+    error = _not_queryable(store)
+    if error:
+        return {"error": error}
+    try:
+        addr = int(address, 16)
+    except ValueError:
+        return {"error": "Invalid address format"}
+
+    await ensure_indexes(store)
+    record = store.last_write(addr, before)
+    return {"address": address, "record": record}
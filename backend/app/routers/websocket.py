@@ -1,14 +1,133 @@
+import asyncio
+import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from gdb import gdb
+from gdb import gdb, sessions
+from app.utils.wire import PROTOCOL_VERSION, encode_event, encode_memory
 
 router = APIRouter()
 
+MAX_WS_READ = 4 << 20  # one read_memory request, same as the memory cache size
+
+class Client:
+    """One /ws connection. Sends are serialized: events and request replies share the socket."""
+
+    def __init__(self, websocket: WebSocket, sub, binary: bool, controller):
+        self.websocket = websocket
+        self.sub = sub
+        # The session's controller, held directly: no lookup of a session closed meanwhile
+        self.gdb = controller
+        self.binary = binary
+        self.lock = asyncio.Lock()
+        self.requests = set()
+
+    async def send(self, msg: dict):
+        frame = encode_event(msg) if self.binary else None
+        async with self.lock:
+            if frame is not None:
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_json(msg)
+
+    async def send_memory(self, request_id: int, address: int, data: bytes, epoch: int):
+        async with self.lock:
+            if self.binary:
+                await self.websocket.send_bytes(encode_memory(address, data, epoch, request_id))
+            else:
+                # Hex is still half the size of an int array, and built in C
+                await self.websocket.send_json({"type": "memory", "payload": {
+                    "id": request_id, "address": hex(address), "length": len(data),
+                    "epoch": epoch, "hex": data.hex()
+                }})
+
+async def _send_events(client: Client):
+    """Per-client sender: drains the client's own buffer."""
+    sub = client.sub
+    while True:
+        data = await sub.get()
+        if data is None or sub.closed:
+            break
+        await client.send(data)
+        if data.get("type") == "session_closed":
+            # 1001 = Going Away: the session (and its events) is gone
+            await client.websocket.close(code=1001, reason="Session closed")
+            return
+
+    if sub.close_reason == "lagging":
+        print(f"Client {sub.id} disconnected: too slow")
+        # 1013 = Try Again Later
+        await client.websocket.close(code=1013, reason="Client too slow")
+
+async def _read_memory(client: Client, request: dict):
+    request_id = request.get("id", 0)
+    try:
+        address = int(request.get("address"), 16)
+        length = int(request.get("length", 256))
+    except (TypeError, ValueError):
+        address, length = None, 0
+    if address is None or not 0 < length <= MAX_WS_READ:
+        await client.send({"type": "memory", "payload": {"id": request_id, "error": "Invalid parameters"}})
+        return
+
+    epoch = client.gdb.memory_cache.epoch
+    data = await client.gdb.read_memory(hex(address), length)
+    if data is None:
+        await client.send({"type": "memory", "payload": {"id": request_id, "error": f"Failed to read memory at {hex(address)}"}})
+        return
+    await client.send_memory(request_id, address, data, epoch)
+
+async def _receive_events(client: Client):
+    """
+    Client requests, answered on the socket:
+      {"type": "read_memory", "id": n, "address": "0x...", "length": n} -> memory
+    """
+    while True:
+        text = await client.websocket.receive_text()
+        try:
+            request = json.loads(text)
+        except ValueError:
+            continue
+        if request.get("type") == "read_memory":
+            task = asyncio.create_task(_read_memory(client, request))
+            client.requests.add(task)
+            task.add_done_callback(client.requests.discard)
+
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, types: str = None, binary: bool = False):
+    """
+    Every connection is an independent subscriber of gdb.events, the
+    events of its session (?session=<id>, see app/middleware.py).
+    Optional ?types=log_tail,target_log limits the message types sent.
+    ?binary=1 asks for binary frames (see utils/wire.py) for memory and
+    registers; the first message confirms the protocol either way.
+    """
     await websocket.accept()
+    await websocket.send_json({"type": "protocol", "payload": {"binary": binary, "version": PROTOCOL_VERSION}})
+    # The session's own hub: stays valid even if the session is closed meanwhile
+    session = sessions.current()
+    events = session.controller.events
+    sub = events.subscribe(types.split(",") if types else None)
+    client = Client(websocket, sub, binary, session.controller)
+    session.clients += 1
+
+    sender = asyncio.create_task(_send_events(client))
+    receiver = asyncio.create_task(_receive_events(client))
     try:
-        while True:
-            data = await gdb.msg_queue.get()
-            await websocket.send_json(data)
-    except WebSocketDisconnect:
+        done, _ = await asyncio.wait([sender, receiver], return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc and not isinstance(exc, WebSocketDisconnect):
+                print(f"Client {sub.id} error: {exc}")
+    finally:
+        events.unsubscribe(sub)
+        session.clients -= 1
+        session.touch()
+        sender.cancel()
+        receiver.cancel()
+        for task in list(client.requests):
+            task.cancel()
         print("Client disconnected")
+
+@router.get("/events/stats")
+async def event_stats():
+    """Event hub counters: per-subscriber pending, dropped and coalesced messages"""
+    return gdb.events.stats()
@@ -1,19 +1,15 @@
-from db_manager import DBManager
+from gdb import sessions
 
-# Global Managers
-db_manager: DBManager = None
-last_opened_path = "/targets/hello"
+# Per-session state: the session of the current request (gdb/sessions.py)
 
 def get_db_manager():
-    return db_manager
+    return sessions.current().db_manager
 
 def set_db_manager(manager):
-    global db_manager
-    db_manager = manager
+    sessions.current().db_manager = manager
 
 def get_last_opened_path():
-    return last_opened_path
+    return sessions.current().last_opened_path
 
 def set_last_opened_path(path):
-    global last_opened_path
-    last_opened_path = path
+    sessions.current().last_opened_path = path
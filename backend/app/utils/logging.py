@@ -1,10 +1,10 @@
 from gdb import gdb
 
 async def broadcast_log(msg: str):
-    await gdb.msg_queue.put({"type": "system_log", "payload": msg})
+    gdb.logs.info("api", msg)
 
 async def broadcast_progress(message: str, percent: int, show: bool = True):
-    await gdb.msg_queue.put({
+    await gdb.events.put({
         "type": "progress", 
         "payload": {
             "message": message, 
@@ -0,0 +1,30 @@
+import bisect
+from gdb import gdb
+from app.utils.logging import broadcast_log
+
+async def apply_saved_patches(db_manager) -> dict:
+    """
+    Re-applies every saved patch to the inferior in one pipelined batch.
+    Saved ranges that didn't make it into memory are listed in "failed".
+    """
+    ranges = await db_manager.get_patch_ranges()
+    if not ranges:
+        return {"ranges": 0, "written": 0, "bytes": 0, "failed": []}
+
+    written = await gdb.write_memory_many([(start, new) for start, _, new in ranges])
+    total = sum(len(data) for _, data in written)
+
+    # Adjacent ranges are written as one run: a range is either inside a written run or failed
+    starts = [addr for addr, _ in written]
+    failed = []
+    for start, _, new in ranges:
+        i = bisect.bisect_right(starts, start) - 1
+        if i < 0 or start + len(new) > starts[i] + len(written[i][1]):
+            failed.append({"address": f"0x{start:x}", "length": len(new)})
+
+    await broadcast_log(f"Patches applied: {total} bytes in {len(written)} writes ({len(ranges)} ranges saved)")
+    if failed:
+        shown = ", ".join(f"{f['address']} ({f['length']} bytes)" for f in failed[:20])
+        more = f" and {len(failed) - 20} more" if len(failed) > 20 else ""
+        await broadcast_log(f"Patches NOT applied: {shown}{more}")
+    return {"ranges": len(ranges), "written": len(written), "bytes": total, "failed": failed}
@@ -0,0 +1,91 @@
+import json
+import struct
+
+# Binary WebSocket protocol (/ws?binary=1), little endian.
+# Every frame starts with its kind byte; JSON text frames stay the fallback
+# for everything else and for clients that did not ask for binary.
+PROTOCOL_VERSION = 1
+
+MEMORY = 1      # raw memory block
+REGISTERS = 2   # registers / registers_delta
+SNAPSHOT = 3    # stop_snapshot
+
+# kind, flags, reserved, request id, address, length, epoch (+ raw bytes)
+MEMORY_HEADER = struct.Struct("<BBHIQII")
+# kind, flags (1 = delta), count, thread, extras length
+# (+ count u16 numbers padded to 8, count u64 values, extras JSON)
+REGISTERS_HEADER = struct.Struct("<BBHII")
+# kind, flags, reserved, JSON length
+# (+ JSON padded to 8, u32 registers section length + section, memory section up to the end)
+SNAPSHOT_HEADER = struct.Struct("<BBHI")
+
+FLAG_DELTA = 1
+
+U64_MAX = (1 << 64) - 1
+
+
+def _pad8(data: bytes, fill: bytes = b"\0") -> bytes:
+    return data + fill * (-len(data) % 8)
+
+
+def encode_memory(address: int, data: bytes, epoch: int = 0, request_id: int = 0) -> bytes:
+    """`data` goes out as is: no per-byte objects, no hex"""
+    header = MEMORY_HEADER.pack(MEMORY, 0, 0, request_id & 0xffffffff,
+                                address, len(data), epoch & 0xffffffff)
+    return header + data
+
+
+def encode_registers(registers: list, thread=None, delta: bool = False) -> bytes:
+    """
+    [{number, value}] -> packed arrays. Values that are not a plain 64-bit
+    number (vector registers come as "{v4_float = ...}") travel in the JSON extras.
+    """
+    numbers = []
+    values = []
+    extras = []
+    for reg in registers:
+        try:
+            value = int(reg['value'], 16)
+        except (TypeError, ValueError):
+            value = -1
+        if 0 <= value <= U64_MAX:
+            numbers.append(int(reg['number']))
+            values.append(value)
+        else:
+            extras.append(reg)
+
+    extra = json.dumps(extras).encode() if extras else b""
+    count = len(numbers)
+    header = REGISTERS_HEADER.pack(REGISTERS, FLAG_DELTA if delta else 0, count,
+                                   int(thread or 0), len(extra))
+    return (header + _pad8(struct.pack(f"<{count}H", *numbers))
+            + struct.pack(f"<{count}Q", *values) + extra)
+
+
+def encode_snapshot(payload: dict) -> bytes:
+    rest = {k: v for k, v in payload.items() if k not in ("registers", "registersDelta", "stack")}
+    text = _pad8(json.dumps(rest).encode(), b" ")  # JSON whitespace
+
+    if "registers" in payload:
+        regs = encode_registers(payload["registers"], payload.get("thread"))
+    elif "registersDelta" in payload:
+        regs = encode_registers(payload["registersDelta"], payload.get("thread"), delta=True)
+    else:
+        regs = b""
+
+    stack = payload.get("stack")
+    memory = encode_memory(int(stack["address"], 16), bytes(stack["bytes"])) if stack else b""
+    return (SNAPSHOT_HEADER.pack(SNAPSHOT, 0, 0, len(text)) + text
+            + struct.pack("<I", len(regs)) + _pad8(regs) + memory)
+
+
+def encode_event(msg: dict):
+    """Binary frame for the event types that have one, else None (send as JSON)"""
+    msg_type = msg.get("type")
+    if msg_type == "registers":
+        return encode_registers(msg["payload"])
+    if msg_type == "registers_delta":
+        return encode_registers(msg["payload"]["registers"], msg["payload"].get("thread"), delta=True)
+    if msg_type == "stop_snapshot":
+        return encode_snapshot(msg["payload"])
+    return None
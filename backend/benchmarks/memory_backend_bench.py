@@ -0,0 +1,90 @@
+"""
+Memory backend benchmark: MI (-data-read-memory-bytes) vs direct /proc/<pid>/mem.
+
+Run from backend/, with GDB installed and ptrace allowed (as in the container):
+
+    python -m benchmarks.memory_backend_bench ../targets/crackme1
+
+Starts a real session on the binary, waits for the first stop and reads the
+same stack/heap ranges through both backends, checking they agree. Reads go
+through GDBController.read_memory / iter_memory, i.e. what the API uses;
+the MI numbers are taken with the page cache cleared before every read.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gdb.controller import GDBController
+
+SIZES = [256, 4096, 64 * 1024, 1 << 20, 16 << 20]
+
+
+async def wait_for_stop(gdb: GDBController, timeout: float = 20.0):
+    sub = gdb.events.subscribe(["stop_snapshot"])
+    try:
+        return await asyncio.wait_for(sub.get(), timeout)
+    finally:
+        gdb.events.unsubscribe(sub)
+
+
+async def read(gdb: GDBController, start: int, size: int, direct: bool):
+    gdb.memory_cache.invalidate()
+    saved = gdb.proc_memory
+    if not direct:
+        gdb.proc_memory = False
+    try:
+        started = time.perf_counter()
+        if size > (1 << 20):
+            data = bytearray()
+            async for _, n, chunk in gdb.iter_memory(start, size):
+                data += chunk if chunk is not None else bytes(n)
+        else:
+            data = await gdb.read_memory(hex(start), size)
+        return bytes(data or b""), time.perf_counter() - started
+    finally:
+        gdb.proc_memory = saved
+
+
+async def run(binary: str, repeat: int):
+    gdb = GDBController()
+    stopped = asyncio.create_task(wait_for_stop(gdb))
+    await gdb.start(binary)
+    snapshot = (await stopped)["payload"]
+    stack = int(snapshot["stack"]["address"], 16)
+
+    if not await gdb._direct_memory():
+        await gdb.stop()
+        sys.exit("/proc/<pid>/mem is not usable here (ptrace restrictions?), nothing to compare")
+
+    print(f"{binary}: stack at 0x{stack:x}, pid {gdb.proc_memory.pid}")
+    print(f"  {'size':>10}{'MI ms':>10}{'proc ms':>10}{'speedup':>9}")
+    for size in SIZES:
+        # Around the stack pointer, the part above it is mapped for sure
+        start = stack - min(size // 2, 0x1000)
+        best = {True: float("inf"), False: float("inf")}
+        results = {}
+        for _ in range(repeat):
+            for direct in (False, True):
+                data, elapsed = await read(gdb, start, size, direct)
+                best[direct] = min(best[direct], elapsed)
+                results[direct] = data
+        same = "" if results[True] == results[False] else "  MISMATCH"
+        print(f"  {size:>10}{best[False] * 1000:>10.2f}{best[True] * 1000:>10.2f}"
+              f"{best[False] / best[True]:>8.1f}x{same}")
+    await gdb.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("binary")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(os.path.abspath(args.binary), args.repeat))
+
+
+if __name__ == "__main__":
+    main()
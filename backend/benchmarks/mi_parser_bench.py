@@ -0,0 +1,127 @@
+"""
+MI parser benchmark: pygdbmi's parse_response vs gdb/mi_parser.parse_line.
+
+Run from backend/:
+
+    # record a transcript from a real GDB session (raw MI lines, one per line)
+    python -m benchmarks.mi_parser_bench --record ../targets/crackme1 -o benchmarks/transcripts/crackme1.mi
+
+    # compare both parsers on every recorded transcript (or the given files)
+    python -m benchmarks.mi_parser_bench [transcript.mi ...]
+
+Both parsers must produce identical results; the benchmark fails otherwise.
+"""
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pygdbmi.gdbmiparser import parse_response
+from gdb.mi_parser import parse_fast, parse_line
+
+TRANSCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcripts")
+
+# What --record asks GDB for: a stop, registers, disassembly and memory reads up to 4 MB
+RECORD_COMMANDS = [
+    "-gdb-set confirm off",
+    "-break-insert main",
+    "-exec-run",
+    "-data-list-register-names",
+    "-data-list-register-values x",
+    "-data-list-changed-registers",
+    "-exec-next-instruction",
+    "-data-list-changed-registers",
+    "-data-disassemble -s $pc -e $pc+400 -- 2",
+    "-data-disassemble -s $pc -e $pc+4000 -- 2",
+    "-data-read-memory-bytes $sp 256",
+    "-data-read-memory-bytes $sp-65536 65536",
+    "-data-read-memory-bytes $sp-1048576 1048576",
+    "-data-read-memory-bytes $sp-4194304 4194304",
+    "-stack-list-frames",
+    "-gdb-exit",
+]
+
+
+def record(binary: str, output: str):
+    proc = subprocess.run(
+        ["gdb", "-q", "--interpreter=mi3", binary],
+        input="\n".join(RECORD_COMMANDS) + "\n",
+        capture_output=True, text=True, timeout=120
+    )
+    lines = [l for l in proc.stdout.splitlines() if l.strip()]
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"{output}: {len(lines)} lines, {sum(map(len, lines)) / 1e6:.2f} MB")
+
+
+def kind(line: str) -> str:
+    for key in ("memory", "asm_insns", "register-values", "changed-registers"):
+        if f"^done,{key}=" in line[:40]:
+            return key
+    if line.lstrip("0123456789").startswith("*stopped"):
+        return "stopped"
+    return "other"
+
+
+def timed(parser, lines: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for line in lines:
+            parser(line)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench(path: str, repeat: int) -> bool:
+    with open(path, errors="replace") as f:
+        lines = [l.strip() for l in f if l.strip()]
+
+    groups = {}
+    for line in lines:
+        groups.setdefault(kind(line), []).append(line)
+
+    ok = True
+    print(f"\n{path} ({len(lines)} lines, {sum(map(len, lines)) / 1e6:.2f} MB)")
+    print(f"  {'record':<18}{'lines':>7}{'MB':>8}{'pygdbmi ms':>12}{'fast ms':>10}{'speedup':>9}{'fast path':>11}")
+    for name, group in sorted(groups.items()):
+        for line in group:
+            if parse_line(line) != parse_response(line):
+                print(f"  MISMATCH: {line[:120]}")
+                ok = False
+        slow = timed(parse_response, group, repeat)
+        fast = timed(parse_line, group, repeat)
+        hits = sum(parse_fast(l) is not None for l in group)
+        size = sum(map(len, group)) / 1e6
+        print(f"  {name:<18}{len(group):>7}{size:>8.2f}{slow * 1000:>12.2f}{fast * 1000:>10.2f}"
+              f"{slow / fast if fast else 0:>8.1f}x{hits:>7}/{len(group)}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("transcripts", nargs="*")
+    parser.add_argument("--record", metavar="BINARY")
+    parser.add_argument("-o", "--output")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.record:
+        output = args.output or os.path.join(TRANSCRIPTS, os.path.basename(args.record) + ".mi")
+        record(args.record, output)
+        return
+
+    paths = args.transcripts or sorted(glob.glob(os.path.join(TRANSCRIPTS, "*.mi")))
+    if not paths:
+        sys.exit(f"No transcripts in {TRANSCRIPTS}: record one with --record <binary>")
+    ok = all([bench(path, args.repeat) for path in paths])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,101 +3,309 @@
 import sqlite3
 import os
 import asyncio
+from db_writer import DBWriter
+
+
+class DBClosed(Exception):
+    """The DB was closed (target unloaded, reset) while a request still used it"""
+
 
 class DBManager:
-    def __init__(self, target_name: str = "default", target_hash: str = "000"):
+    """
+    Comments and patches of one target. Writes go through a DBWriter
+    (write-behind, batched commits in its own thread); reads use a separate
+    read-only connection and first wait for pending writes, so a read
+    always sees what was written before it.
+    Patch writes wait for their commit; comments don't, a failed one goes
+    to on_error(message) (called on the event loop) and the next flush().
+    """
+
+    def __init__(self, target_name: str = "default", target_hash: str = "000", on_error=None):
         os.makedirs("database", exist_ok=True)
         self.db_path = f"database/{target_name}_{target_hash}.db"
-        self.conn = None
+        self.conn = None      # read connection
+        self.writer = None
+        self.on_error = on_error
 
     async def init_db(self):
-        """Initialize database tables asynchronously (running sync in executor)"""
-        await asyncio.to_thread(self._init_db_sync)
+        """Initialize database tables asynchronously (in the writer thread)"""
+        on_error = None
+        if self.on_error:
+            loop = asyncio.get_running_loop()
+            on_error = lambda message: loop.call_soon_threadsafe(self.on_error, message)
+        self.writer = await asyncio.to_thread(DBWriter, self.db_path, on_error=on_error)
+        await self.writer.call(self._init_db_sync)
+        self.conn = await asyncio.to_thread(self._connect_reader)
 
-    def _init_db_sync(self):
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        cursor = self.conn.cursor()
+    def _connect_reader(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA query_only=1")
+        return conn
+
+    def _init_db_sync(self, cursor):
         
         # Comments table
+        # address is an INTEGER PRIMARY KEY (rowid): sorted numerically and range-indexed
+        self._migrate_text_comments(cursor)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS comments (
-                address TEXT PRIMARY KEY,
+                address INTEGER PRIMARY KEY,
                 comment TEXT
             )
         ''')
 
-        # Patches table: GRANULAR BYTE STORAGE
-        # address is HEX STRING (e.g. "0x401000")
-        # orig_byte and new_byte are INTEGERS (0-255)
-        
-        # Check if old table exists and drop it if it has old schema (simple check)
-        # For simplicity in this dev environment, we'll try to create the new one.
-        # If schema mismatch error occurs, we might need manual reset.
-        # But here we define the desired schema.
-        
+        # Patches table: CONTIGUOUS RANGE STORAGE
+        # start is the INTEGER address of the first byte,
+        # orig/new are BLOBs of equal length (original and patched bytes).
+        # Ranges never overlap and adjacent ranges are merged on write.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS patch_ranges (
+                start INTEGER PRIMARY KEY,
+                orig BLOB,
+                new BLOB
+            )
+        ''')
+
+        self._migrate_byte_patches(cursor)
+
+    def _migrate_text_comments(self, cursor):
+        """Converts the legacy 'address TEXT' comments table to integer keys."""
+        cursor.execute("PRAGMA table_info(comments)")
+        columns = {row[1]: row[2] for row in cursor.fetchall()}
+        if columns.get('address', '').upper() != 'TEXT':
+            return # Table doesn't exist or is already migrated
+
+        cursor.execute('SELECT address, comment FROM comments')
+        rows = []
+        for address, comment in cursor.fetchall():
+            try:
+                rows.append((int(address, 16), comment))
+            except (TypeError, ValueError):
+                continue # Not an address, can't be shown anyway
+        cursor.execute('ALTER TABLE comments RENAME TO comments_text')
+        cursor.execute('''
+            CREATE TABLE comments (
+                address INTEGER PRIMARY KEY,
+                comment TEXT
+            )
+        ''')
+        cursor.executemany("INSERT OR REPLACE INTO comments (address, comment) VALUES (?, ?)", rows)
+        cursor.execute('DROP TABLE comments_text')
+
+    def _migrate_byte_patches(self, cursor):
+        """Folds the legacy one-row-per-byte 'patches' table into patch_ranges."""
         try:
             cursor.execute('SELECT orig_bytes FROM patches LIMIT 1')
-            # If this succeeds, we have the old schema. We should drop it.
+            # If this succeeds, we have the (even older) blob schema. We should drop it.
             cursor.execute('DROP TABLE patches')
+            return
         except sqlite3.OperationalError:
-            pass # Table doesn't exist or is already new schema (or empty)
+            pass # Table doesn't exist or is the byte schema
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS patches (
-                address TEXT PRIMARY KEY,
-                orig_byte INTEGER, 
-                new_byte INTEGER,
-                enabled INTEGER DEFAULT 1
-            )
-        ''')
+        try:
+            cursor.execute('SELECT address, orig_byte, new_byte FROM patches')
+        except sqlite3.OperationalError:
+            return # Nothing to migrate
+
+        rows = sorted((int(addr, 16), orig, new) for addr, orig, new in cursor.fetchall())
+        ranges = []
+        for addr, orig, new in rows:
+            if ranges and ranges[-1][0] + len(ranges[-1][1]) == addr:
+                ranges[-1][1].append(orig)
+                ranges[-1][2].append(new)
+            else:
+                ranges.append([addr, bytearray([orig]), bytearray([new])])
 
-        self.conn.commit()
+        cursor.executemany(
+            "INSERT OR REPLACE INTO patch_ranges (start, orig, new) VALUES (?, ?, ?)",
+            [(start, bytes(orig), bytes(new)) for start, orig, new in ranges])
+        cursor.execute('DROP TABLE patches')
 
     async def reset_db(self):
-        """Closes connection, deletes file, re-initializes"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-        
-        if os.path.exists(self.db_path):
-            await asyncio.to_thread(os.remove, self.db_path)
+        """Closes connections, deletes file, re-initializes"""
+        await asyncio.to_thread(self.close)
+
+        for path in (self.db_path, self.db_path + "-wal", self.db_path + "-shm"):
+            if os.path.exists(path):
+                await asyncio.to_thread(os.remove, path)
         
         await self.init_db()
 
+    async def flush(self):
+        """Durability point: everything written so far is committed"""
+        if self.writer:
+            await self.writer.flush()
+
+    def _writer(self) -> DBWriter:
+        if self.writer is None:
+            raise DBClosed("No DB loaded")
+        return self.writer
+
     async def save_comment(self, address: str, comment: str):
-        await asyncio.to_thread(self._execute, 
-            "INSERT OR REPLACE INTO comments (address, comment) VALUES (?, ?)", 
-            (address, comment))
+        addr = int(address, 16)
+        # Queued: several edits of the same comment before the commit are one write
+        self._writer().submit(self._save_comment_sync, addr, comment, key=("comment", addr))
+
+    @staticmethod
+    def _save_comment_sync(cursor, addr: int, comment: str):
+        if comment:
+            cursor.execute("INSERT OR REPLACE INTO comments (address, comment) VALUES (?, ?)",
+                           (addr, comment))
+        else:
+            cursor.execute("DELETE FROM comments WHERE address = ?", (addr,))
 
     async def get_comments(self):
-        rows = await asyncio.to_thread(self._query, "SELECT address, comment FROM comments")
-        return {row[0]: row[1] for row in rows}
+        rows = await self._read(self._query, "SELECT address, comment FROM comments ORDER BY address")
+        return {f"0x{row[0]:x}": row[1] for row in rows}
+
+    async def comments_in(self, start: int, end: int):
+        """Comments with start <= address < end"""
+        rows = await self._read(self._query,
+            "SELECT address, comment FROM comments WHERE address >= ? AND address < ? ORDER BY address",
+            (start, end))
+        return {f"0x{row[0]:x}": row[1] for row in rows}
+
+    async def count_comments(self):
+        rows = await self._read(self._query, "SELECT COUNT(*) FROM comments")
+        return rows[0][0]
 
-    async def save_patch_byte(self, address: str, orig_byte: int, new_byte: int):
-        """Saves a single byte patch."""
-        await asyncio.to_thread(self._execute,
-            "INSERT OR REPLACE INTO patches (address, orig_byte, new_byte) VALUES (?, ?, ?)",
-            (address, orig_byte, new_byte))
+    async def save_patch(self, start: int, new: bytes, current: bytes):
+        """
+        Records a patch of len(new) bytes at `start` in one transaction.
+        `current` is what memory holds right now: it becomes the original for
+        bytes that are not patched yet, already patched bytes keep their original.
+        Returns once committed (in the current batch), raises if it failed.
+        """
+        await self._writer().call(self._save_patch_sync, start, bytes(new), bytes(current),
+                                  urgent=False)
 
     async def get_patch_byte(self, address: str):
         """Returns {orig_byte, new_byte} or None"""
-        rows = await asyncio.to_thread(self._query, "SELECT orig_byte, new_byte FROM patches WHERE address = ?", (address,))
+        addr = int(address, 16)
+        rows = await self._read(self._query,
+            "SELECT start, orig, new FROM patch_ranges WHERE start <= ? ORDER BY start DESC LIMIT 1",
+            (addr,))
         if rows:
-            return {'orig_byte': rows[0][0], 'new_byte': rows[0][1]}
+            start, orig, new = rows[0]
+            if addr < start + len(new):
+                return {'orig_byte': orig[addr - start], 'new_byte': new[addr - start]}
         return None
 
+    async def get_patch_ranges(self):
+        """Returns [(start, orig, new)] sorted by address"""
+        return await self._read(self._query,
+            "SELECT start, orig, new FROM patch_ranges ORDER BY start")
+
+    async def patches_in(self, start: int, end: int):
+        """Patch ranges overlapping [start, end) as [(start, orig, new)]"""
+        return await self._read(self._patches_in_sync, start, end)
+
+    def _patches_in_sync(self, start: int, end: int):
+        cursor = self.conn.cursor()
+        return [r for r in self._ranges_touching(cursor, start, end)
+                if r[0] < end and r[0] + len(r[2]) > start]
+
+    async def count_patched_bytes(self):
+        rows = await self._read(self._query, "SELECT COALESCE(SUM(length(new)), 0) FROM patch_ranges")
+        return rows[0][0]
+
     async def get_patches(self):
         """Returns list of modified addresses for frontend state"""
-        rows = await asyncio.to_thread(self._query, "SELECT address FROM patches")
-        return [row[0] for row in rows]
+        ranges = await self.get_patch_ranges()
+        return [f"0x{start + i:x}" for start, _, new in ranges for i in range(len(new))]
 
     async def delete_patch(self, address: str):
-        await asyncio.to_thread(self._execute, "DELETE FROM patches WHERE address = ?", (address,))
+        addr = int(address, 16)
+        await self._writer().call(self._delete_range, addr, addr + 1, urgent=False)
 
-    def _execute(self, sql, params):
-        cursor = self.conn.cursor()
-        cursor.execute(sql, params)
-        self.conn.commit()
+    def _ranges_touching(self, cursor, lo: int, hi: int):
+        """Ranges overlapping or adjacent to [lo, hi). Ranges never overlap each other."""
+        cursor.execute(
+            "SELECT start, orig, new FROM patch_ranges WHERE start < ? ORDER BY start DESC LIMIT 1",
+            (lo,))
+        ranges = [r for r in cursor.fetchall() if r[0] + len(r[2]) >= lo]
+        cursor.execute(
+            "SELECT start, orig, new FROM patch_ranges WHERE start >= ? AND start <= ? ORDER BY start",
+            (lo, hi))
+        ranges.extend(cursor.fetchall())
+        return ranges
+
+    def _save_patch_sync(self, cursor, start: int, new: bytes, current: bytes):
+        """In the writer thread: earlier queued patches are already visible to cursor"""
+        end = start + len(new)
+        touching = self._ranges_touching(cursor, start, end)
+
+        lo = min([start] + [r[0] for r in touching])
+        hi = max([end] + [r[0] + len(r[2]) for r in touching])
+        orig_buf = bytearray(hi - lo)
+        new_buf = bytearray(hi - lo)
+
+        # Unpatched bytes: original is the current memory ...
+        orig_buf[start - lo:end - lo] = current[:len(new)].ljust(len(new), b"\x00")
+        for r_start, r_orig, r_new in touching:
+            # ... but bytes patched before keep their true original
+            orig_buf[r_start - lo:r_start - lo + len(r_orig)] = r_orig
+            new_buf[r_start - lo:r_start - lo + len(r_new)] = r_new
+        new_buf[start - lo:end - lo] = new
+
+        cursor.executemany("DELETE FROM patch_ranges WHERE start = ?",
+                           [(r[0],) for r in touching])
+        cursor.execute("INSERT INTO patch_ranges (start, orig, new) VALUES (?, ?, ?)",
+                       (lo, bytes(orig_buf), bytes(new_buf)))
+
+    async def originals_in(self, ranges: list):
+        """
+        Original bytes of the patched parts of [(start, end)] ranges,
+        as [(addr, orig bytes)] pieces sorted by address.
+        """
+        return await self._read(self._originals_in_sync, ranges)
+
+    def _originals_in_sync(self, ranges: list):
+        pieces = {}
+        for start, end in ranges:
+            for r_start, r_orig, r_new in self._patches_in_sync(start, end):
+                lo, hi = max(start, r_start), min(end, r_start + len(r_new))
+                pieces[lo] = r_orig[lo - r_start:hi - r_start]
+        return sorted(pieces.items())
+
+    async def delete_patch_ranges(self, ranges: list):
+        """Un-records every [(start, end)] range, all or nothing. Raises if it failed."""
+        await self._writer().call(self._delete_patch_ranges_sync, list(ranges), urgent=False)
+
+    def _delete_patch_ranges_sync(self, cursor, ranges: list):
+        for start, end in ranges:
+            self._delete_range(cursor, start, end)
+
+    def _delete_range(self, cursor, start: int, end: int):
+        """Un-records [start, end). Returns the removed [(addr, orig bytes)] pieces."""
+        removed = []
+        touching = [r for r in self._ranges_touching(cursor, start, end)
+                    if r[0] < end and r[0] + len(r[2]) > start]
+        keep = []
+        for r_start, r_orig, r_new in touching:
+            r_end = r_start + len(r_new)
+            lo, hi = max(start, r_start), min(end, r_end)
+            removed.append((lo, r_orig[lo - r_start:hi - r_start]))
+            if r_start < lo:
+                keep.append((r_start, r_orig[:lo - r_start], r_new[:lo - r_start]))
+            if hi < r_end:
+                keep.append((hi, r_orig[hi - r_start:], r_new[hi - r_start:]))
+
+        cursor.executemany("DELETE FROM patch_ranges WHERE start = ?",
+                           [(r[0],) for r in touching])
+        cursor.executemany("INSERT INTO patch_ranges (start, orig, new) VALUES (?, ?, ?)", keep)
+        return removed
+
+    async def _read(self, fn, *args):
+        """Reads on the read connection, after the writes queued before them"""
+        writer = self._writer()
+        if writer.pending:
+            # Earlier failed writes are flush()'s business, not this read's
+            await writer.flush(report=False)
+        return await asyncio.to_thread(fn, *args)
+
+    def stats(self) -> dict:
+        return {"path": self.db_path, **(self.writer.stats() if self.writer else {})}
 
     def _query(self, sql, params=()):
         cursor = self.conn.cursor()
@@ -105,5 +313,10 @@ class DBManager:
         return cursor.fetchall()
 
     def close(self):
+        """Commits the queued writes and closes both connections (blocks until then)"""
+        if self.writer:
+            self.writer.close()
+            self.writer = None
         if self.conn:
             self.conn.close()
+            self.conn = None
@@ -0,0 +1,239 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+BATCH_DELAY = float(os.environ.get("DB_BATCH_DELAY", "0.05"))   # seconds a batch stays open
+BATCH_SIZE = int(os.environ.get("DB_BATCH_SIZE", "512"))        # writes that close it early
+
+
+def _resolve(future, result=None, error=None):
+    """On the event loop: the writer thread can't touch futures itself"""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class DBWriteError(Exception):
+    """Queued writes that failed, reported by the next flush()"""
+
+
+class DBWriter:
+    """
+    Write-behind journal of one SQLite DB. A dedicated thread owns the write
+    connection (WAL, synchronous=NORMAL) and commits queued writes in batches:
+    a batch stays open BATCH_DELAY seconds after its first write, or until
+    BATCH_SIZE writes are queued, then everything in it is one transaction,
+    i.e. one fsync instead of one per write.
+
+    Writes are functions fn(cursor, *args), run in order in the writer thread.
+    submit() doesn't wait; call() waits for the commit and returns fn's
+    result; flush() waits until everything submitted so far is committed.
+    A write that fails is rolled back alone (savepoint), not its batch.
+    Failures of submit()ted writes go to on_error (called in the writer
+    thread), stats() and the next flush(), which raises DBWriteError.
+    Queued writes with the same `key` are coalesced: the latest args win.
+    """
+
+    def __init__(self, path: str, delay: float = BATCH_DELAY, max_batch: int = BATCH_SIZE,
+                 on_error=None):
+        self.path = path
+        self.on_error = on_error
+        self.delay = delay
+        self.max_batch = max_batch
+        self._ops = deque()       # [fn, args, waiter (loop, future) or None]
+        self._keyed = {}          # key -> queued op, until its batch is taken
+        self._flushes = []        # (target seq, loop, future)
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._committed = 0
+        self._urgent = False      # someone waits: don't keep the batch open
+        self._closing = False
+
+        self.writes = 0
+        self.commits = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.last_error = None
+        self._unreported = []     # errors of submit()ted writes, until a flush() reports them
+        self.last_batch = 0
+        self.last_commit_ms = None
+
+        self._ready = threading.Event()
+        self._error = None
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name=f"db-writer {os.path.basename(path)}")
+        self.thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+
+    @property
+    def pending(self) -> bool:
+        return self._committed < self._submitted
+
+    def submit(self, fn, *args, key=None):
+        """Queues a write and returns at once; errors go to on_error, stats() and flush()"""
+        with self._cond:
+            self._enqueue(fn, args, None, key)
+
+    async def call(self, fn, *args, urgent: bool = True):
+        """
+        Queues a write and waits for its commit: fn's result, or its exception.
+        urgent=False lets it ride the current batch (up to BATCH_DELAY later).
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._cond:
+            self._enqueue(fn, args, (loop, future), None)
+            if urgent:
+                self._urgent = True
+        return await future
+
+    async def flush(self, report: bool = True):
+        """
+        Durability point: returns once every write submitted so far is committed.
+        Raises DBWriteError if submit()ted writes failed since the last reporting flush.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._cond:
+            if self._committed < self._submitted:
+                self._flushes.append((self._submitted, loop, future))
+                self._urgent = True
+                self._cond.notify()
+            else:
+                future.set_result(None)
+        await future
+        if not report:
+            return
+        with self._cond:
+            errors, self._unreported = self._unreported, []
+        if errors:
+            raise DBWriteError(f"{len(errors)} queued write(s) failed, last: {errors[-1]}")
+
+    def close(self):
+        """Commits what is queued and stops the thread (blocks until then)"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._submitted - self._committed,
+            "writes": self.writes,
+            "commits": self.commits,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "lastError": self.last_error,
+            "lastBatch": self.last_batch,
+            "lastCommitMs": self.last_commit_ms,
+        }
+
+    def _enqueue(self, fn, args, waiter, key):
+        if self._closing:
+            raise Exception("DB writer is closed")
+        if key is not None:
+            op = self._keyed.get(key)
+            if op is not None:
+                op[1] = args
+                self.coalesced += 1
+                return
+        op = [fn, args, waiter]
+        if key is not None:
+            self._keyed[key] = op
+        self._ops.append(op)
+        self._submitted += 1
+        self._cond.notify()
+
+    def _run(self):
+        try:
+            # isolation_level=None: transactions are ours (BEGIN/COMMIT per batch)
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: fsync at checkpoints only, a crash of the app loses nothing
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        while True:
+            with self._cond:
+                while not self._ops and not self._closing:
+                    self._cond.wait()
+                if not self._ops:
+                    break
+                # Let the batch fill up, unless it's full or somebody waits for it
+                deadline = time.monotonic() + self.delay
+                while len(self._ops) < self.max_batch and not self._urgent and not self._closing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = list(self._ops)
+                self._ops.clear()
+                self._keyed.clear()
+                self._urgent = False
+            self._commit(conn, batch)
+        conn.close()
+
+    def _commit(self, conn, batch: list):
+        started = time.perf_counter()
+        results = []
+        try:
+            conn.execute("BEGIN")
+            cursor = conn.cursor()
+            for fn, args, waiter in batch:
+                cursor.execute("SAVEPOINT op")
+                try:
+                    result = fn(cursor, *args)
+                    cursor.execute("RELEASE op")
+                    results.append((waiter, result, None))
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO op")
+                    cursor.execute("RELEASE op")
+                    results.append((waiter, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # The batch itself failed (disk full...): none of it is there
+            if conn.in_transaction:
+                conn.rollback()
+            results = [(waiter, None, e) for _, _, waiter in batch]
+
+        with self._cond:
+            self._committed += len(batch)
+            committed = self._committed
+            done = [f for f in self._flushes if f[0] <= committed]
+            self._flushes = [f for f in self._flushes if f[0] > committed]
+        self.writes += len(batch)
+        self.commits += 1
+        self.last_batch = len(batch)
+        self.last_commit_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        for waiter, result, error in results:
+            if error is not None:
+                self.failed += 1
+                self.last_error = f"{type(error).__name__}: {error}"
+                if waiter is None:
+                    # Nobody waits for this one: keep it for flush(), tell on_error
+                    with self._cond:
+                        self._unreported.append(self.last_error)
+                    if self.on_error:
+                        self.on_error(self.last_error)
+                    else:
+                        print(f"[DB] Write failed ({os.path.basename(self.path)}): {error}")
+            if waiter is not None:
+                loop, future = waiter
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+        for _, loop, future in done:
+            loop.call_soon_threadsafe(_resolve, future)
@@ -0,0 +1,54 @@
+import os
+import asyncio
+import hashlib
+
+CHUNK_SIZE = 1 << 20      # 1 MB per read
+PROGRESS_STEP = 5         # report every 5% at most
+
+
+def _hash_file(path: str, size: int, on_progress=None) -> str:
+    """Streams the file through md5 (runs in a worker thread)."""
+    md5 = hashlib.md5()
+    done = 0
+    reported = -PROGRESS_STEP
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            md5.update(chunk)
+            done += len(chunk)
+            percent = done * 100 // size if size else 100
+            if on_progress and percent >= reported + PROGRESS_STEP:
+                reported = percent
+                on_progress(percent)
+    return md5.hexdigest()
+
+
+async def fingerprint(path: str, settings, on_progress=None) -> str:
+    """
+    Short md5 of the target, used as the key of its session DB.
+    The digest is cached in the settings DB by (path, inode, size, mtime_ns),
+    so an unchanged target costs one stat(). Otherwise the file is hashed in
+    a worker thread; on_progress(percent) is called back on the event loop.
+    Returns "000" if the file does not exist.
+    """
+    try:
+        st = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        return "000"
+
+    key = (os.path.abspath(path), st.st_ino, st.st_size, st.st_mtime_ns)
+    digest = await settings.get_fingerprint(*key)
+    if digest:
+        return digest
+
+    report = None
+    if on_progress:
+        loop = asyncio.get_running_loop()
+        report = lambda percent: loop.call_soon_threadsafe(on_progress, percent)
+
+    try:
+        digest = (await asyncio.to_thread(_hash_file, path, st.st_size, report))[:8]
+    except FileNotFoundError:
+        return "000"
+
+    await settings.save_fingerprint(*key, digest)
+    return digest
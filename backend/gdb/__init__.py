@@ -1,3 +1,6 @@
 from .controller import GDBController
+from .sessions import SessionRegistry, SessionProxy, SessionClosed, current_session
 
-gdb = GDBController()
+sessions = SessionRegistry()
+# Controller of the current request's session (see app/middleware.py)
+gdb = SessionProxy(sessions)
@@ -1,101 +1,234 @@
 
 
 import asyncio
+import itertools
 import os
-import uuid
-import random
-from pygdbmi.gdbmiparser import parse_response
+import time
+from .mi_parser import parse_line
+from .event_bus import EventHub
+from .log_buffer import LogBuffer, HexBytes, DEBUG, INFO, WARNING, ERROR
+from .memory_cache import MemoryCache
+from .memory_backend import ProcMemory
+from .maps import RegionMap
+from .disassembly import DisassemblyService
+from .pool import GDBPool
+from .registers import RegisterCache
+from .stepping import StepEngine
+from .search import SearchEngine
+from .snapshot import build_stop_snapshot
+
+READ_CHUNK = 64 * 1024     # bytes per -data-read-memory-bytes (a 128 KB MI line)
+READ_WINDOW = 8            # chunks per pipelined batch
+LARGE_READ = 1 << 20       # reads above this bypass the page cache
 
 class GDBController:
-    def __init__(self):
+    def __init__(self, pool: GDBPool = None):
         self.process = None
         self.io_task = None
-        self.msg_queue = asyncio.Queue()
+        # Published once, fanned out to every WebSocket subscriber (see event_bus.py)
+        self.events = EventHub()
+        # Leveled logs, pulled by the System Log window (see log_buffer.py)
+        self.logs = LogBuffer(self.events)
+        # token -> Future of every in-flight synchronous command
         self.callbacks = {}
-
-    async def log(self, msg: str):
-        """Internal logging helper"""
-        await self.msg_queue.put({"type": "system_log", "payload": f"[GDB-CTRL] {msg}"})
+        # GDB MI tokens must be digits ONLY. Monotonic, so they never collide.
+        self._tokens = itertools.count(1)
+        # Inferior memory, valid for the current stop epoch only
+        self.memory_cache = MemoryCache()
+        # Direct /proc/<pid>/mem reads while stopped (memory_backend.py):
+        # None = not probed yet for this inferior, False = unavailable (MI only)
+        self.proc_memory = None
+        self.inferior_running = False
+        self._proc_lock = asyncio.Lock()
+        # Mappings of the inferior (/proc/<pid>/maps), re-read only when they changed
+        self.regions = RegionMap(self)
+        # Decoded instructions, invalidated by our own patches
+        self.disassembly = DisassemblyService(self)
+        self.disassembly_flavor = "att"
+        # -data-list-register-names of the current session (index = register number)
+        self.register_names = []
+        # Register values per thread, refreshed with deltas on every stop
+        self.registers = RegisterCache(self)
+        self._snapshot_task = None
+        # Server-side multi-step runs (step N / until / leave range)
+        self.stepping = StepEngine(self)
+        # Pattern search over inferior memory (search.py)
+        self.search = SearchEngine(self)
+        # Pre-spawned GDB processes (pool.py), shared by all sessions (sessions.py)
+        self.pool = pool or GDBPool()
+        # Timings of the last start(), in ms
+        self.startup = {}
+        self._start_clock = None
+        # Set once the inferior settled after start() (entry or main), see wait_started()
+        self.started = asyncio.Event()
+        self._startup_stops = 0
+
+    async def log(self, msg: str, *args, level: int = INFO):
+        """Internal logging helper, msg % args is only formatted when read"""
+        self.logs.log("ctrl", level, msg, *args)
 
     async def execute_command(self, cmd: str, timeout: float = 2.0) -> dict:
         """
         Executes a command synchronously (waits for result).
         Returns the payload dict or raises Exception/TimeoutError.
         """
+        results = await self.execute_many([cmd], timeout=timeout)
+        return results[0]
+
+    async def execute_many(self, cmds: list, timeout: float = 2.0, return_exceptions: bool = False) -> list:
+        """
+        Pipelines several commands: all of them are written with a single stdin
+        drain and their replies are collected concurrently.
+        Returns the payloads in the order of `cmds`. With return_exceptions=True
+        failures are returned in place instead of raising (like asyncio.gather).
+        """
         if not self.process:
             raise Exception("GDB not running")
+        if not cmds:
+            return []
+
+        loop = asyncio.get_running_loop()
+        tokens = []
+        futures = []
+        lines = []
+        for cmd in cmds:
+            token = str(next(self._tokens))
+            future = loop.create_future()
+            self.callbacks[token] = future
+            tokens.append(token)
+            futures.append(future)
+            # Command format: [TOKEN]-command
+            lines.append(f"{token}{cmd}")
 
-        # GDB MI tokens must be digits ONLY.
-        token = str(random.randint(100000, 999999))
-        future = asyncio.get_event_loop().create_future()
-        self.callbacks[token] = future
-
-        # Command format: [TOKEN]-command
-        full_cmd = f"{token}{cmd}"
-        
         try:
-            await self.log(f"TX: {cmd}")
-            # Write to stdin
-            self.process.stdin.write(f"{full_cmd}\n".encode())
-            await self.process.stdin.drain()
-            
-            # Wait for response
-            payload = await asyncio.wait_for(future, timeout=timeout)
-            return payload
+            await self._write_lines(lines)
+
+            # Wait for all responses with one shared deadline
+            _, pending = await asyncio.wait(futures, timeout=timeout)
+            for future in pending:
+                future.cancel()
+
+            results = []
+            for future in futures:
+                if future.cancelled():
+                    results.append(asyncio.TimeoutError())
+                elif future.exception() is not None:
+                    results.append(future.exception())
+                else:
+                    results.append(future.result())
+
+            if not return_exceptions:
+                for res in results:
+                    if isinstance(res, BaseException):
+                        raise res
+            return results
         finally:
-            if token in self.callbacks:
-                del self.callbacks[token]
+            for token in tokens:
+                self.callbacks.pop(token, None)
+
+    async def _write_lines(self, lines: list):
+        """Writes a batch of MI lines to stdin and drains once."""
+        process = self.process
+        if not process:
+            raise Exception("GDB not running")
+        for line in lines:
+            self.logs.debug("tx", "%s", line)
+        try:
+            process.stdin.write(("\n".join(lines) + "\n").encode())
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self._fail_pending(f"GDB stdin closed: {e}")
+            raise Exception("GDB not running")
+
+    def _fail_pending(self, reason: str):
+        """Fails every in-flight command future, e.g. when GDB dies."""
+        for future in self.callbacks.values():
+            if not future.done():
+                future.set_exception(Exception(reason))
+        self.callbacks.clear()
 
     async def start(self, binary_path: str):
         await self.stop()
 
         if not os.path.exists(binary_path):
-            await self.msg_queue.put({"type": "error", "payload": f"File not found: {binary_path}"})
+            await self.events.put({"type": "error", "payload": f"File not found: {binary_path}"})
             return
 
-        # stderr -> stdout to prevent deadlocks
-        self.process = await asyncio.create_subprocess_exec(
-            'gdb', '-q', '--interpreter=mi3', '--args', binary_path,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.STDOUT 
-        )
-        
-        await self.log(f"Started process {self.process.pid} for {binary_path}")
-        
+        self.regions.image = os.path.realpath(binary_path)
+        started = time.perf_counter()
+        self.process, warm = await self.pool.acquire()
+        acquired = time.perf_counter()
+        self.startup = {"warm": warm, "acquireMs": round((acquired - started) * 1000, 1)}
+        self._start_clock = started
+
+        await self.log("Started process %s for %s (%s)", self.process.pid, binary_path, "warm" if warm else "cold")
+
         self.io_task = asyncio.create_task(self._read_stdout(self.process))
 
-        # Use starti to stop at entry point immediately (works for stripped binaries)
-        # We don't need to wait for this one strictly, but it's good practice
-        await self.send_command("-interpreter-exec console \"starti\"")
-        
-        # Try to break at main for convenience
+        # One pipelined batch: load the binary, try to break at main (for
+        # convenience), fetch the register names map
+        path = binary_path.replace('\\', '\\\\').replace('"', '\\"')
+        load_res, bkpt_res, names_res = await self.execute_many([
+            f'-file-exec-and-symbols "{path}"',
+            "-break-insert main",
+            "-data-list-register-names",
+        ], timeout=10.0, return_exceptions=True)
+        self.startup["loadMs"] = round((time.perf_counter() - acquired) * 1000, 1)
+
+        if isinstance(load_res, BaseException):
+            await self.events.put({"type": "error", "payload": f"Failed to load {binary_path}: {load_res}"})
+            return
+
+        # Use starti to stop at entry point immediately (works for stripped binaries),
+        # then continue to main if the breakpoint resolved. GDB queues the
+        # continue until the entry stop, so both go in one write.
+        lines = ['-interpreter-exec console "starti"']
+        if isinstance(bkpt_res, dict) and 'bkpt' in bkpt_res:
+            lines.append("-exec-continue")
+        else:
+            # Main not found or other error, stay at entry point
+            await self.log("Main start skipped: %s", bkpt_res)
+        # One *stopped per line: the last one is where the inferior waits for us
+        self._startup_stops = len(lines)
         try:
-            # NOW using execute_command to actually wait for the result!
-            res = await self.execute_command("-break-insert main")
-            # If successful (and we have a breakpoint), continue to main
-            if res and 'bkpt' in res:
-                 await self.send_command("-exec-continue")
+            await self._write_lines(lines)
         except Exception as e:
-            # Main not found or other error, stay at entry point
-            await self.log(f"Main start skipped: {e}")
+            self._startup_stops = 0
+            await self.log("Failed to run %s: %s", binary_path, e, level=ERROR)
+            return
 
-        # Fetch register names map
+        if isinstance(names_res, dict) and 'register-names' in names_res:
+            names = names_res['register-names']
+            self.register_names = names
+            await self.log("Fetching register names success: found %d names", len(names))
+            await self.events.put({
+                "type": "register_names", 
+                "payload": names
+            })
+        else:
+            await self.log("Failed to fetch register names: %s", names_res, level=WARNING)
+
+    async def wait_started(self, timeout: float = 10.0) -> bool:
+        """
+        Waits for the stop that ends start() (memory can't be written while
+        the inferior runs to main). False if it failed or didn't stop in time.
+        """
+        if not self.started.is_set() and not self._startup_stops:
+            return False
         try:
-            # NOW using execute_command to get the names!
-            res = await self.execute_command("-data-list-register-names")
-            if res and 'register-names' in res:
-                names = res['register-names']
-                await self.log(f"Fetching register names success: found {len(names)} names")
-                await self.msg_queue.put({
-                    "type": "register_names", 
-                    "payload": names
-                })
-        except Exception as e:
-            await self.log(f"Failed to fetch register names: {e}")
+            await asyncio.wait_for(self.started.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self.process is not None
 
     async def stop(self):
-        self.callbacks.clear()
+        self._startup_stops = 0
+        self.started.clear()
+        if self.stepping.active:
+            self.stepping.task.cancel()
+        if self.search.active:
+            self.search.task.cancel()
+        self._fail_pending("GDB stopped")
         
         if self.io_task and not self.io_task.done():
             self.io_task.cancel()
@@ -116,7 +249,15 @@ class GDBController:
             finally:
                 self.process = None
         
-        await self.msg_queue.put({"type": "status", "payload": "IDLE"})
+        if self._snapshot_task and not self._snapshot_task.done():
+            self._snapshot_task.cancel()
+        self._snapshot_task = None
+        self.registers.clear()
+        self.memory_cache.invalidate()
+        self._reset_proc_memory()
+        self.regions.clear()
+        self.disassembly.clear()
+        await self.events.put({"type": "status", "payload": "IDLE"})
 
     async def send_command(self, cmd: str):
         """Fire and forget command (or for legacy compatibility)"""
@@ -124,13 +265,16 @@ class GDBController:
             return
         
         try:
-            # Detailed logging of TX
-            await self.msg_queue.put({"type": "system_log", "payload": f"[GDB TX] {cmd}"})
-            self.process.stdin.write(f"{cmd}\n".encode())
-            await self.process.stdin.drain()
-        except (BrokenPipeError, ConnectionResetError):
+            await self._write_lines([cmd])
+        except Exception:
             await self.stop()
 
+    async def set_disassembly_flavor(self, flavor: str):
+        """att / intel. Remembered so cached disassembly is looked up per flavor."""
+        self.disassembly_flavor = flavor
+        await self.pool.configure("disassembly-flavor", flavor)
+        await self.send_command(f"-gdb-set disassembly-flavor {flavor}")
+
     async def write_memory(self, address: str, bytes_list: list) -> bool:
         """Writes bytes to memory using GDB MI command. Returns True on success."""
         if not bytes_list or not self.process: 
@@ -153,16 +297,265 @@ class GDBController:
         
         try:
             await self.execute_command(cmd, timeout=4.0)
-            await self.log(f"WriteMem Success: {address}")
+            await self.log("WriteMem Success: %s", address)
+            try:
+                start = int(address, 16)
+            except ValueError:
+                # Not a plain address: we can't tell which bytes changed
+                self.memory_cache.invalidate()
+                self.disassembly.clear()
+            else:
+                self.memory_cache.update(start, bytes.fromhex(hex_data))
+                self.disassembly.invalidate_range(start, start + len(hex_data) // 2)
             return True
         except Exception as e:
-            await self.log(f"WriteMem Failed: {e}")
+            await self.log("WriteMem Failed: %s", e, level=WARNING)
             return False
 
+    async def write_memory_many(self, chunks: list) -> list:
+        """
+        Writes several [(address int, bytes)] chunks. Adjacent chunks are merged
+        first, so the minimal set of -data-write-memory-bytes commands is sent,
+        all of them pipelined in one batch.
+        Returns the [(address, bytes)] runs that were written successfully.
+        """
+        if not chunks or not self.process:
+            return []
+
+        runs = []
+        for addr, data in sorted(chunks, key=lambda c: c[0]):
+            if not data:
+                continue
+            if runs and runs[-1][0] + len(runs[-1][1]) == addr:
+                runs[-1][1] += data
+            else:
+                runs.append([addr, bytearray(data)])
+
+        cmds = [f"-data-write-memory-bytes 0x{addr:x} {bytes(data).hex()}" for addr, data in runs]
+        results = await self.execute_many(cmds, timeout=4.0, return_exceptions=True)
+
+        written = []
+        for (addr, data), res in zip(runs, results):
+            if isinstance(res, BaseException):
+                await self.log("WriteMem Failed at 0x%x: %s", addr, res or type(res).__name__, level=WARNING)
+                continue
+            self.memory_cache.update(addr, bytes(data))
+            self.disassembly.invalidate_range(addr, addr + len(data))
+            written.append((addr, bytes(data)))
+
+        await self.log("WriteMem: %d/%d runs written", len(written), len(runs))
+        return written
+
     async def read_memory(self, address: str, length: int):
-        """Reads memory bytes. Returns list of ints or None."""
+        """Reads memory bytes. Returns bytes or None."""
         if not self.process: return None
-        
+
+        try:
+            start = int(address, 16)
+        except (TypeError, ValueError):
+            # Expressions like "$sp" can't be cached
+            return await self._read_memory_uncached(address, length)
+
+        direct = await self._direct_memory()
+        if direct:
+            try:
+                data = await direct.read(start, length)
+            except OSError as e:
+                await self._disable_proc_memory(e)
+            else:
+                if data is not None:
+                    return data
+                # Partly unreadable: MI decides what a partial read returns
+
+        if length > LARGE_READ:
+            # Would only churn the page cache: stream it in chunks, up to the first hole
+            data = bytearray()
+            async for addr, size, chunk in self.iter_memory(start, length):
+                if chunk is None:
+                    break
+                data += chunk
+            return bytes(data) if data else None
+
+        data = self.memory_cache.read(start, length)
+        if data is None:
+            await self._fill_memory_cache(start, length)
+            data = self.memory_cache.read(start, length)
+        if data is None:
+            # Range touches an unreadable page: let GDB decide on the exact bytes
+            data = await self._read_memory_uncached(address, length)
+        return data
+
+    async def iter_memory(self, start: int, length: int, chunk: int = READ_CHUNK, window: int = READ_WINDOW):
+        """
+        Streams [start, start+length) as (address, size, bytes or None) pieces, in order.
+        Unmapped parts are known from the region map and never read; unreadable
+        ones come as (address, size, None) too.
+        Bypasses the page cache: meant for ranges far bigger than it.
+        """
+        if await self.regions.refresh():
+            segments = self.regions.split(start, start + length)
+        else:
+            segments = [(start, length, True)]
+
+        for seg_start, seg_size, mapped in segments:
+            if not mapped:
+                yield seg_start, seg_size, None
+                continue
+            async for piece in self._iter_mapped(seg_start, seg_size, chunk, window):
+                yield piece
+
+    async def _iter_mapped(self, start: int, length: int, chunk: int, window: int):
+        """
+        Direct reads if possible, else MI: `window` chunks per pipelined batch,
+        the next batch requested while the current one is consumed, so at most
+        two batches are held in memory.
+        """
+        direct = await self._direct_memory()
+        if direct:
+            pos = start
+            try:
+                async for addr, size, data in direct.iter(start, length):
+                    yield addr, size, data
+                    pos = addr + size
+                return
+            except OSError as e:
+                await self._disable_proc_memory(e)
+            # MI picks up where the direct reads failed
+            length -= pos - start
+            start = pos
+
+        end = start + length
+
+        def batch(pos):
+            pieces = []
+            while pos < end and len(pieces) < window:
+                size = min(chunk, end - pos)
+                pieces.append((pos, size))
+                pos += size
+            return pieces
+
+        pieces = batch(start)
+        pending = asyncio.create_task(self._read_chunks(pieces)) if pieces else None
+        try:
+            while pending:
+                results = await pending
+                last, size = pieces[-1]
+                pieces = batch(last + size)
+                pending = asyncio.create_task(self._read_chunks(pieces)) if pieces else None
+                for piece in results:
+                    yield piece
+        finally:
+            if pending and not pending.done():
+                pending.cancel()
+
+    async def _read_chunks(self, pieces: list) -> list:
+        """One pipelined batch of reads -> [(address, size, bytes or None)], holes split out."""
+        cmds = [f"-data-read-memory-bytes 0x{addr:x} {size}" for addr, size in pieces]
+        results = await self.execute_many(cmds, timeout=10.0, return_exceptions=True)
+
+        out = []
+        for (addr, size), res in zip(pieces, results):
+            pos = addr
+            blocks = res.get('memory', []) if isinstance(res, dict) else []
+            # Partially readable chunks come back as several blocks
+            for block in blocks:
+                try:
+                    begin = int(block['begin'], 16)
+                    data = bytes.fromhex(block.get('contents', ''))
+                except (KeyError, ValueError):
+                    continue
+                if begin > pos:
+                    out.append((pos, begin - pos, None))
+                out.append((begin, len(data), data))
+                pos = begin + len(data)
+            if pos < addr + size:
+                out.append((pos, addr + size - pos, None))
+        return out
+
+    async def _fill_memory_cache(self, start: int, length: int):
+        """Fetches the missing pages of a range, one pipelined MI read per chunk of each contiguous run."""
+        runs = self.memory_cache.missing_runs(start, length)
+        if not runs:
+            return
+        epoch = self.memory_cache.epoch
+        cmds = [f"-data-read-memory-bytes 0x{pos:x} {min(READ_CHUNK, base + size - pos)}"
+                for base, size in runs for pos in range(base, base + size, READ_CHUNK)]
+        results = await self.execute_many(cmds, timeout=4.0, return_exceptions=True)
+
+        for res in results:
+            if not isinstance(res, dict):
+                continue
+            # Partially readable runs come back as several blocks
+            for block in res.get('memory', []):
+                try:
+                    begin = int(block['begin'], 16)
+                    self.memory_cache.store(begin, bytes.fromhex(block.get('contents', '')), epoch)
+                except (KeyError, ValueError):
+                    continue
+
+    async def _direct_memory(self):
+        """The /proc/<pid>/mem backend if it can be used right now, else None (use MI)"""
+        if self.inferior_running or self.proc_memory is False or not self.process:
+            return None
+        if self.proc_memory is not None:
+            return self.proc_memory
+
+        async with self._proc_lock:
+            if self.proc_memory is None:
+                self.proc_memory = await self._probe_proc_memory()
+        return self.proc_memory or None
+
+    async def _probe_proc_memory(self):
+        """
+        Opens /proc/<pid>/mem and checks it shows what GDB shows: a remote
+        target, or a PID from another namespace, would read something else.
+        """
+        try:
+            pid = await self.inferior_pid()
+            if not pid:
+                return None  # not started yet: probe again on the next read
+            res = await self.execute_command("-data-read-memory-bytes $sp 64")
+            block = res['memory'][0]
+            expected = bytes.fromhex(block['contents'])
+            direct = ProcMemory(pid)
+            try:
+                actual = direct.read_sync(int(block['begin'], 16), len(expected))
+            except OSError:
+                direct.close()
+                raise
+            if actual != expected:
+                direct.close()
+                await self.log("Direct memory disabled: /proc/%s/mem does not match GDB (remote target?)", pid)
+                return False
+        except (OSError, KeyError, IndexError) as e:
+            await self.log("Direct memory disabled, using MI: %s", e)
+            return False
+        except Exception as e:
+            await self.log("Direct memory probe failed: %s", e, level=WARNING)
+            return None
+        await self.log("Direct memory reads via /proc/%s/mem", pid)
+        return direct
+
+    async def _disable_proc_memory(self, error):
+        await self.log("Direct memory read failed, back to MI: %s", error, level=WARNING)
+        self._reset_proc_memory()
+        self.proc_memory = False
+
+    def _reset_proc_memory(self):
+        if self.proc_memory:
+            self.proc_memory.close()
+        self.proc_memory = None
+        self.inferior_running = False
+
+    async def inferior_pid(self):
+        """PID of the debugged process, None if it isn't running"""
+        res = await self.execute_command("-list-thread-groups")
+        for group in res.get('groups', []):
+            if group.get('pid'):
+                return int(group['pid'])
+        return None
+
+    async def _read_memory_uncached(self, address: str, length: int):
         cmd = f"-data-read-memory-bytes {address} {length}"
         
         try:
@@ -173,30 +566,30 @@ class GDBController:
             if not memory: return None
             
             hex_str = memory[0].get('contents', '')
-            bytes_list = [int(hex_str[i:i+2], 16) for i in range(0, len(hex_str), 2)]
+            data = bytes.fromhex(hex_str)
             
-            await self.log(f"ReadMem RX: {address} -> {[hex(b) for b in bytes_list]}")
-            return bytes_list
+            self.logs.debug("ctrl", "ReadMem RX: %s -> %s", address, HexBytes(data))
+            return data
         except Exception as e:
-            await self.log(f"ReadMem Error: {e}")
+            await self.log("ReadMem Error: %s", e, level=WARNING)
             return None
 
-
-
     async def _read_stdout(self, process_instance):
         """Main IO Loop with fixed parsing logic"""
         try:
             while True:
                 line = await process_instance.stdout.readline()
                 if not line:
+                    # GDB is gone: nobody will ever answer the in-flight commands
+                    self._fail_pending("GDB exited")
                     break
                 
                 decoded = line.decode('utf-8', errors='replace').strip()
                 
-                # Full logging of all GDB output for debugging
-                await self.msg_queue.put({"type": "system_log", "payload": f"[GDB RX] {decoded}"})
+                # Raw GDB output, stored only when rx=debug is enabled
+                self.logs.debug("rx", "%s", decoded)
 
-                parsed = parse_response(decoded)
+                parsed = parse_line(decoded)
                 
                 if not parsed:
                     continue
@@ -231,7 +624,7 @@ class GDBController:
                              
                              # Handle "No symbol table" error gracefully for binaries without debug symbols
                              if 'No symbol table' in error_msg:
-                                 await self.log(f"Warning: {error_msg} - binary has no debug symbols")
+                                 await self.log("Warning: %s - binary has no debug symbols", error_msg, level=WARNING)
                                  # Don't propagate this as exception for -break-insert
                                  if not future.done():
                                      future.set_result({})  # Treat as success, continue execution
@@ -248,17 +641,40 @@ class GDBController:
 
                 # Async Notifications (No Token)
                 if msg_type == 'notify' and parsed.get('message') == 'stopped':
-                    await self._handle_stop(parsed)
+                    # New stop epoch: cached memory may be stale now
+                    self.memory_cache.invalidate()
+                    self.inferior_running = False
+                    if payload.get('reason', '').startswith('exited'):
+                        self._reset_proc_memory()
+                        self.regions.clear()
+                    if self._start_clock is not None:
+                        self.startup["firstStopMs"] = round((time.perf_counter() - self._start_clock) * 1000, 1)
+                        self._start_clock = None
+                        await self.log("Startup timings: %s", self.startup)
+                    if self._startup_stops:
+                        self._startup_stops -= 1
+                        if not self._startup_stops or payload.get('reason', '').startswith('exited'):
+                            self._startup_stops = 0
+                            self.started.set()
+                    if self.stepping.active:
+                        # Intermediate step: no UI refresh, the engine reports once at the end
+                        self.stepping.on_stop(parsed)
+                    else:
+                        await self._handle_stop(parsed)
+
+                elif msg_type == 'notify' and parsed.get('message') == 'running':
+                    self.memory_cache.invalidate()
+                    self.inferior_running = True
                 
                 elif msg_type == 'result':
                     if 'register-values' in payload:
-                        await self.log(f"Received register values: {len(payload['register-values'])} items")
-                        await self.msg_queue.put({"type": "registers", "payload": payload['register-values']})
+                        await self.log("Received register values: %d items", len(payload['register-values']), level=DEBUG)
+                        await self.events.put({"type": "registers", "payload": payload['register-values']})
                     elif 'asm_insns' in payload:
-                        await self.msg_queue.put({"type": "disassembly", "payload": payload['asm_insns']})
+                        await self.events.put({"type": "disassembly", "payload": payload['asm_insns']})
                     # Handle unexpected results with error messages
                     elif payload and 'msg' in payload:
-                        await self.log(f"GDB unexpected result: {payload.get('msg')}")
+                        await self.log("GDB unexpected result: %s", payload.get('msg'), level=WARNING)
                 
                 elif msg_type == 'target':
                     # Target output (stdout/stderr of the application)
@@ -268,7 +684,7 @@ class GDBController:
                     
                     # Clean up content if needed
                     if content:
-                        await self.msg_queue.put({"type": "target_log", "payload": content})
+                        await self.events.put({"type": "target_log", "payload": content})
 
                 elif msg_type == 'console':
                     # Console output (GDB CLI output). 
@@ -276,7 +692,7 @@ class GDBController:
                     # For now, let's treat it as system log but maybe distinct prefix
                     content = payload
                     if content:
-                         await self.msg_queue.put({"type": "system_log", "payload": f"[GDB] {content}"})
+                         self.logs.info("console", "%s", content)
 
                 elif msg_type == 'log':
                     # Internal GDB logs
@@ -286,27 +702,43 @@ class GDBController:
             raise
         except Exception as e:
             print(f"[GDB] Read Error: {e}")
+            self._fail_pending(f"GDB read error: {e}")
             if process_instance.returncode is not None:
-                await self.msg_queue.put({"type": "status", "payload": "EXITED"})
+                await self.events.put({"type": "status", "payload": "EXITED"})
 
     async def _handle_stop(self, event):
         payload = event.get('payload', {}) or {}
         reason = payload.get('reason', 'unknown')
         thread_id = payload.get('thread-id', None)
         
-        await self.log(f"Stopped: {reason} thread={thread_id}")
+        await self.log("Stopped: %s thread=%s", reason, thread_id)
 
         if thread_id:
-             await self.msg_queue.put({"type": "thread-update", "payload": thread_id})
+             await self.events.put({"type": "thread-update", "payload": thread_id})
 
-        await self.msg_queue.put({"type": "status", "payload": "PAUSED"})
+        await self.events.put({"type": "status", "payload": "PAUSED"})
         
         if reason in ['exited-normally', 'exited']:
-             await self.msg_queue.put({"type": "status", "payload": "EXITED"})
+             await self.events.put({"type": "status", "payload": "EXITED"})
              return
 
-        # Auto-refresh context on stop
-        await self.send_command("-data-list-register-values x")
+        # Auto-refresh context on stop. Runs as its own task: we are inside the
+        # stdout reader here, which has to keep reading the replies.
+        previous = self._snapshot_task
+        self._snapshot_task = asyncio.create_task(self._publish_snapshot(previous, event))
+
+    async def _publish_snapshot(self, previous, event):
+        """One snapshot at a time, in stop order: register deltas build on each other."""
+        if previous and not previous.done():
+            await asyncio.wait([previous])
+        started = time.perf_counter()
+        try:
+            snapshot = await build_stop_snapshot(self, event)
+        except Exception as e:
+            await self.log("Stop snapshot failed: %s", e, level=WARNING)
+            return
+        snapshot["buildMs"] = round((time.perf_counter() - started) * 1000, 1)
+        await self.events.put({"type": "stop_snapshot", "payload": snapshot})
 
     async def get_metadata(self) -> dict:
         """Fetches PID, Architecture and Image Base"""
@@ -315,28 +747,17 @@ class GDBController:
             return metadata
             
         try:
-            # PID
-            # -list-thread-groups --available gives OS PIDs but simpler is via console
-            # inferior 1 usually holds the pid
-            # Or use 'info proc' if available (Linux)
-            res = await self.execute_command("-interpreter-exec console \"info proc\"")
-            # Parse output? info proc output is unstructured text usually.
-            # "process 12345"
-            # Alternative: gdb.inferior_pid? No, we are communicating via MI.
-            
-            # Let's try 'info proc' and parse
-             # Example output: "process 166"
-            if res and 'payload' in res: # payload key? No, console output comes in stream...
-                # execute_command returns the result record. Console output comes via _read_stdout.
-                # Capturing console output from specific command is hard with current architecture 
-                # because it flows to log/stream.
-                pass
+            # PID via -list-thread-groups i1, Architecture via sizeof(void*).
+            # Both are independent, so they go out as one pipelined batch.
+            # ('info proc' is useless here: its output only arrives on the console stream)
+            groups_res, size_res = await self.execute_many([
+                "-list-thread-groups i1",
+                "-data-evaluate-expression \"sizeof(void*)\"",
+            ], return_exceptions=True)
 
-            # Better approach for PID: -list-thread-groups i1
-            res = await self.execute_command("-list-thread-groups i1")
             # ^done,groups=[{id="i1",type="process",pid="166",...}]
             # OR ^done,threads=[{id="1",target-id="Thread ... (LWP 26)",...}]
-            
+            res = groups_res if isinstance(groups_res, dict) else None
             if res:
                 if 'groups' in res and len(res['groups']) > 0:
                      metadata['pid'] = res['groups'][0].get('pid')
@@ -349,35 +770,19 @@ class GDBController:
                         metadata['pid'] = match.group(1)
 
             # Architecture
-            # -data-evaluate-expression $_gdb_setting("architecture") (requires new gdb)
-            # or console "show architecture"
-            
-            # Use Python API via MI? -interpreter-exec  python "import gdb; print(gdb.execute('show architecture', to_string=True))" ?
-            # Simpler: assume getting generic 'architecture' is hard via MI without stream parsing.
-            # But we can try: 
             # -data-evaluate-expression (sizeof(void*)) -> 8 (64bit) or 4 (32bit)
-            res = await self.execute_command("-data-evaluate-expression \"sizeof(void*)\"")
+            res = size_res if isinstance(size_res, dict) else None
             if res and 'value' in res:
                 size = res['value']
                 if '8' in size: metadata['arch'] = 'x86_64'
                 elif '4' in size: metadata['arch'] = 'x86'
 
             # Image Base
-            # Strategy 1: Try reading /proc/{pid}/maps if we have a PID
-            if metadata['pid']:
-                try:
-                    with open(f"/proc/{metadata['pid']}/maps", 'r') as f:
-                        # Read first line
-                        first_line = f.readline()
-                        if first_line:
-                            # Format: 08048000-08049000 r-xp 00000000 08:01 123456 /path/to/binary
-                            parts = first_line.split()
-                            if len(parts) > 0:
-                                range_part = parts[0]
-                                start_addr = range_part.split('-')[0]
-                                metadata['imageBase'] = f"0x{start_addr}"
-                except Exception as e:
-                    await self.log(f"Maps fetch error: {e}")
+            # Strategy 1: lowest mapping of the binary in the region map (/proc/<pid>/maps)
+            if metadata['pid'] and await self.regions.refresh():
+                base = self.regions.image_base()
+                if base is not None:
+                    metadata['imageBase'] = f"0x{base:x}"
 
             # Strategy 2: Fallback to symbol if maps failed
             if not metadata['imageBase']:
@@ -390,7 +795,7 @@ class GDBController:
                      pass
             
         except Exception as e:
-            await self.log(f"Metadata fetch error: {e}")
+            await self.log("Metadata fetch error: %s", e, level=WARNING)
             
         return metadata
 
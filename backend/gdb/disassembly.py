@@ -0,0 +1,313 @@
+import asyncio
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from .log_buffer import WARNING
+
+AVG_INSN_SIZE = 4      # first guess of bytes per instruction (x86)
+MAX_INSN_SIZE = 15     # longest x86 instruction
+MAX_FETCH = 0x1000     # upper bound of one -data-disassemble request
+PREFETCH_COUNT = 100   # instructions prefetched on each side of the viewport
+PAGE_SHIFT = 12        # decoded instructions are cached by 4 KiB page ...
+CACHE_PAGES = 256      # ... the least recently used beyond that many per flavor go
+
+
+def insn_size(insn: dict) -> int:
+    """Instruction length from the raw opcodes of mode 2 ('48 83 ec 08' -> 4)"""
+    return len(insn.get('opcodes', '').split())
+
+
+class BoundaryIndex:
+    """
+    Known instruction starts of the session, as a sorted array-backed table
+    (start address + instruction size). Chains of contiguous instructions
+    give the "N instructions before X" answer with one bisect.
+    """
+
+    def __init__(self):
+        self.starts = array('Q')
+        self.sizes = array('B')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def clear(self):
+        self.starts = array('Q')
+        self.sizes = array('B')
+
+    def add_chain(self, insns: list):
+        """Records a linear sweep (sorted, contiguous insns); it replaces what it covers."""
+        chain = [(int(i['address'], 16), insn_size(i)) for i in insns]
+        chain = [(addr, size) for addr, size in chain if size > 0]
+        if not chain:
+            return
+        lo = chain[0][0]
+        hi = chain[-1][0] + chain[-1][1]
+        i = bisect_left(self.starts, lo)
+        j = bisect_left(self.starts, hi)
+        self.starts[i:j] = array('Q', [addr for addr, _ in chain])
+        self.sizes[i:j] = array('B', [size for _, size in chain])
+
+    def remove_range(self, start: int, end: int):
+        """Forgets instructions overlapping [start, end)."""
+        i = bisect_left(self.starts, start - MAX_INSN_SIZE + 1)
+        j = bisect_left(self.starts, end)
+        keep = [k for k in range(i, j) if self.starts[k] + self.sizes[k] <= start]
+        self.starts[i:j] = array('Q', [self.starts[k] for k in keep])
+        self.sizes[i:j] = array('B', [self.sizes[k] for k in keep])
+
+    def before(self, address: int, count: int) -> list:
+        """Up to `count` contiguous instruction starts ending exactly at `address`."""
+        k = bisect_left(self.starts, address) - 1
+        chain = []
+        expected_end = address
+        while k >= 0 and len(chain) < count:
+            if self.starts[k] + self.sizes[k] != expected_end:
+                break
+            chain.append(self.starts[k])
+            expected_end = self.starts[k]
+            k -= 1
+        chain.reverse()
+        return chain
+
+
+class InsnCache:
+    """Decoded instructions of one flavor by address, bounded to max_pages (LRU by page)"""
+
+    def __init__(self, max_pages: int = CACHE_PAGES):
+        self.pages = OrderedDict()    # page number -> {address: insn}
+        self.max_pages = max_pages
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def get(self, addr: int):
+        page = self.pages.get(addr >> PAGE_SHIFT)
+        if page is None:
+            return None
+        insn = page.get(addr)
+        if insn is not None:
+            self.pages.move_to_end(addr >> PAGE_SHIFT)
+        return insn
+
+    def update(self, insns: dict) -> list:
+        """Stores {address: insn}, returns the [page start] evicted to make room"""
+        for addr, insn in insns.items():
+            key = addr >> PAGE_SHIFT
+            page = self.pages.get(key)
+            if page is None:
+                page = self.pages[key] = {}
+            else:
+                self.pages.move_to_end(key)
+            if addr not in page:
+                self.count += 1
+            page[addr] = insn
+        evicted = []
+        while len(self.pages) > self.max_pages:
+            key, page = self.pages.popitem(last=False)
+            self.count -= len(page)
+            evicted.append(key << PAGE_SHIFT)
+        return evicted
+
+    def discard(self, addr: int):
+        page = self.pages.get(addr >> PAGE_SHIFT)
+        if page is not None and page.pop(addr, None) is not None:
+            self.count -= 1
+
+
+class DisassemblyService:
+    """
+    Returns exactly N decoded instructions from an address, or before it.
+    Decoded instructions are cached per disassembly flavor (CACHE_PAGES pages
+    each, LRU); only the gaps are fetched from GDB. Patches invalidate exactly the instructions whose bytes
+    they touch and bump the patch generation, so a fetch that raced with a
+    patch is never cached.
+    """
+
+    def __init__(self, controller):
+        self.gdb = controller
+        self.cache = {}       # flavor -> InsnCache
+        self.index = BoundaryIndex()
+        self.generation = 0   # patch generation
+        self.hits = 0
+        self.misses = 0
+        self._prefetch_task = None
+
+    def clear(self):
+        self.cache.clear()
+        self.index.clear()
+        self.generation += 1
+        if self._prefetch_task and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+
+    def invalidate_range(self, start: int, end: int):
+        """Drops cached instructions overlapping [start, end)."""
+        self.generation += 1
+        self.index.remove_range(start, end)
+        for insns in self.cache.values():
+            for addr in range(start - MAX_INSN_SIZE + 1, end):
+                insn = insns.get(addr)
+                if insn is not None and addr + insn_size(insn) > start:
+                    insns.discard(addr)
+
+    async def get(self, address: int, count: int) -> list:
+        flavor = self.gdb.disassembly_flavor
+        cached = self.cache.setdefault(flavor, InsnCache())
+        fetched = {}
+
+        result = []
+        addr = address
+        while len(result) < count:
+            insn = cached.get(addr) or fetched.get(addr)
+            if insn is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                fetched.update(await self._fetch(addr, count - len(result), flavor))
+                insn = fetched.get(addr)
+                if insn is None:
+                    break  # unreadable / undecodable memory
+
+            size = insn_size(insn)
+            if size <= 0:
+                break
+            result.append(insn)
+            addr += size
+
+        return result
+
+    def peek(self, address: int, count: int) -> list:
+        """Cached instructions from `address` only, no GDB access (may return fewer)."""
+        cached = self.cache.get(self.gdb.disassembly_flavor)
+        if cached is None:
+            return []
+        result = []
+        addr = address
+        while len(result) < count:
+            insn = cached.get(addr)
+            size = insn_size(insn) if insn else 0
+            if size <= 0:
+                break
+            result.append(insn)
+            addr += size
+        return result
+
+    def fetch_command(self, address: int, count: int) -> str:
+        """The -data-disassemble command get() would send for `count` insns at `address`."""
+        length = min(MAX_FETCH, count * AVG_INSN_SIZE + MAX_INSN_SIZE)
+        return f"-data-disassemble -s 0x{address:x} -e 0x{address + length:x} -- 2"
+
+    def ingest(self, asm_insns: list, generation: int, flavor: str):
+        """Caches the reply of a fetch_command() sent by someone else."""
+        if generation == self.generation and flavor == self.gdb.disassembly_flavor:
+            self.index.add_chain(asm_insns)
+            self._store(asm_insns, flavor)
+
+    async def get_before(self, address: int, count: int) -> list:
+        """The `count` instructions ending exactly at `address` (fewer at unreadable memory)."""
+        if count <= 0:
+            return []
+        chain = self.index.before(address, count)
+        while len(chain) < count:
+            anchor = chain[0] if chain else address
+            await self._sweep_backward(anchor, count - len(chain))
+            longer = self.index.before(address, count)
+            if len(longer) <= len(chain):
+                break  # no progress: start of readable memory
+            chain = longer
+        if not chain:
+            return []
+        # Same linear sweep forward from the first boundary, served from cache
+        return await self.get(chain[0], len(chain))
+
+    async def _sweep_backward(self, anchor: int, count: int):
+        """
+        Finds a linear sweep that lands exactly on `anchor`.
+        x86 decoding resynchronizes after a few instructions, so several
+        candidate start offsets are disassembled in one pipelined batch and
+        the longest one ending on the anchor wins.
+        """
+        generation = self.generation
+        window = min(MAX_FETCH, count * AVG_INSN_SIZE + 2 * MAX_INSN_SIZE)
+        base = max(0, anchor - window)
+        starts = [base + shift for shift in range(MAX_INSN_SIZE) if base + shift < anchor]
+        cmds = [f"-data-disassemble -s 0x{s:x} -e 0x{anchor:x} -- 2" for s in starts]
+        if not cmds:
+            return
+        try:
+            results = await self.gdb.execute_many(cmds, timeout=4.0, return_exceptions=True)
+        except Exception as e:
+            await self.gdb.log("Disassemble Error before 0x%x: %s", anchor, e, level=WARNING)
+            return
+
+        for res in results:
+            if not isinstance(res, dict):
+                continue
+            insns = res.get('asm_insns', [])
+            try:
+                last = insns[-1]
+                synced = int(last['address'], 16) + insn_size(last) == anchor
+            except (IndexError, KeyError, ValueError):
+                continue
+            if synced:
+                if generation == self.generation:
+                    self.index.add_chain(insns)
+                    self._store(insns, self.gdb.disassembly_flavor)
+                return
+
+    def prefetch(self, first: int, end: int):
+        """Warms the cache on both sides of the viewport [first, end) in the background."""
+        if self._prefetch_task and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+        self._prefetch_task = asyncio.create_task(self._prefetch(first, end))
+
+    async def _prefetch(self, first: int, end: int):
+        try:
+            await self.get_before(first, PREFETCH_COUNT)
+            await self.get(end, PREFETCH_COUNT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.gdb.log("Disassembly prefetch failed: %s", e, level=WARNING)
+
+    async def _fetch(self, addr: int, remaining: int, flavor: str) -> dict:
+        generation = self.generation
+        cmd = self.fetch_command(addr, remaining)
+        try:
+            res = await self.gdb.execute_command(cmd, timeout=4.0)
+        except Exception as e:
+            await self.gdb.log("Disassemble Error at 0x%x: %s", addr, e, level=WARNING)
+            return {}
+
+        asm_insns = res.get('asm_insns', [])
+        insns = self._decode(asm_insns)
+
+        # A patch landed (or the flavor changed) while we waited: use, but don't keep
+        self.ingest(asm_insns, generation, flavor)
+        return insns
+
+    def _store(self, asm_insns: list, flavor: str):
+        evicted = self.cache.setdefault(flavor, InsnCache()).update(self._decode(asm_insns))
+        # Boundaries of evicted pages go too, or the index would outgrow the cache
+        for page in evicted:
+            self.index.remove_range(page, page + (1 << PAGE_SHIFT))
+
+    @staticmethod
+    def _decode(asm_insns: list) -> dict:
+        insns = {}
+        for insn in asm_insns:
+            try:
+                insns[int(insn['address'], 16)] = insn
+            except (KeyError, ValueError):
+                continue
+        return insns
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.generation,
+            "cached": {flavor: len(insns) for flavor, insns in self.cache.items()},
+            "boundaries": len(self.index),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,335 @@
+import asyncio
+import itertools
+from collections import deque
+from .registers import merge_registers
+
+# Overflow policies
+COALESCE = "coalesce"          # latest wins: a newer message supersedes the pending one
+DROP_OLDEST = "drop_oldest"    # bounded FIFO: the oldest pending message of that type is dropped
+NEVER_DROP = "never_drop"      # unbounded: must reach the client (errors)
+MERGE = "merge"                # deltas: the pending message is folded into the newer one
+
+# type -> (policy, capacity)
+DEFAULT_POLICIES = {
+    "registers": (COALESCE, 1),
+    "registers_delta": (MERGE, 1),
+    "stop_snapshot": (MERGE, 1),
+    "disassembly": (COALESCE, 1),
+    "status": (COALESCE, 1),
+    "register_names": (COALESCE, 1),
+    "thread-update": (COALESCE, 1),
+    "progress": (COALESCE, 1),
+    "step_progress": (COALESCE, 1),
+    "log_tail": (COALESCE, 1),
+    "target_log": (DROP_OLDEST, 5000),
+    "error": (NEVER_DROP, None),
+    "step_result": (NEVER_DROP, None),
+    "search_progress": (COALESCE, 1),
+    "search_results": (NEVER_DROP, None),
+    "search_done": (NEVER_DROP, None),
+}
+DEFAULT_POLICY = (DROP_OLDEST, 1000)
+
+
+def _merge_register_deltas(old: dict, new: dict) -> dict:
+    payload = dict(new["payload"])
+    payload["registers"] = merge_registers(old["payload"]["registers"], new["payload"]["registers"])
+    return {**new, "payload": payload}
+
+
+def _merge_stop_snapshots(old: dict, new: dict) -> dict:
+    """Newest stop wins, but a register delta has to keep the older changes"""
+    payload = new["payload"]
+    if "registersDelta" not in payload:
+        return new
+    payload = dict(payload)
+    delta = payload.pop("registersDelta")
+    previous = old["payload"]
+    if "registers" in previous:
+        payload["registers"] = merge_registers(previous["registers"], delta)
+    else:
+        payload["registersDelta"] = merge_registers(previous.get("registersDelta", []), delta)
+    return {**new, "payload": payload}
+
+
+# type -> fold(old pending msg, new msg) -> msg, for MERGE types
+MERGERS = {
+    "registers_delta": _merge_register_deltas,
+    "stop_snapshot": _merge_stop_snapshots,
+}
+
+# A full snapshot makes the pending deltas of the same data obsolete
+SUPERSEDES = {
+    "registers": ("registers_delta",),
+}
+
+# Last message of these types is replayed to every new subscriber,
+# so a tab that connects mid-session still gets a consistent view.
+STICKY_TYPES = ("status", "register_names", "registers", "thread-update", "stop_snapshot")
+
+# Per-subscriber backlog limits (in pending messages):
+# above DOWNGRADE_HIGH_WATER the drop-oldest types (logs) of that client are cut
+# down to DOWNGRADED_CAPACITY until it drains below DOWNGRADE_LOW_WATER;
+# above MAX_PENDING it is disconnected.
+DOWNGRADE_HIGH_WATER = 1000
+DOWNGRADE_LOW_WATER = 100
+DOWNGRADED_CAPACITY = 50
+MAX_PENDING = 10000
+
+# Dead (dropped/coalesced) entries are purged from the ordering queue lazily,
+# once there are at least this many of them and they outnumber the live ones.
+COMPACT_THRESHOLD = 1024
+
+
+class EventBus:
+    """
+    Bounded replacement for the plain asyncio.Queue used for WebSocket events.
+    Keeps the global publish order, but every message type has its own capacity
+    and overflow policy, so a stalled consumer can never make memory grow
+    without limit. Same put/get interface as asyncio.Queue.
+    """
+
+    def __init__(self, policies: dict = None, default_policy: tuple = DEFAULT_POLICY):
+        self.policies = dict(DEFAULT_POLICIES)
+        if policies:
+            self.policies.update(policies)
+        self.default_policy = default_policy
+
+        # Entries are mutable [msg, alive] pairs shared by both indexes below
+        self._order = deque()     # global FIFO (may contain dead entries)
+        self._by_type = {}        # type -> deque of live entries (bounded types only)
+        self._live = 0
+        self._dead = 0
+        self._not_empty = asyncio.Event()
+        self.closed = False
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = {}
+        self.coalesced = {}
+
+    def put_nowait(self, msg: dict):
+        if self.closed:
+            return
+        msg_type = msg.get("type")
+        policy, capacity = self.policies.get(msg_type, self.default_policy)
+
+        for obsolete in SUPERSEDES.get(msg_type, ()):
+            pending = self._by_type.get(obsolete)
+            while pending:
+                self._kill(pending.popleft(), self.coalesced, obsolete)
+
+        if policy != NEVER_DROP:
+            pending = self._by_type.setdefault(msg_type, deque())
+            while pending and len(pending) >= capacity:
+                old = pending.popleft()
+                if policy == MERGE:
+                    # Moves to the position of the newer message, like a coalesce
+                    msg = MERGERS[msg_type](old[0], msg)
+                self._kill(old, self.dropped if policy == DROP_OLDEST else self.coalesced, msg_type)
+
+        entry = [msg, True]
+        if policy != NEVER_DROP:
+            pending.append(entry)
+
+        self._order.append(entry)
+        self._live += 1
+        self.published += 1
+
+        if self._dead >= COMPACT_THRESHOLD and self._dead > self._live:
+            self._compact()
+
+        self._not_empty.set()
+
+    def _kill(self, entry: list, counters: dict, msg_type):
+        entry[1] = False
+        self._live -= 1
+        self._dead += 1
+        counters[msg_type] = counters.get(msg_type, 0) + 1
+
+    async def put(self, msg: dict):
+        """Never blocks: overflow is resolved by the type's policy."""
+        self.put_nowait(msg)
+
+    def get_nowait(self) -> dict:
+        while self._order:
+            entry = self._order.popleft()
+            if not entry[1]:
+                self._dead -= 1
+                continue
+
+            entry[1] = False
+            msg = entry[0]
+            pending = self._by_type.get(msg.get("type"))
+            if pending:
+                # Live entries of one type leave in FIFO order, so it is the head
+                pending.popleft()
+            self._live -= 1
+            self.delivered += 1
+            return msg
+
+        self._not_empty.clear()
+        raise asyncio.QueueEmpty()
+
+    async def get(self) -> dict:
+        """Waits for the next message. Returns None once the bus is closed and drained."""
+        while True:
+            try:
+                return self.get_nowait()
+            except asyncio.QueueEmpty:
+                if self.closed:
+                    return None
+                await self._not_empty.wait()
+
+    def close(self):
+        """Stops accepting messages and wakes up waiting consumers."""
+        self.closed = True
+        self._not_empty.set()
+
+    def qsize(self) -> int:
+        return self._live
+
+    def empty(self) -> bool:
+        return self._live == 0
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._live,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": dict(self.dropped),
+            "coalesced": dict(self.coalesced),
+        }
+
+    def _compact(self):
+        self._order = deque(e for e in self._order if e[1])
+        self._dead = 0
+
+
+class Subscription:
+    """One consumer of an EventHub with its own bounded buffer and type filter."""
+
+    def __init__(self, sub_id: int, types=None, policies: dict = None):
+        self.id = sub_id
+        self.types = set(types) if types else None
+        self.buffer = EventBus(policies)
+        self.downgraded = False
+        self.close_reason = None
+        self._full_policies = (self.buffer.policies, self.buffer.default_policy)
+
+    @property
+    def closed(self) -> bool:
+        return self.buffer.closed
+
+    def accepts(self, msg_type) -> bool:
+        return self.types is None or msg_type in self.types
+
+    def offer(self, msg: dict):
+        """Queues a message without ever blocking the publisher."""
+        msg_type = msg.get("type")
+        if self.closed or not self.accepts(msg_type):
+            return
+
+        backlog = self.buffer.qsize()
+        if backlog >= MAX_PENDING:
+            self.close("lagging")
+            return
+        if backlog >= DOWNGRADE_HIGH_WATER and not self.downgraded:
+            self._downgrade()
+
+        self.buffer.put_nowait(msg)
+
+    async def get(self) -> dict:
+        msg = await self.buffer.get()
+        if self.downgraded and self.buffer.qsize() <= DOWNGRADE_LOW_WATER:
+            self.downgraded = False
+            self.buffer.policies, self.buffer.default_policy = self._full_policies
+        return msg
+
+    def _downgrade(self):
+        """Slow client: keep only the tail of its logs, snapshots are unaffected."""
+        def shrink(policy):
+            if policy[0] == DROP_OLDEST:
+                return (DROP_OLDEST, min(policy[1], DOWNGRADED_CAPACITY))
+            return policy
+
+        policies, default_policy = self._full_policies
+        self.buffer.policies = {t: shrink(p) for t, p in policies.items()}
+        self.buffer.default_policy = shrink(default_policy)
+        self.downgraded = True
+
+    def close(self, reason: str = "closed"):
+        if not self.closed:
+            self.close_reason = reason
+            self.buffer.close()
+
+    def stats(self) -> dict:
+        stats = self.buffer.stats()
+        stats.update({
+            "id": self.id,
+            "types": sorted(self.types) if self.types else None,
+            "downgraded": self.downgraded,
+            "closed": self.close_reason,
+        })
+        return stats
+
+
+class EventHub:
+    """
+    Fan-out point for controller events. The controller publishes once and
+    every subscriber (WebSocket client) gets its own bounded EventBus, so a
+    slow or disconnected client cannot block or starve the others.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.sticky = {}
+        self.published = 0
+        self._ids = itertools.count(1)
+
+    def subscribe(self, types=None, policies: dict = None) -> Subscription:
+        sub = Subscription(next(self._ids), types, policies)
+        for msg_type in STICKY_TYPES:
+            if msg_type in self.sticky:
+                sub.offer(self.sticky[msg_type])
+        self.subscribers[sub.id] = sub
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        sub.close("unsubscribed")
+        self.subscribers.pop(sub.id, None)
+
+    def publish(self, msg: dict):
+        self.published += 1
+        msg_type = msg.get("type")
+        if msg_type in STICKY_TYPES:
+            self.sticky[msg_type] = msg
+        if msg_type == "registers_delta":
+            self._track_registers(delta=msg["payload"]["registers"])
+        elif msg_type == "stop_snapshot":
+            # Replayed after `registers`, which already holds its delta (applying it twice is harmless)
+            self._track_registers(msg["payload"].get("registers"), msg["payload"].get("registersDelta"))
+
+        for sub in list(self.subscribers.values()):
+            sub.offer(msg)
+            if sub.closed:
+                # Lagging client: its sender notices on the next get()
+                self.subscribers.pop(sub.id, None)
+
+    def _track_registers(self, full: list = None, delta: list = None):
+        """Keeps the replayed register snapshot current, new tabs never see deltas of the past"""
+        if full is not None:
+            self.sticky["registers"] = {"type": "registers", "payload": full}
+        elif delta and "registers" in self.sticky:
+            snapshot = self.sticky["registers"]
+            self.sticky["registers"] = {**snapshot, "payload": merge_registers(snapshot["payload"], delta)}
+
+    async def put(self, msg: dict):
+        """asyncio.Queue-style alias of publish()"""
+        self.publish(msg)
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "subscribers": [sub.stats() for sub in self.subscribers.values()],
+        }
@@ -0,0 +1,157 @@
+import os
+import time
+import itertools
+from collections import deque
+
+LOG_CAPACITY = int(os.environ.get("GDB_LOG_CAPACITY", "20000"))
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+# Components and their default threshold. Raw MI traffic is off by default:
+# it is most of the volume and only useful when debugging the controller.
+DEFAULT_THRESHOLDS = {
+    "tx": WARNING,       # commands written to GDB
+    "rx": WARNING,       # raw lines read from GDB
+    "console": INFO,     # GDB CLI output (~"...")
+    "ctrl": INFO,        # controller internals
+    "api": INFO,         # REST handlers
+    "db": INFO,          # target DB (write journal errors)
+}
+
+# Written on the entries themselves, as the old pushed messages were
+PREFIXES = {"tx": "[GDB TX] ", "rx": "[GDB RX] ", "console": "[GDB] ", "ctrl": "[GDB-CTRL] ", "api": "",
+            "db": "[DB] "}
+
+
+class HexBytes:
+    """Log argument rendered as hex only if the entry is ever read"""
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __str__(self):
+        return self.data.hex(" ")
+
+
+def parse_levels(spec: str) -> dict:
+    """"rx=debug,tx=info" -> {"rx": 10, "tx": 20}"""
+    levels = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        component, _, name = part.partition("=")
+        if name.lower() not in LEVELS:
+            raise ValueError(f"Unknown log level: {name}")
+        levels[component.strip()] = LEVELS[name.lower()]
+    return levels
+
+
+class LogBuffer:
+    """
+    Server-side ring buffer of the last `capacity` log entries.
+    Entries are stored unformatted (template + args, like the logging module)
+    and only formatted when a client pulls them, and only if their
+    component's level is enabled at all. The System Log window pages
+    through it with /logs; a coalesced `log_tail` event tells it there is
+    something new.
+    """
+
+    def __init__(self, events, capacity: int = LOG_CAPACITY):
+        self.events = events
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        self.thresholds.update(parse_levels(os.environ.get("GDB_LOG_LEVELS", "")))
+        self.entries = deque(maxlen=capacity)   # [seq, time, component, level, msg, args]
+        self._seq = itertools.count(1)
+        self.last_seq = 0
+        self.skipped = 0   # calls below their threshold
+
+    def enabled(self, component: str, level: int) -> bool:
+        return level >= self.thresholds.get(component, INFO)
+
+    def log(self, component: str, level: int, msg: str, *args):
+        """msg % args is done lazily, on read. Cheap no-op for disabled levels."""
+        if level < self.thresholds.get(component, INFO):
+            self.skipped += 1
+            return
+        self.last_seq = next(self._seq)
+        self.entries.append([self.last_seq, time.time(), component, level, msg, args])
+        self.events.publish({"type": "log_tail", "payload": self.last_seq})
+
+    def debug(self, component: str, msg: str, *args):
+        self.log(component, DEBUG, msg, *args)
+
+    def info(self, component: str, msg: str, *args):
+        self.log(component, INFO, msg, *args)
+
+    def warning(self, component: str, msg: str, *args):
+        self.log(component, WARNING, msg, *args)
+
+    def error(self, component: str, msg: str, *args):
+        self.log(component, ERROR, msg, *args)
+
+    def set_levels(self, levels: dict):
+        self.thresholds.update(levels)
+
+    def page(self, after: int = None, before: int = None, limit: int = 200,
+             component: str = None, level: int = DEBUG) -> dict:
+        """
+        Entries with after < seq < before, oldest first. With `before` (or
+        neither bound) it is the newest `limit` of them, with `after` the oldest,
+        so a client can scroll back or follow the tail.
+        """
+        def wanted(e):
+            return ((after is None or e[0] > after) and (before is None or e[0] < before)
+                    and (component is None or e[2] == component) and e[3] >= level)
+
+        if after is not None:
+            # Seqs in the buffer are contiguous: jump straight to after + 1
+            start = max(0, after + 1 - self.entries[0][0]) if self.entries else 0
+            picked = []
+            for e in itertools.islice(self.entries, start, None):
+                if wanted(e):
+                    picked.append(e)
+                    if len(picked) >= limit:
+                        break
+        else:
+            picked = []
+            for e in reversed(self.entries):
+                if wanted(e):
+                    picked.append(e)
+                    if len(picked) >= limit:
+                        break
+            picked.reverse()
+
+        first = self.entries[0][0] if self.entries else self.last_seq + 1
+        return {
+            "entries": [self._render(e) for e in picked],
+            "first": first,   # oldest seq still buffered
+            "last": self.last_seq,
+        }
+
+    @staticmethod
+    def _render(entry: list) -> dict:
+        seq, ts, component, level, msg, args = entry
+        if args:
+            try:
+                msg = msg % args
+            except (TypeError, ValueError):
+                msg = f"{msg} {args!r}"
+            # Formatted once, later pages reuse it
+            entry[4], entry[5] = msg, ()
+        return {
+            "seq": seq,
+            "time": ts,
+            "component": component,
+            "level": LEVEL_NAMES.get(level, str(level)),
+            "message": PREFIXES.get(component, "") + msg,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self.entries),
+            "capacity": self.entries.maxlen,
+            "last": self.last_seq,
+            "skipped": self.skipped,
+            "levels": {c: LEVEL_NAMES.get(l, l) for c, l in self.thresholds.items()},
+        }
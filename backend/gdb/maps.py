@@ -0,0 +1,210 @@
+import asyncio
+from array import array
+from bisect import bisect_right
+from .log_buffer import WARNING
+
+
+def parse_maps(text: str) -> list:
+    """/proc/<pid>/maps -> [{start, end, perms, offset, path}], in address order"""
+    regions = []
+    for line in text.splitlines():
+        # 55d4c8a00000-55d4c8a21000 rw-p 00000000 00:00 0          [heap]
+        parts = line.split(None, 5)
+        if len(parts) < 5:
+            continue
+        start, _, end = parts[0].partition('-')
+        regions.append({
+            "start": int(start, 16),
+            "end": int(end, 16),
+            "perms": parts[1],
+            "offset": int(parts[2], 16),
+            "path": parts[5].strip() if len(parts) > 5 else "",
+        })
+    return regions
+
+
+def read_maps(pid: int) -> list:
+    return parse_maps(read_maps_text(pid))
+
+
+def read_maps_text(pid: int) -> str:
+    with open(f"/proc/{pid}/maps") as f:
+        return f.read()
+
+
+def find_mapping(regions: list, spec: str):
+    """
+    A mapping by address ("0x7ffd..." anywhere inside it) or by path
+    ("[heap]", "[stack]", "libc.so.6"); a path matching several mappings
+    (a library's segments) gives the span from the first to the last one.
+    """
+    try:
+        address = int(spec, 16)
+    except ValueError:
+        matches = [r for r in regions if r["path"] == spec or r["path"].endswith("/" + spec)]
+        if not matches:
+            return None
+        return {**matches[0], "end": matches[-1]["end"]}
+    for r in regions:
+        if r["start"] <= address < r["end"]:
+            return r
+    return None
+
+
+SYSTEM_MAPPINGS = ("[vdso]", "[vvar]", "[vsyscall]", "[vvar_vclock]")
+
+
+def region_kind(region: dict, image: str = None) -> str:
+    """code / image / library / heap / stack / anon / system"""
+    path = region["path"]
+    if path == "[heap]":
+        return "heap"
+    if path.startswith("[stack"):
+        return "stack"
+    if path in SYSTEM_MAPPINGS:
+        return "system"
+    if not path or path.startswith("["):
+        return "anon"
+    if image and path == image:
+        return "code" if "x" in region["perms"] else "image"
+    return "library"
+
+
+def _vm_size(pid: int) -> int:
+    """Total mapped size in pages: moves on every mmap / munmap / brk"""
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[0])
+
+
+class RegionMap:
+    """
+    Index of the inferior's mappings: sorted start/end arrays, bisect lookup.
+    Checked once per stop epoch at most: a moved mapped size (statm) means a
+    re-parse right away, otherwise the maps text is re-read and only parsed
+    if its signature changed (munmap + mmap of the same size, mprotect).
+    `generation` goes up whenever the map content changes.
+    """
+
+    def __init__(self, controller):
+        self.gdb = controller
+        self.pid = None
+        self.image = None        # realpath of the debugged binary
+        self.regions = []
+        self.starts = array('Q')
+        self.ends = array('Q')
+        self.generation = 0
+        self._epoch = None
+        self._vm_size = None
+        self._signature = None   # hash of the maps text last parsed
+        self.parses = 0
+        self.checks = 0
+
+    def clear(self):
+        self.pid = None
+        self.regions = []
+        self.starts = array('Q')
+        self.ends = array('Q')
+        self._epoch = None
+        self._vm_size = None
+        self._signature = None
+        self.generation += 1
+
+    @property
+    def available(self) -> bool:
+        return self.pid is not None
+
+    async def refresh(self, force: bool = False) -> bool:
+        """Brings the index up to date. False if the maps can't be read (remote target...)"""
+        epoch = self.gdb.memory_cache.epoch
+        if not force and self.pid is not None and epoch == self._epoch:
+            return True
+        try:
+            # Same inferior until it exits (clear() then): no MI round trip
+            pid = self.pid or await self.gdb.inferior_pid()
+            if pid is None:
+                self.clear()
+                return False
+            if pid != self.pid:
+                force = True
+            self.checks += 1
+            vm_size = _vm_size(pid)
+            text = await asyncio.to_thread(read_maps_text, pid)
+            signature = hash(text)
+            # statm moving is a sure change; the same size may still be another map
+            if force or vm_size != self._vm_size or signature != self._signature:
+                self._load(pid, parse_maps(text))
+            self._vm_size = vm_size
+            self._signature = signature
+            self._epoch = epoch
+            return True
+        except Exception as e:
+            await self.gdb.log("Region map unavailable: %s", e, level=WARNING)
+            self.clear()
+            return False
+
+    def _load(self, pid: int, regions: list):
+        for r in regions:
+            r["kind"] = region_kind(r, self.image)
+        if pid == self.pid and regions == self.regions:
+            return
+        self.pid = pid
+        self.regions = regions
+        self.starts = array('Q', (r["start"] for r in regions))
+        self.ends = array('Q', (r["end"] for r in regions))
+        self.generation += 1
+        self.parses += 1
+
+    def index_of(self, address: int) -> int:
+        """Index of the region containing address, -1 if unmapped"""
+        i = bisect_right(self.starts, address) - 1
+        if i >= 0 and address < self.ends[i]:
+            return i
+        return -1
+
+    def lookup(self, address: int):
+        i = self.index_of(address)
+        return self.regions[i] if i >= 0 else None
+
+    def classify(self, addresses: list) -> tuple:
+        """Bulk lookup: ([kind or "unmapped"], [region index or -1])"""
+        kinds = []
+        indexes = []
+        for address in addresses:
+            i = self.index_of(address)
+            indexes.append(i)
+            kinds.append(self.regions[i]["kind"] if i >= 0 else "unmapped")
+        return kinds, indexes
+
+    def split(self, start: int, end: int) -> list:
+        """[start, end) -> [(address, size, mapped)] in order, without touching memory"""
+        pieces = []
+        pos = start
+        i = bisect_right(self.starts, pos) - 1
+        if i < 0 or self.ends[i] <= pos:
+            i += 1
+        while pos < end:
+            if i >= len(self.starts) or self.starts[i] >= end:
+                pieces.append((pos, end - pos, False))
+                break
+            if self.starts[i] > pos:
+                pieces.append((pos, self.starts[i] - pos, False))
+                pos = self.starts[i]
+            stop = min(self.ends[i], end)
+            if pieces and pieces[-1][2] and pieces[-1][0] + pieces[-1][1] == pos:
+                pieces[-1] = (pieces[-1][0], pieces[-1][1] + stop - pos, True)
+            else:
+                pieces.append((pos, stop - pos, True))
+            pos = stop
+            i += 1
+        return pieces
+
+    def image_base(self):
+        """Lowest mapping of the debugged binary"""
+        for r in self.regions:
+            if r["kind"] in ("code", "image"):
+                return r["start"]
+        return self.regions[0]["start"] if self.regions else None
+
+    def stats(self) -> dict:
+        return {"pid": self.pid, "regions": len(self.regions), "generation": self.generation,
+                "parses": self.parses, "checks": self.checks}
@@ -0,0 +1,104 @@
+import asyncio
+import errno
+import os
+
+PAGE_SIZE = 0x1000
+PROC_CHUNK = 1 << 20      # bytes per preadv in streaming reads
+INLINE_READ = 64 * 1024   # smaller reads run on the event loop, no thread hop
+
+# preadv on an unmapped / unreadable page
+_HOLE_ERRORS = (errno.EIO, errno.EFAULT, errno.ENXIO)
+
+
+class ProcMemory:
+    """
+    Direct memory backend: reads the inferior through /proc/<pid>/mem with
+    os.preadv into buffers allocated once at their final size. Skips the
+    hex encoding of MI both ways (GDB formatting, us parsing).
+
+    Only valid while the inferior is stopped and local; the controller
+    decides when it may be used and falls back to MI otherwise. Writes
+    still go through MI, so GDB's own caches stay coherent.
+    """
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        # PermissionError here (ptrace restrictions) = not usable, caller falls back
+        self.fd = os.open(f"/proc/{pid}/mem", os.O_RDONLY)
+        self.reads = 0
+        self.bytes_read = 0
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _read_into(self, buf: bytearray, address: int) -> list:
+        """Fills buf from address. Returns the [(offset, size)] holes (unreadable pages)."""
+        view = memoryview(buf)
+        holes = []
+        pos = 0
+        total = len(buf)
+        while pos < total:
+            try:
+                n = os.preadv(self.fd, [view[pos:]], address + pos)
+            except OSError as e:
+                if e.errno not in _HOLE_ERRORS:
+                    raise
+                n = 0
+            if n > 0:
+                pos += n
+                continue
+            # Unreadable page: skip to the next page boundary
+            skip = min(PAGE_SIZE - (address + pos) % PAGE_SIZE, total - pos)
+            if holes and holes[-1][0] + holes[-1][1] == pos:
+                holes[-1] = (holes[-1][0], holes[-1][1] + skip)
+            else:
+                holes.append((pos, skip))
+            view[pos:pos + skip] = bytes(skip)
+            pos += skip
+        self.reads += 1
+        self.bytes_read += total
+        return holes
+
+    def read_sync(self, address: int, length: int):
+        """bytes of exactly `length` (like the MI path), or None if any part is unreadable"""
+        buf = bytearray(length)
+        if self._read_into(buf, address):
+            return None
+        return bytes(buf)
+
+    async def read(self, address: int, length: int):
+        if length <= INLINE_READ:
+            return self.read_sync(address, length)
+        return await asyncio.to_thread(self.read_sync, address, length)
+
+    def _pieces_sync(self, address: int, length: int) -> list:
+        buf = bytearray(length)
+        holes = self._read_into(buf, address)
+        if not holes:
+            return [(address, length, buf)]
+        pieces = []
+        pos = 0
+        view = memoryview(buf)
+        for offset, size in holes:
+            if offset > pos:
+                pieces.append((address + pos, offset - pos, view[pos:offset]))
+            pieces.append((address + offset, size, None))
+            pos = offset + size
+        if pos < length:
+            pieces.append((address + pos, length - pos, view[pos:]))
+        return pieces
+
+    async def iter(self, start: int, length: int, chunk: int = PROC_CHUNK):
+        """Same contract as GDBController.iter_memory: ordered (address, size, bytes or None)"""
+        end = start + length
+        pos = start
+        while pos < end:
+            size = min(chunk, end - pos)
+            for piece in await asyncio.to_thread(self._pieces_sync, pos, size):
+                yield piece
+            pos += size
+
+    def stats(self) -> dict:
+        return {"pid": self.pid, "reads": self.reads, "bytesRead": self.bytes_read}
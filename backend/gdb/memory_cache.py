@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+PAGE_SIZE = 0x1000
+MAX_PAGES = 1024  # 4 MB of cached inferior memory
+
+
+class MemoryCache:
+    """
+    Page-granular cache of inferior memory.
+    Memory can only change behind our back while the inferior runs, so the
+    whole cache belongs to one stop epoch: invalidate() is called on every
+    *stopped / *running notification, our own writes go through update().
+    """
+
+    def __init__(self, page_size: int = PAGE_SIZE, max_pages: int = MAX_PAGES):
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.pages = OrderedDict()  # page base -> bytearray, in LRU order
+        self.epoch = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def invalidate(self):
+        self.epoch += 1
+        self.pages.clear()
+
+    def read(self, address: int, length: int):
+        """Returns the bytes if every page of the range is cached, else None."""
+        first, last = self._page_span(address, length)
+        chunks = []
+        for base in range(first, last, self.page_size):
+            page = self.pages.get(base)
+            if page is None:
+                self.misses += 1
+                return None
+            self.pages.move_to_end(base)
+            chunks.append(page)
+        self.hits += 1
+
+        offset = address - first
+        return bytes(b"".join(chunks)[offset:offset + length])
+
+    def missing_runs(self, address: int, length: int) -> list:
+        """
+        Page-aligned (start, size) ranges that still have to be fetched.
+        Adjacent missing pages are merged into one run, so one MI read covers them.
+        """
+        first, last = self._page_span(address, length)
+        runs = []
+        for base in range(first, last, self.page_size):
+            if base in self.pages:
+                continue
+            if runs and runs[-1][0] + runs[-1][1] == base:
+                runs[-1][1] += self.page_size
+            else:
+                runs.append([base, self.page_size])
+        return [(start, size) for start, size in runs]
+
+    def store(self, address: int, data: bytes, epoch: int):
+        """Caches every complete page inside [address, address+len(data))."""
+        if epoch != self.epoch:
+            return  # fetched before an invalidation, may already be stale
+
+        base = -(-address // self.page_size) * self.page_size  # first full page
+        end = address + len(data)
+        while base + self.page_size <= end:
+            offset = base - address
+            self.pages[base] = bytearray(data[offset:offset + self.page_size])
+            self.pages.move_to_end(base)
+            base += self.page_size
+
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, address: int, data: bytes):
+        """Applies our own write to the cached pages it touches."""
+        end = address + len(data)
+        first, last = self._page_span(address, len(data))
+        for base in range(first, last, self.page_size):
+            page = self.pages.get(base)
+            if page is None:
+                continue
+            lo = max(address, base)
+            hi = min(end, base + self.page_size)
+            page[lo - base:hi - base] = data[lo - address:hi - address]
+
+    def stats(self) -> dict:
+        return {
+            "epoch": self.epoch,
+            "pages": len(self.pages),
+            "maxPages": self.max_pages,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _page_span(self, address: int, length: int):
+        first = address - address % self.page_size
+        end = address + max(length, 1)
+        last = -(-end // self.page_size) * self.page_size
+        return first, last
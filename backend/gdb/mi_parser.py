@@ -0,0 +1,112 @@
+import re
+from pygdbmi.gdbmiparser import parse_response
+from pygdbmi.gdbescapes import advance_past_string_with_gdb_escapes
+
+# Records worth the fast path: the big ones (memory, asm_insns, register
+# values) and the ones on every stop. Everything else goes to pygdbmi.
+_HOT_RECORD = re.compile(
+    r'(\d*)(?:\^(done)(?=,(?:memory|asm_insns|register-values|changed-registers)=)|\*(stopped)(?=,|$))'
+)
+_KEY = re.compile(r'[\w-]+(?==)')
+
+
+class _Unsupported(Exception):
+    """Not the simple shape the fast path handles: let pygdbmi decide"""
+
+
+def _string(s: str, pos: int):
+    """pos is just after the opening quote. Returns (value, position after the closing one)."""
+    end = s.find('"', pos)
+    if end < 0:
+        raise _Unsupported()
+    if s.find('\\', pos, end) < 0:
+        # No escapes: one C-level slice, whatever the length (memory contents)
+        return s[pos:end], end + 1
+    return advance_past_string_with_gdb_escapes(s, start=pos)
+
+
+def _value(s: str, pos: int):
+    c = s[pos:pos + 1]
+    if c == '"':
+        return _string(s, pos + 1)
+    if c == '{':
+        return _results(s, pos + 1, '}')
+    if c == '[':
+        return _list(s, pos + 1)
+    raise _Unsupported()
+
+
+def _results(s: str, pos: int, close: str):
+    """key=value,... up to `close` ('' = end of line). Repeated keys become lists, as in pygdbmi."""
+    obj = {}
+    n = len(s)
+    if s[pos:pos + 1] == close:
+        return obj, pos + 1
+    while True:
+        m = _KEY.match(s, pos)
+        if m is None:
+            raise _Unsupported()
+        key = m.group()
+        val, pos = _value(s, m.end() + 1)
+        if key in obj:
+            if isinstance(obj[key], list):
+                obj[key].append(val)
+            else:
+                obj[key] = [obj[key], val]
+        else:
+            obj[key] = val
+
+        c = s[pos:pos + 1]
+        if c == ',':
+            pos += 1
+        elif c == close:
+            return obj, (pos + 1 if pos < n else pos)
+        else:
+            raise _Unsupported()
+
+
+def _list(s: str, pos: int):
+    """[value,...] or [key=value,...]; keys inside lists are dropped, as in pygdbmi."""
+    arr = []
+    if s[pos:pos + 1] == ']':
+        return arr, pos + 1
+    while True:
+        m = _KEY.match(s, pos)
+        if m is not None:
+            pos = m.end() + 1
+        val, pos = _value(s, pos)
+        arr.append(val)
+
+        c = s[pos:pos + 1]
+        if c == ',':
+            pos += 1
+        elif c == ']':
+            return arr, pos + 1
+        else:
+            raise _Unsupported()
+
+
+def parse_fast(line: str):
+    """Parses a hot record into pygdbmi's format, or returns None if the line isn't one."""
+    m = _HOT_RECORD.match(line)
+    if m is None:
+        return None
+    token, result, notify = m.groups()
+    try:
+        payload, _ = _results(line, m.end() + 1, '') if m.end() < len(line) else (None, 0)
+    except (_Unsupported, IndexError):
+        return None
+    return {
+        "type": "result" if result else "notify",
+        "message": result or notify,
+        "payload": payload,
+        "token": int(token) if token else None,
+    }
+
+
+def parse_line(line: str) -> dict:
+    """Drop-in for pygdbmi's parse_response: fast path first, pygdbmi for the rest."""
+    parsed = parse_fast(line)
+    if parsed is None:
+        parsed = parse_response(line)
+    return parsed
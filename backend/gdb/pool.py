@@ -0,0 +1,216 @@
+import asyncio
+import itertools
+import os
+import resource
+import time
+from collections import deque
+from .mi_parser import parse_line
+
+POOL_SIZE = int(os.environ.get("GDB_POOL_SIZE", "1"))
+WARMUP_TIMEOUT = 10.0
+# One MI record is one line: a 16 MB memory read is a 32 MB line.
+# asyncio's default readline() limit (64 KB) would fail on anything above 32 KB.
+MI_LINE_LIMIT = 64 << 20
+
+# Per-session limits of every GDB, inherited by the inferior it runs (0 = none)
+SESSION_MEMORY_MB = int(os.environ.get("GDB_SESSION_MEMORY_MB", "0"))
+SESSION_CPU_SECONDS = int(os.environ.get("GDB_SESSION_CPU_SECONDS", "0"))
+
+# Applied to every pooled GDB before it is handed out
+BASE_SETTINGS = {
+    "confirm": "off",
+    "pagination": "off",
+    "width": "0",
+    "height": "0",
+}
+
+
+def _limit_resources():
+    """Runs in the child before exec"""
+    if SESSION_MEMORY_MB:
+        size = SESSION_MEMORY_MB << 20
+        resource.setrlimit(resource.RLIMIT_AS, (size, size))
+    if SESSION_CPU_SECONDS:
+        resource.setrlimit(resource.RLIMIT_CPU, (SESSION_CPU_SECONDS, SESSION_CPU_SECONDS))
+
+
+class GDBPool:
+    """
+    Keeps `size` idle GDB processes already running in MI3 mode, with the
+    settings applied, so a session start only has to load the binary.
+    Idle processes have no executable yet; acquire() hands one out and
+    refills the pool in the background.
+    """
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self.settings = dict(BASE_SETTINGS)
+        self.idle = deque()       # (process, applied settings)
+        self._warming = set()     # spawn tasks in flight
+        self._lock = asyncio.Lock()
+        self._tokens = itertools.count(1)
+        self.closed = False
+
+        self.warm_hits = 0
+        self.cold_starts = 0
+        self.last_spawn_ms = None
+        self.last_error = None
+
+    def fill(self):
+        """Tops the pool up to `size` in the background."""
+        if self.closed:
+            return
+        missing = self.size - len(self.idle) - len(self._warming)
+        for _ in range(missing):
+            task = asyncio.create_task(self._warm_one())
+            self._warming.add(task)
+            task.add_done_callback(self._warming.discard)
+
+    async def acquire(self):
+        """Returns (process, warm). Falls back to a cold spawn if the pool is empty."""
+        while True:
+            async with self._lock:
+                while self.idle:
+                    process, applied = self.idle.popleft()
+                    if process.returncode is not None:
+                        continue  # died while idle
+                    if applied != self.settings and not await self._reapply(process, applied):
+                        continue  # killed: next idle one, or a cold spawn
+                    self.warm_hits += 1
+                    self.fill()
+                    return process, True
+
+            if not self._warming:
+                break
+            # A warm one is almost ready: usually faster than a cold spawn
+            await asyncio.wait(set(self._warming), return_when=asyncio.FIRST_COMPLETED)
+            if not self.idle:
+                break
+
+        self.cold_starts += 1
+        process, _ = await self._spawn()
+        self.fill()
+        return process, False
+
+    async def configure(self, name: str, value: str):
+        """Changes a setting for every future session, idle processes included."""
+        self.settings[name] = value
+        async with self._lock:
+            for entry in list(self.idle):
+                process, applied = entry
+                if process.returncode is None and not await self._reapply(process, applied):
+                    self.idle.remove(entry)
+        self.fill()
+
+    async def close(self):
+        self.closed = True
+        for task in list(self._warming):
+            task.cancel()
+        async with self._lock:
+            while self.idle:
+                process, _ = self.idle.popleft()
+                await self._terminate(process)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self.idle),
+            "warming": len(self._warming),
+            "warmHits": self.warm_hits,
+            "coldStarts": self.cold_starts,
+            "lastSpawnMs": self.last_spawn_ms,
+            "lastError": self.last_error,
+            "limits": {"memoryMb": SESSION_MEMORY_MB, "cpuSeconds": SESSION_CPU_SECONDS},
+        }
+
+    async def _warm_one(self):
+        try:
+            process, applied = await self._spawn()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"[GDB-POOL] Warm-up failed: {self.last_error}")
+            return
+
+        async with self._lock:
+            if not self.closed:
+                self.idle.append((process, applied))
+                return
+        await self._terminate(process)
+
+    async def _spawn(self):
+        started = time.perf_counter()
+        # stderr -> stdout to prevent deadlocks
+        process = await asyncio.create_subprocess_exec(
+            'gdb', '-q', '--interpreter=mi3',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            limit=MI_LINE_LIMIT,
+            preexec_fn=_limit_resources if SESSION_MEMORY_MB or SESSION_CPU_SECONDS else None
+        )
+        applied = {}
+        try:
+            await self._apply(process, applied)
+        except BaseException:
+            await self._terminate(process)
+            raise
+        self.last_spawn_ms = round((time.perf_counter() - started) * 1000, 1)
+        return process, applied
+
+    async def _reapply(self, process, applied: dict) -> bool:
+        """_apply() on an idle process; one that fails is killed (False), never handed out"""
+        try:
+            await self._apply(process, applied)
+            return True
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"[GDB-POOL] Dropping idle process: {self.last_error}")
+            await self._terminate(process)
+            return False
+        except BaseException:
+            await self._terminate(process)
+            raise
+
+    async def _apply(self, process, applied: dict):
+        """Sends the settings that differ from `applied` and waits for their replies."""
+        cmds = [f"-gdb-set {k} {v}" for k, v in self.settings.items() if applied.get(k) != v]
+        if cmds:
+            await asyncio.wait_for(self._run(process, cmds), WARMUP_TIMEOUT)
+        applied.clear()
+        applied.update(self.settings)
+
+    async def _run(self, process, cmds: list):
+        """
+        Pipelines commands on a process nobody else reads from yet, and consumes
+        output up to the last reply, so the controller starts on a quiet stream.
+        """
+        lines = []
+        tokens = set()
+        for cmd in cmds:
+            token = str(next(self._tokens))
+            tokens.add(token)
+            lines.append(f"{token}{cmd}")
+        process.stdin.write(("\n".join(lines) + "\n").encode())
+        await process.stdin.drain()
+
+        while tokens:
+            line = await process.stdout.readline()
+            if not line:
+                raise Exception("GDB exited during warm-up")
+            parsed = parse_line(line.decode('utf-8', errors='replace').strip())
+            if parsed.get('type') == 'result' and parsed.get('token') is not None:
+                tokens.discard(str(parsed['token']))
+                if parsed.get('message') == 'error':
+                    # A rejected setting: this process must not be handed out
+                    msg = (parsed.get('payload') or {}).get('msg', 'GDB Error')
+                    raise Exception(f"Warm-up command failed: {msg}")
+
+    @staticmethod
+    async def _terminate(process):
+        try:
+            process.terminate()
+            await process.wait()
+        except ProcessLookupError:
+            pass
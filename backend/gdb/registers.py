@@ -0,0 +1,139 @@
+from .log_buffer import WARNING
+
+FULL_RESYNC_EVERY = 32  # stops between two full register fetches of a thread
+
+
+def merge_registers(base: list, delta: list) -> list:
+    """Applies [{number, value}] changes to a register list (new list, same order)."""
+    changes = {r['number']: r for r in delta}
+    merged = [changes.pop(r['number'], r) for r in base]
+    merged.extend(changes.values())
+    return merged
+
+
+class RegisterCache:
+    """
+    Authoritative register values per thread, kept up to date with
+    -data-list-changed-registers: on a stop only the registers that changed
+    are fetched. A full fetch is done for a thread's first stop, after a
+    thread switch, and every FULL_RESYNC_EVERY stops.
+
+    A refresh is split in plan() / commands() / apply() so the stop snapshot
+    can pipeline it with its other reads. The values of the registers that
+    changed on the previous stop are fetched speculatively in that same
+    batch; a second round trip is only needed for registers outside that set.
+    """
+
+    def __init__(self, controller):
+        self.gdb = controller
+        self.threads = {}      # thread id -> {number: value}
+        self.stops = {}        # thread id -> stops since the last full fetch
+        self.hot = {}          # thread id -> numbers that changed on the last stop
+        self.last_thread = None
+        self.full_fetches = 0
+        self.delta_fetches = 0
+        self.second_trips = 0
+
+    def clear(self):
+        self.threads.clear()
+        self.stops.clear()
+        self.hot.clear()
+        self.last_thread = None
+
+    def plan(self, thread_id) -> dict:
+        """Decides full vs delta for this stop of `thread_id` (the selected thread)."""
+        thread_id = thread_id or "1"
+        stops = self.stops.get(thread_id, 0) + 1
+        self.stops[thread_id] = stops
+
+        # GDB diffs against the registers of its previous call, whatever thread
+        # that was: only trust the delta while we stay on the same thread.
+        same_thread = thread_id == self.last_thread
+        self.last_thread = thread_id
+
+        full = thread_id not in self.threads or not same_thread or stops >= FULL_RESYNC_EVERY
+        return {"thread": thread_id, "full": full, "speculative": sorted(self.hot.get(thread_id, ()), key=int)}
+
+    def commands(self, plan: dict) -> list:
+        # The changed-registers call also resets GDB's baseline for the next delta
+        cmds = ["-data-list-changed-registers"]
+        if plan["full"]:
+            cmds.append("-data-list-register-values x")
+        elif plan["speculative"]:
+            cmds.append(f"-data-list-register-values x {' '.join(plan['speculative'])}")
+        return cmds
+
+    async def apply(self, plan: dict, results: list) -> dict:
+        """
+        Takes the replies of commands(plan). Returns {"registers": full list},
+        {"registersDelta": changed registers} or {} (nothing changed / failed).
+        """
+        thread_id = plan["thread"]
+        changed_res = results[0]
+        values_res = results[1] if len(results) > 1 else {}
+
+        if plan["full"]:
+            if not isinstance(values_res, dict) or 'register-values' not in values_res:
+                await self.gdb.log("Failed to fetch registers: %s", values_res, level=WARNING)
+                return {}
+            values = values_res['register-values']
+            self.threads[thread_id] = {r['number']: r['value'] for r in values}
+            self.stops[thread_id] = 0
+            self.hot[thread_id] = set()
+            self.full_fetches += 1
+            return {"registers": values}
+
+        if isinstance(changed_res, BaseException) or isinstance(values_res, BaseException):
+            await self.gdb.log("Register delta failed, resyncing: %s",
+                               changed_res if isinstance(changed_res, BaseException) else values_res,
+                               level=WARNING)
+            self.stops[thread_id] = FULL_RESYNC_EVERY
+            plan = {**plan, "full": True}
+            return await self.apply(plan, await self._execute(self.commands(plan)))
+
+        self.delta_fetches += 1
+        changed = changed_res.get('changed-registers', [])
+        fetched = {r['number']: r for r in values_res.get('register-values', [])}
+        missing = [n for n in changed if n not in fetched]
+        if missing:
+            self.second_trips += 1
+            res = await self._execute([f"-data-list-register-values x {' '.join(missing)}"])
+            if isinstance(res[0], BaseException):
+                await self.gdb.log("Register delta failed: %s", res[0], level=WARNING)
+                self.stops[thread_id] = FULL_RESYNC_EVERY
+                return {}
+            fetched.update({r['number']: r for r in res[0].get('register-values', [])})
+
+        cached = self.threads[thread_id]
+        delta = []
+        for number in changed:
+            reg = fetched.get(number)
+            # Changed-registers also reports writes that restored the old value
+            if reg is not None and cached.get(number) != reg['value']:
+                cached[number] = reg['value']
+                delta.append(reg)
+        self.hot[thread_id] = set(changed)
+        return {"registersDelta": delta} if delta else {}
+
+    async def refresh(self, thread_id):
+        """Stand-alone refresh, published as `registers` / `registers_delta`."""
+        plan = self.plan(thread_id)
+        update = await self.apply(plan, await self._execute(self.commands(plan)))
+        if "registers" in update:
+            await self.gdb.events.put({"type": "registers", "payload": update["registers"]})
+        elif "registersDelta" in update:
+            await self.gdb.events.put({
+                "type": "registers_delta",
+                "payload": {"thread": plan["thread"], "registers": update["registersDelta"]}
+            })
+
+    async def _execute(self, cmds: list) -> list:
+        return await self.gdb.execute_many(cmds, timeout=4.0, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "threads": {tid: len(regs) for tid, regs in self.threads.items()},
+            "fullFetches": self.full_fetches,
+            "deltaFetches": self.delta_fetches,
+            "secondTrips": self.second_trips,
+        }
@@ -0,0 +1,230 @@
+import asyncio
+import re
+import time
+from .log_buffer import WARNING
+
+SCAN_BLOCK = 8 << 20        # contiguous bytes handed to one scan (thread hop)
+MAX_RESULTS = 100_000       # hard cap of one search
+PROGRESS_INTERVAL = 0.25    # seconds between two search_progress messages
+INT_WIDTHS = (1, 2, 4, 8)
+
+# Never worth scanning by default: [vvar] can't be read, [vsyscall] is fixed
+SKIPPED_KINDS = ("system",)
+
+
+def compile_pattern(kind: str, value, width: int = 4, big_endian: bool = False,
+                    ignore_case: bool = False):
+    """
+    -> (needle bytes or None, compiled regex or None, length). Exactly one of
+    needle / regex is set: plain byte strings go through bytes.find, patterns
+    with wildcards (or case-insensitive strings) through re.
+
+      bytes   "48 8b ?? 24 ??"  hex, ?? = any byte (spaces optional)
+      ascii   "password"        latin-1 text
+      utf16   "password"        UTF-16LE text
+      int     "0xdeadbeef"/-1   integer of `width` bytes (1, 2, 4, 8)
+    """
+    if kind == "bytes":
+        text = re.sub(r"\s+", "", str(value))
+        if not text or len(text) % 2 or not re.fullmatch(r"(?:[0-9a-fA-F]{2}|\?\?)+", text):
+            raise ValueError("Byte pattern must be hex pairs or ??")
+        tokens = [text[i:i + 2] for i in range(0, len(text), 2)]
+        if tokens[0] == "??" or tokens[-1] == "??":
+            raise ValueError("Byte pattern can't start or end with a wildcard")
+        if "??" not in tokens:
+            needle = bytes.fromhex(text)
+            return needle, None, len(needle)
+        source = b"".join(b"." if t == "??" else re.escape(bytes.fromhex(t)) for t in tokens)
+        return None, re.compile(source, re.DOTALL), len(tokens)
+
+    if kind in ("ascii", "utf16"):
+        if not value:
+            raise ValueError("Empty string")
+        needle = str(value).encode("latin-1" if kind == "ascii" else "utf-16-le")
+        if not ignore_case:
+            return needle, None, len(needle)
+        if kind == "ascii":
+            return None, re.compile(re.escape(needle), re.IGNORECASE), len(needle)
+        # UTF-16: each character as a [Xx]\x00 class, re's IGNORECASE would miss the NULs
+        source = b"".join(
+            b"[" + re.escape(c.lower().encode("latin-1")) + re.escape(c.upper().encode("latin-1")) + b"]\\x00"
+            if c.isalpha() and c.isascii() else re.escape(c.encode("utf-16-le"))
+            for c in str(value)
+        )
+        return None, re.compile(source, re.DOTALL), len(needle)
+
+    if kind == "int":
+        if width not in INT_WIDTHS:
+            raise ValueError(f"Integer width must be one of {INT_WIDTHS}")
+        number = value if isinstance(value, int) else int(str(value), 0)
+        if not -(1 << (width * 8 - 1)) <= number < (1 << (width * 8)):
+            raise ValueError(f"{value} doesn't fit in {width} bytes")
+        needle = number.to_bytes(width, "big" if big_endian else "little", signed=number < 0)
+        return needle, None, width
+
+    raise ValueError(f"Unknown pattern kind: {kind}")
+
+
+def scan(needle, regex, data, base: int, limit: int, align: int = 1) -> list:
+    """Start addresses of every (overlapping) match in data, at most `limit`"""
+    hits = []
+    if needle is not None:
+        find = data.find
+        pos = find(needle)
+        while pos >= 0 and len(hits) < limit:
+            if (base + pos) % align == 0:
+                hits.append(base + pos)
+            pos = find(needle, pos + 1)
+        return hits
+    search = regex.search
+    m = search(data)
+    while m is not None and len(hits) < limit:
+        pos = m.start()
+        if (base + pos) % align == 0:
+            hits.append(base + pos)
+        m = search(data, pos + 1)
+    return hits
+
+
+class _Aborted(Exception):
+    """Search stopped on its own: cancel() or the inferior resumed"""
+
+
+class SearchEngine:
+    """
+    Pattern search over inferior memory, inside the controller (one at a
+    time). Ranges are read with iter_memory (direct backend when it can,
+    unmapped gaps skipped), glued into SCAN_BLOCK runs and scanned in a
+    worker thread while the next run is being read. The last length-1 bytes
+    of a run are carried over to the next one, so matches across chunk
+    boundaries are found, exactly once.
+
+    Results go out as they're found (`search_results`, batches of hits),
+    with a throttled `search_progress` and a final `search_done`. They're
+    also kept on the engine for GET /memory/search.
+    """
+
+    def __init__(self, controller):
+        self.gdb = controller
+        self.task = None
+        self.id = 0
+        self.results = []
+        self.status = None
+        self._cancelled = False
+
+    @property
+    def active(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self, ranges: list, needle, regex, length: int, limit: int = MAX_RESULTS, align: int = 1):
+        if self.active:
+            raise Exception("Already searching")
+        self.id += 1
+        self.results = []
+        self._cancelled = False
+        self.status = {
+            "id": self.id, "state": "running", "ranges": len(ranges),
+            "total": sum(size for _, size in ranges), "scanned": 0, "matches": 0,
+        }
+        self.task = asyncio.create_task(self._run(self.id, ranges, needle, regex, length,
+                                                  min(limit, MAX_RESULTS), align))
+        return self.id
+
+    def cancel(self) -> bool:
+        if not self.active:
+            return False
+        self._cancelled = True
+        return True
+
+    async def _run(self, search_id, ranges, needle, regex, length, limit, align):
+        started = time.perf_counter()
+        last_progress = started
+        overlap = length - 1
+        pending = None      # scan of the previous block, runs while the next one is read
+        reason = "done"
+
+        async def collect(job):
+            nonlocal last_progress
+            hits = (await job)[:limit - len(self.results)]
+            if hits:
+                self.results.extend(hits)
+                await self.gdb.events.put({
+                    "type": "search_results",
+                    "payload": {"id": search_id, "matches": [hex(a) for a in hits]}
+                })
+            self.status["matches"] = len(self.results)
+            now = time.perf_counter()
+            if now - last_progress >= PROGRESS_INTERVAL:
+                last_progress = now
+                await self.gdb.events.put({"type": "search_progress", "payload": dict(self.status)})
+
+        def submit(block, base):
+            # block is never touched again once submitted: a new one is started
+            return asyncio.create_task(asyncio.to_thread(
+                scan, needle, regex, block, base, limit - len(self.results), align))
+
+        try:
+            for range_start, range_size in ranges:
+                block = bytearray()
+                block_start = range_start
+                memory = self.gdb.iter_memory(range_start, range_size)
+                async for address, size, data in memory:
+                    if self._cancelled:
+                        raise _Aborted("cancelled")
+                    if self.gdb.inferior_running:
+                        raise _Aborted("resumed")
+                    self.status["scanned"] += size
+                    if data is None:
+                        # Hole: nothing can match across it
+                        if len(block) >= length:
+                            job = submit(block, block_start)
+                            if pending:
+                                await collect(pending)
+                            pending = job
+                        block = bytearray()
+                        block_start = address + size
+                        continue
+                    if not block:
+                        block_start = address
+                    block += data
+                    if len(block) >= SCAN_BLOCK:
+                        job = submit(block, block_start)
+                        if pending:
+                            await collect(pending)
+                        pending = job
+                        if len(self.results) >= limit:
+                            await memory.aclose()
+                            break
+                        # Carry the tail: a match starting there ends in the next block
+                        keep = block[len(block) - overlap:] if overlap else bytearray()
+                        block_start = address + size - len(keep)
+                        block = bytearray(keep)
+                if len(block) >= length and len(self.results) < limit:
+                    job = submit(block, block_start)
+                    if pending:
+                        await collect(pending)
+                    pending = job
+                if len(self.results) >= limit:
+                    reason = "limit"
+                    break
+            if pending:
+                await collect(pending)
+                pending = None
+            if len(self.results) >= limit:
+                reason = "limit"
+        except _Aborted as e:
+            reason = str(e)
+            await memory.aclose()
+        except asyncio.CancelledError:
+            if pending:
+                pending.cancel()
+            raise
+        except Exception as e:
+            reason = "error"
+            await self.gdb.log("Memory search failed: %s", e, level=WARNING)
+
+        elapsed = time.perf_counter() - started
+        self.status.update(state=reason, matches=len(self.results), ms=round(elapsed * 1000, 1))
+        await self.gdb.log("Search %s: %d matches in %.1f MB, %.2fs (%s)", search_id, len(self.results),
+                           self.status['scanned'] / 1e6, elapsed, reason)
+        await self.gdb.events.put({"type": "search_done", "payload": dict(self.status)})
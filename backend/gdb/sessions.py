@@ -0,0 +1,186 @@
+import asyncio
+import os
+import re
+import secrets
+import time
+from contextvars import ContextVar
+
+from .controller import GDBController
+from .pool import GDBPool
+
+DEFAULT_SESSION = "default"
+MAX_SESSIONS = int(os.environ.get("GDB_MAX_SESSIONS", "8"))
+# Seconds without a request or a connected client before a session is closed (0 = never)
+IDLE_TIMEOUT = float(os.environ.get("GDB_SESSION_IDLE", "1800"))
+REAP_INTERVAL = 60.0
+
+SESSION_ID = re.compile(r"[\w-]{1,64}")
+
+# Session of the request being handled (the object: a closed one stays closed),
+# set by app/middleware.py. None = the default session.
+current_session = ContextVar("gdb_session", default=None)
+
+
+class SessionClosed(Exception):
+    """The request's session was closed (DELETE or reaped) while it ran"""
+
+
+class Session:
+    """
+    One debugging session: its own GDB process, event hub, logs and caches
+    (all inside the controller), plus the per-target state the routers keep
+    (DB manager, trace store and its index lock, last opened binary).
+    """
+
+    def __init__(self, session_id: str, pool: GDBPool):
+        self.id = session_id
+        self.controller = GDBController(pool=pool)
+        self.db_manager = None
+        self.trace_store = None
+        self.trace_lock = asyncio.Lock()   # index builds of this session's trace
+        self.last_opened_path = "/targets/hello" if session_id == DEFAULT_SESSION else None
+        self.created = time.time()
+        self.last_used = time.monotonic()
+        self.clients = 0      # open WebSockets: a watched session is never idle
+        self.closed = False
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def idle_for(self) -> float:
+        if self.clients or self.controller.stepping.active or self.controller.search.active:
+            return 0.0
+        return time.monotonic() - self.last_used
+
+    async def close(self):
+        self.closed = True
+        await self.controller.stop()
+        if self.trace_store:
+            self.trace_store.close()
+            self.trace_store = None
+        if self.db_manager:
+            # Commits its queued writes first
+            await asyncio.to_thread(self.db_manager.close)
+            self.db_manager = None
+
+    def info(self) -> dict:
+        gdb = self.controller
+        return {
+            "id": self.id,
+            "target": self.last_opened_path,
+            "running": gdb.process is not None and gdb.process.returncode is None,
+            "clients": self.clients,
+            "created": self.created,
+            "idleSeconds": round(self.idle_for(), 1),
+        }
+
+
+class SessionRegistry:
+    """
+    Sessions by ID. All of them share one pool of pre-spawned GDB processes;
+    the default session always exists (created on demand), others only
+    through create() (POST /sessions), up to MAX_SESSIONS. Idle ones are reaped.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_timeout: float = IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.pool = GDBPool()
+        self.sessions = {}
+        self._reaper = None
+        self.reaped = 0
+
+    def get(self, session_id: str) -> Session:
+        """The session or None. Only the default one is created on demand."""
+        session = self.sessions.get(session_id)
+        if session is None and session_id == DEFAULT_SESSION:
+            session = self.sessions[session_id] = Session(session_id, self.pool)
+        return session
+
+    def create(self, session_id: str = None) -> Session:
+        """New session (random ID by default). Raises if the ID is invalid, taken or the limit is hit."""
+        session_id = session_id or secrets.token_hex(4)
+        if not SESSION_ID.fullmatch(session_id):
+            raise ValueError(f"Invalid session ID: {session_id!r}")
+        if session_id in self.sessions:
+            raise ValueError(f"Session {session_id} already exists")
+        if len([s for s in self.sessions if s != DEFAULT_SESSION]) >= self.max_sessions:
+            raise Exception(f"Too many sessions (max {self.max_sessions})")
+        session = self.sessions[session_id] = Session(session_id, self.pool)
+        return session
+
+    def current(self) -> Session:
+        """Session of the running request/task. Raises SessionClosed rather than re-creating it."""
+        session = current_session.get()
+        if session is None:
+            return self.get(DEFAULT_SESSION)
+        if session.closed:
+            raise SessionClosed(f"Session {session.id} is closed")
+        return session
+
+    async def close(self, session_id: str) -> bool:
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        await session.controller.events.put({"type": "session_closed", "payload": {"id": session_id}})
+        await session.close()
+        return True
+
+    async def close_all(self):
+        for session_id in list(self.sessions):
+            await self.close(session_id)
+
+    def start_reaper(self):
+        if self.idle_timeout > 0 and self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def stop_reaper(self):
+        if self._reaper:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+
+    async def reap(self) -> list:
+        """Closes the sessions idle for longer than idle_timeout, returns their IDs"""
+        idle = [s.id for s in self.sessions.values() if s.idle_for() > self.idle_timeout]
+        for session_id in idle:
+            print(f"[SESSIONS] Closing idle session {session_id}")
+            await self.close(session_id)
+        self.reaped += len(idle)
+        return idle
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(min(REAP_INTERVAL, self.idle_timeout))
+            try:
+                await self.reap()
+            except Exception as e:
+                print(f"[SESSIONS] Reaping failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "maxSessions": self.max_sessions,
+            "idleTimeout": self.idle_timeout,
+            "reaped": self.reaped,
+            "pool": self.pool.stats(),
+        }
+
+
+class SessionProxy:
+    """
+    `gdb` for the routers: the controller of the current request's session.
+    Keeps `from gdb import gdb` working everywhere, whatever the session.
+    """
+
+    def __init__(self, registry: SessionRegistry):
+        object.__setattr__(self, "_registry", registry)
+
+    def __getattr__(self, name):
+        return getattr(self._registry.current().controller, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._registry.current().controller, name, value)
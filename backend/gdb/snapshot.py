@@ -0,0 +1,59 @@
+from .log_buffer import WARNING
+
+STACK_WINDOW = 256     # bytes read at $sp
+SNAPSHOT_INSNS = 100   # instructions from the PC (one disassembly view)
+
+
+async def build_stop_snapshot(controller, event: dict) -> dict:
+    """
+    Everything the UI needs after a stop, read in one pipelined MI batch:
+    register values (delta or full, see RegisterCache), the stack window at
+    $sp and the disassembly from the PC (skipped when already cached).
+    Thread and frame come with the *stopped record itself.
+    """
+    payload = event.get('payload', {}) or {}
+    frame = payload.get('frame', {}) or {}
+    pc = int(frame['addr'], 16) if frame.get('addr') else None
+
+    plan = controller.registers.plan(payload.get('thread-id'))
+    cmds = controller.registers.commands(plan)
+    n_regs = len(cmds)
+    cmds.append(f"-data-read-memory-bytes $sp {STACK_WINDOW}")
+
+    disassembly = controller.disassembly
+    generation = disassembly.generation
+    flavor = controller.disassembly_flavor
+    insns = disassembly.peek(pc, SNAPSHOT_INSNS) if pc is not None else []
+    if pc is not None and len(insns) < SNAPSHOT_INSNS:
+        cmds.append(disassembly.fetch_command(pc, SNAPSHOT_INSNS))
+
+    results = await controller.execute_many(cmds, timeout=4.0, return_exceptions=True)
+
+    snapshot = {
+        "thread": plan["thread"],
+        "reason": payload.get('reason'),
+        "frame": frame,
+    }
+    snapshot.update(await controller.registers.apply(plan, results[:n_regs]))
+
+    stack_res = results[n_regs]
+    if isinstance(stack_res, dict) and stack_res.get('memory'):
+        block = stack_res['memory'][0]
+        snapshot["stack"] = {
+            "address": block.get('begin'),
+            "bytes": list(bytes.fromhex(block.get('contents', '')))
+        }
+    else:
+        await controller.log("Stack read failed: %s", stack_res, level=WARNING)
+
+    if len(results) > n_regs + 1:
+        disasm_res = results[n_regs + 1]
+        if isinstance(disasm_res, dict):
+            asm_insns = disasm_res.get('asm_insns', [])
+            disassembly.ingest(asm_insns, generation, flavor)
+            insns = asm_insns[:SNAPSHOT_INSNS]
+        else:
+            await controller.log("Disassemble Error at 0x%x: %s", pc, disasm_res, level=WARNING)
+    snapshot["disassembly"] = insns
+
+    return snapshot
@@ -0,0 +1,182 @@
+import asyncio
+import re
+import time
+from .log_buffer import WARNING
+
+MAX_STEPS = 1_000_000      # hard cap of one run
+STEP_TIMEOUT = 10.0        # a single instruction step (e.g. over a blocking syscall)
+INTERRUPT_TIMEOUT = 5.0    # -exec-interrupt of a step that timed out, until its *stopped
+PROGRESS_INTERVAL = 0.25   # seconds between two step_progress messages
+
+
+def _is_true(value: str) -> bool:
+    """
+    GDB expression result -> bool: '1', 'true', '5 '\\005'', '1.5',
+    pointers ('0x0 <sym>', '(char *) 0x4006f4 "hi"'). Aggregates have no truth value.
+    """
+    text = value.strip()
+    if text.startswith(("{", "[")):
+        raise Exception(f"Condition is a struct or array, not a truth value: {value}")
+    text = re.sub(r"^\([^)]*\)\s*", "", text)  # (type *) of a pointer
+    token = text.split()[0] if text.split() else ""
+    if token in ("true", "false"):
+        return token == "true"
+    try:
+        return int(token, 0) != 0
+    except ValueError:
+        pass
+    try:
+        return float(token) != 0
+    except ValueError:
+        raise Exception(f"Condition is not a number: {value}")
+
+
+class StepEngine:
+    """
+    Runs many instruction steps in one request, inside the controller.
+    While it runs the controller hands every *stopped record to on_stop()
+    instead of refreshing the UI; only a throttled `step_progress` goes out.
+    The final state is published once, followed by a `step_result`.
+
+    Stop conditions (checked after every step, first one wins):
+      count  - number of steps done
+      until  - GDB expression becomes true, e.g. "$rax == 0" or "*(int*)0x601040 > 3"
+      leave  - PC leaves the [start, end) range
+    Breakpoints, signals and program exit always end the run.
+    """
+
+    def __init__(self, controller):
+        self.gdb = controller
+        self.task = None
+        self.recorder = None     # optional TraceRecorder (trace.py), fed after every step
+        self._stop_event = None
+        self._cancelled = False
+
+    @property
+    def active(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self, count: int = None, over: bool = False, until: str = None,
+              leave: tuple = None, max_steps: int = MAX_STEPS, recorder=None):
+        if self.active:
+            raise Exception("Already stepping")
+        if count is None and until is None and leave is None:
+            raise Exception("No stop condition")
+        self._cancelled = False
+        self.recorder = recorder
+        self.task = asyncio.create_task(self._run(count, over, until, leave, min(max_steps, MAX_STEPS)))
+
+    async def cancel(self):
+        if not self.active:
+            return False
+        self._cancelled = True
+        if self._stop_event is not None and not self._stop_event.done():
+            # Stuck inside one step: break into it
+            await self.gdb.send_command("-exec-interrupt")
+        return True
+
+    async def _interrupt(self):
+        """Breaks into a step that timed out. Its *stopped event, or None if none came."""
+        self._stop_event = asyncio.get_running_loop().create_future()
+        try:
+            await self.gdb.execute_command("-exec-interrupt")
+            return await asyncio.wait_for(self._stop_event, INTERRUPT_TIMEOUT)
+        except Exception as e:
+            await self.gdb.log("Interrupting a timed out step failed: %r", e, level=WARNING)
+            return None
+        finally:
+            self._stop_event = None
+
+    def on_stop(self, event: dict):
+        """Called by the controller's reader for every *stopped while active."""
+        if self._stop_event is not None and not self._stop_event.done():
+            self._stop_event.set_result(event)
+
+    async def _run(self, count, over, until, leave, max_steps):
+        step_cmd = "-exec-next-instruction" if over else "-exec-step-instruction"
+        started = time.perf_counter()
+        last_progress = started
+        steps = 0
+        pc = None
+        last_event = None
+        reason = "max-steps"
+
+        await self.gdb.events.put({"type": "status", "payload": "RUNNING"})
+        try:
+            if self.recorder:
+                await self.recorder.prime()
+
+            while steps < max_steps:
+                if self._cancelled:
+                    reason = "cancelled"
+                    break
+
+                self._stop_event = asyncio.get_running_loop().create_future()
+                await self.gdb.execute_command(step_cmd)
+                last_event = await asyncio.wait_for(self._stop_event, STEP_TIMEOUT)
+                self._stop_event = None
+                steps += 1
+
+                payload = last_event.get('payload', {}) or {}
+                frame = payload.get('frame', {}) or {}
+                pc = frame.get('addr', pc)
+
+                stop_reason = payload.get('reason', 'unknown')
+                if self.recorder and pc is not None and not stop_reason.startswith('exited'):
+                    await self.recorder.after_step(int(pc, 16))
+                if stop_reason != 'end-stepping-range':
+                    reason = "cancelled" if self._cancelled else stop_reason
+                    break
+                if count is not None and steps >= count:
+                    reason = "count"
+                    break
+                if leave is not None and pc is not None and not (leave[0] <= int(pc, 16) < leave[1]):
+                    reason = "left-range"
+                    break
+                if until is not None:
+                    expr = until.replace('\\', '\\\\').replace('"', '\\"')
+                    res = await self.gdb.execute_command(f'-data-evaluate-expression "{expr}"')
+                    if _is_true(res.get('value', '0')):
+                        reason = "condition"
+                        break
+
+                now = time.perf_counter()
+                if now - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = now
+                    await self.gdb.events.put({
+                        "type": "step_progress",
+                        "payload": {"steps": steps, "pc": pc}
+                    })
+        except asyncio.TimeoutError:
+            reason = "timeout"
+            # The inferior is still inside the step: stop it, report where it really is
+            last_event = await self._interrupt()
+            if last_event is not None:
+                pc = ((last_event.get('payload') or {}).get('frame') or {}).get('addr', pc)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            reason = "error"
+            await self.gdb.log("Stepping failed after %d steps: %s", steps, e, level=WARNING)
+        finally:
+            self._stop_event = None
+            if self.recorder:
+                self.recorder.store.finish()
+
+        # Final state, once: the regular stop handling (status, thread, registers)
+        if last_event is not None:
+            await self.gdb._handle_stop(last_event)
+        else:
+            # No stop seen: after a failed interrupt the inferior may well still run
+            status = "RUNNING" if reason == "timeout" else "PAUSED"
+            await self.gdb.events.put({"type": "status", "payload": status})
+
+        result = {
+            "reason": reason,
+            "steps": steps,
+            "pc": pc,
+            "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+        }
+        await self.gdb.log("Stepping done: %s", result)
+        await self.gdb.events.put({"type": "step_result", "payload": result})
+        return result
@@ -0,0 +1,476 @@
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+from array import array
+
+# File layout: a fixed 512-byte header, then fixed-width little-endian records
+#   pc u64 | write address u64 (0 = no write) | write size u32 | pad u32 | registers u64 * N
+MAGIC = b"GDBOTRC1"
+HEADER_SIZE = 512
+HEADER = struct.Struct("<8sII")   # magic, register count, record size (+ JSON register names)
+RECORD_HEAD = struct.Struct("<QQII")
+
+FLUSH_EVERY = 4096            # records buffered before they hit the file
+SORT_CHUNK = 1 << 18          # index entries sorted in memory at once
+PAIR = struct.Struct("<QQ")   # index entry: key, step
+
+DEFAULT_REGISTERS_64 = ["rax", "rbx", "rcx", "rdx", "rsi", "rdi", "rbp", "rsp",
+                        "r8", "r9", "r10", "r11", "r12", "r13", "r14", "r15", "eflags"]
+DEFAULT_REGISTERS_32 = ["eax", "ebx", "ecx", "edx", "esi", "edi", "ebp", "esp", "eflags"]
+
+
+class TraceStore:
+    """
+    Append-only trace file, one per session (next to the target DB).
+    Writing keeps at most FLUSH_EVERY records in memory; reads go through
+    an mmap of the file, so neither side grows with the trace length.
+    Indexes are separate sorted (key, step) files built by build_indexes().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.registers = []
+        self.record = None      # Struct of one record
+        self._file = None
+        self._pending = []
+        self._map = None
+        self._map_count = 0
+        self._count = 0
+        if os.path.exists(path):
+            self._load_header()
+
+    # --- writing ---
+
+    def create(self, registers: list):
+        """Starts a new (empty) trace, dropping the previous one and its indexes."""
+        self.close()
+        self.registers = list(registers)
+        self.record = struct.Struct(f"<QQII{len(registers)}Q")
+        names = json.dumps(self.registers).encode()
+        if len(names) > HEADER_SIZE - HEADER.size:
+            raise Exception("Too many trace registers")
+
+        header = HEADER.pack(MAGIC, len(registers), self.record.size) + names
+        with open(self.path, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+        for suffix in (".pcidx", ".wridx"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+        self._count = 0
+        self._file = open(self.path, "ab")
+
+    def append(self, pc: int, write_addr: int, write_size: int, regs: list):
+        self._pending.append(self.record.pack(pc, write_addr, write_size, 0, *regs))
+        self._count += 1
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if self._file and self._pending:
+            self._file.write(b"".join(self._pending))
+            self._file.flush()
+            self._pending.clear()
+
+    def finish(self):
+        """Stops writing (the trace stays readable)."""
+        self.flush()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self.finish()
+        if self._map:
+            self._map.close()
+            self._map = None
+            self._map_count = 0
+
+    # --- reading ---
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def recording(self) -> bool:
+        return self._file is not None
+
+    def get(self, step: int) -> dict:
+        """Record of step N (0-based), or None."""
+        if not 0 <= step < self._count:
+            return None
+        if step >= self._map_count:
+            self.flush()
+            self._remap()
+        values = self.record.unpack_from(self._map, HEADER_SIZE + step * self.record.size)
+        pc, write_addr, write_size, _ = values[:4]
+        return {
+            "step": step,
+            "pc": f"0x{pc:x}",
+            "write": {"address": f"0x{write_addr:x}", "size": write_size} if write_size else None,
+            "registers": {name: f"0x{v:x}" for name, v in zip(self.registers, values[4:])},
+        }
+
+    def register_at(self, step: int, name: str):
+        if name not in self.registers:
+            raise KeyError(name)
+        record = self.get(step)
+        return None if record is None else record["registers"][name]
+
+    def _load_header(self):
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        magic, nregs, record_size = HEADER.unpack_from(header)
+        if magic != MAGIC:
+            return
+        names = header[HEADER.size:].rstrip(b"\0")
+        self.registers = json.loads(names) if names else []
+        self.record = struct.Struct(f"<QQII{nregs}Q")
+        if self.record.size != record_size:
+            raise Exception(f"Corrupt trace header: {self.path}")
+        self._count = (os.path.getsize(self.path) - HEADER_SIZE) // record_size
+
+    def _remap(self):
+        if self._map:
+            self._map.close()
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._map_count = (len(self._map) - HEADER_SIZE) // self.record.size
+
+    # --- indexes ---
+
+    def indexed(self) -> bool:
+        try:
+            return all(os.path.getmtime(self.path + s) >= os.path.getmtime(self.path)
+                       for s in (".pcidx", ".wridx"))
+        except OSError:
+            return False
+
+    def build_indexes(self):
+        """
+        Builds the sorted (pc, step) and (write address, step) index files with
+        an external merge sort: memory use is bounded by SORT_CHUNK entries.
+        Blocking, run it in a worker thread.
+        """
+        self.flush()
+        self._remap()
+        size = self.record.size
+
+        def entries(field):
+            for step in range(self._map_count):
+                pc, write_addr, write_size, _ = RECORD_HEAD.unpack_from(self._map, HEADER_SIZE + step * size)
+                if field == "pc":
+                    yield pc, step
+                elif write_size:
+                    yield write_addr, step
+
+        for field, suffix in (("pc", ".pcidx"), ("write", ".wridx")):
+            _external_sort(entries(field), self.path + suffix)
+
+    def _index(self, suffix: str):
+        """The index as a flat view [key0, step0, key1, step1, ...]."""
+        with open(self.path + suffix, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(array("Q"))
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast("Q")
+
+    def executions(self, pc: int, offset: int = 0, limit: int = 100):
+        """Steps at which `pc` was executed (ascending) and their total count."""
+        index = self._index(".pcidx")
+        lo = _lower_bound(index, pc)
+        hi = _lower_bound(index, pc + 1)
+        first = lo + offset
+        steps = [index[2 * i + 1] for i in range(first, min(hi, first + limit))]
+        return steps, hi - lo
+
+    def last_write(self, address: int, before: int = None):
+        """Record of the last step (< before) whose write covered `address`, or None."""
+        index = self._index(".wridx")
+        best = None
+        # Writes are at most 64 bytes wide: only these start addresses can cover it
+        for start in range(max(0, address - 63), address + 1):
+            lo = _lower_bound(index, start)
+            hi = _lower_bound(index, start + 1)
+            # Entries of one address are sorted by step
+            k = _step_bound(index, lo, hi, before)
+            if k == lo:
+                continue
+            step = index[2 * (k - 1) + 1]
+            if best is not None and step <= best:
+                continue
+            if start + self.get(step)["write"]["size"] > address:
+                best = step
+        return None if best is None else self.get(best)
+
+
+def _external_sort(pairs, out_path: str):
+    runs = []
+    chunk = []
+    try:
+        for pair in pairs:
+            chunk.append(pair)
+            if len(chunk) >= SORT_CHUNK:
+                runs.append(_write_run(sorted(chunk), out_path + f".run{len(runs)}"))
+                chunk = []
+
+        if not runs:
+            _write_pairs(sorted(chunk), out_path)
+            return
+        if chunk:
+            runs.append(_write_run(sorted(chunk), out_path + f".run{len(runs)}"))
+        _write_pairs(heapq.merge(*[_read_run(r) for r in runs]), out_path)
+    finally:
+        for run in runs:
+            os.remove(run)
+
+
+def _write_pairs(pairs, path: str):
+    with open(path + ".tmp", "wb") as f:
+        buf = []
+        for pair in pairs:
+            buf.append(PAIR.pack(*pair))
+            if len(buf) >= FLUSH_EVERY:
+                f.write(b"".join(buf))
+                buf.clear()
+        f.write(b"".join(buf))
+    os.replace(path + ".tmp", path)
+
+
+def _write_run(pairs, path: str) -> str:
+    _write_pairs(pairs, path)
+    return path
+
+
+def _read_run(path: str):
+    with open(path, "rb") as f:
+        while block := f.read(PAIR.size * FLUSH_EVERY):
+            yield from PAIR.iter_unpack(block)
+
+
+def _lower_bound(index, key: int) -> int:
+    """First entry whose key >= `key` in a flat [key, step, ...] view."""
+    lo, hi = 0, len(index) // 2
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if index[2 * mid] < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _step_bound(index, lo: int, hi: int, before) -> int:
+    """Within entries [lo, hi) of one key, the first whose step >= before."""
+    if before is None:
+        return hi
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if index[2 * mid + 1] < before:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+# --- memory write targets ---
+
+PREFIXES = {"rep", "repz", "repe", "repnz", "repne", "lock", "notrack", "bnd", "data16", "addr32"}
+# Memory operand is only read by these (exact mnemonics: cmpxchg, bts... do write)
+NO_WRITE = {
+    *(base + suffix for base in ("cmp", "test", "bt", "nop", "lea") for suffix in ("", "b", "w", "l", "q")),
+    "cmps", "cmpsb", "cmpsw", "cmpsl", "cmpsq", "cmpsd",
+    "ucomiss", "ucomisd", "comiss", "comisd", "vucomiss", "vucomisd", "vcomiss", "vcomisd",
+    "ptest", "vptest", "prefetcht0", "prefetcht1", "prefetcht2", "prefetchnta", "prefetchw",
+}
+SIZE_SUFFIX = {"b": 1, "w": 2, "l": 4, "q": 8}
+PTR_SIZES = {"BYTE": 1, "WORD": 2, "DWORD": 4, "QWORD": 8, "TBYTE": 10,
+             "XMMWORD": 16, "YMMWORD": 32, "ZMMWORD": 64}
+REG_SIZES = [(re.compile(r"^%?[re]?[a-d]l$|^%?[sd]il$|^%?[sb]pl$|^%?r\d+b$"), 1),
+             (re.compile(r"^%?[a-d]x$|^%?[sd]i$|^%?[sb]p$|^%?r\d+w$"), 2),
+             (re.compile(r"^%?e[a-d]x$|^%?e[sd]i$|^%?e[sb]p$|^%?r\d+d$"), 4),
+             (re.compile(r"^%?r[a-d]x$|^%?r[sd]i$|^%?r[sb]p$|^%?r\d+$"), 8),
+             (re.compile(r"^%?xmm\d+$"), 16), (re.compile(r"^%?ymm\d+$"), 32), (re.compile(r"^%?zmm\d+$"), 64)]
+
+ATT_MEM = re.compile(r"^(?:%(\w+):)?(-?(?:0x[0-9a-f]+|\d+))?\((%\w+)?(?:,(%\w+)(?:,(\d))?)?\)$")
+ATT_ABS = re.compile(r"^(?:%(\w+):)?(0x[0-9a-f]+)$")
+INTEL_MEM = re.compile(r"^(?:(\w+) PTR )?(?:(\w+):)?(?:\[(.+)\]|(0x[0-9a-f]+))$")
+
+
+def _split_operands(text: str) -> list:
+    ops, depth, cur = [], 0, ""
+    for ch in text:
+        if ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+        if ch == "," and depth == 0:
+            ops.append(cur.strip())
+            cur = ""
+        else:
+            cur += ch
+    if cur.strip():
+        ops.append(cur.strip())
+    return ops
+
+
+def _reg_size(op: str):
+    for pattern, size in REG_SIZES:
+        if pattern.match(op):
+            return size
+    return None
+
+
+def _segment_base(segment):
+    return f"(long)${segment}_base + " if segment in ("fs", "gs") else ""
+
+
+def write_target(insn: dict, flavor: str, ptr_size: int):
+    """
+    GDB expression for the address the instruction at insn['address'] writes
+    to (to be evaluated *before* it executes) and the write size, or None.
+    Covers explicit memory destinations, push and call; other implicit
+    writes (e.g. by syscalls) are not tracked.
+    """
+    text = insn.get("inst", "").split("#")[0].split("<")[0].strip()
+    words = text.split(None, 1)
+    while words and words[0] in PREFIXES:
+        words = words[1].split(None, 1) if len(words) > 1 else []
+    if not words:
+        return None
+    mnemonic = words[0]
+    operands = _split_operands(words[1]) if len(words) > 1 else []
+    next_pc = int(insn["address"], 16) + len(insn.get("opcodes", "").split())
+
+    if mnemonic.startswith(("push", "call")):
+        # call: the only write is the return address, its operand is the target
+        return f"(long)$sp - {ptr_size}", ptr_size
+    if mnemonic.startswith(("j", "loop", "ljmp")):
+        # Branches: the operand is where to go, never a destination
+        return None
+    if not operands or mnemonic in NO_WRITE:
+        return None
+
+    if flavor == "intel":
+        m = INTEL_MEM.match(operands[0])
+        if not m:
+            return None
+        ptr, segment, inner, absolute = m.groups()
+        size = PTR_SIZES.get(ptr) or (len(operands) > 1 and _reg_size(operands[1])) or ptr_size
+        if absolute:
+            return f"{_segment_base(segment)}{absolute}", size
+        expr = re.sub(r"\b(?!0x)([a-z][a-z0-9]*)\b",
+                      lambda r: f"0x{next_pc:x}" if r.group(1) in ("rip", "eip") else f"(long)${r.group(1)}",
+                      inner)
+        return f"{_segment_base(segment)}{expr}", size
+
+    dest = operands[-1]
+    m = ATT_MEM.match(dest)
+    if m:
+        segment, disp, base, index, scale = m.groups()
+        parts = [_segment_base(segment) + (disp or "0")]
+        if base:
+            parts.append(f"0x{next_pc:x}" if base in ("%rip", "%eip") else f"(long)${base[1:]}")
+        if index:
+            parts.append(f"(long)${index[1:]} * {scale or 1}")
+        expr = " + ".join(parts)
+    else:
+        m = ATT_ABS.match(dest)
+        if not m:
+            return None
+        expr = f"{_segment_base(m.group(1))}{m.group(2)}"
+
+    size = None
+    if mnemonic[-1] in SIZE_SUFFIX and mnemonic[:-1] in ("mov", "add", "sub", "and", "or", "xor", "inc", "dec",
+                                                        "neg", "not", "adc", "sbb", "shl", "shr", "sar", "sal",
+                                                        "rol", "ror", "stos", "movs", "xchg", "cmpxchg", "xadd",
+                                                        "bts", "btr", "btc"):
+        size = SIZE_SUFFIX[mnemonic[-1]]
+    elif len(operands) > 1:
+        size = _reg_size(operands[-2])
+    if mnemonic.startswith("set"):
+        size = 1
+    elif mnemonic in ("cmpxchg8b", "cmpxchg16b"):
+        size = 8 if mnemonic == "cmpxchg8b" else 16
+    return expr, size or ptr_size
+
+
+class TraceRecorder:
+    """
+    Hooks into the StepEngine: one record per step with the PC of the
+    executed instruction, its memory write (address computed from the
+    registers before it runs) and the selected registers after it ran.
+    The post-step register fetch and the next write-target evaluation go
+    out as one pipelined batch.
+    """
+
+    def __init__(self, controller, store: TraceStore, registers: list):
+        self.gdb = controller
+        self.store = store
+        self.registers = registers
+        self.numbers = []
+        self.ptr_size = 8
+        self._pc = None
+        self._write = None
+
+    async def prime(self):
+        names = self.gdb.register_names or []
+        missing = [r for r in self.registers if r not in names]
+        if missing:
+            raise Exception(f"Unknown registers: {', '.join(missing)}")
+        self.numbers = [str(names.index(r)) for r in self.registers]
+        self.ptr_size = 8 if "rip" in names else 4
+
+        res = await self.gdb.execute_command("-data-evaluate-expression $pc")
+        self._pc = int(res["value"].split()[0], 16)
+        self._write = None
+        target = await self._write_target(self._pc)
+        if target:
+            try:
+                res = await self.gdb.execute_command(f'-data-evaluate-expression "{_quote(target[0])}"')
+                self._write = (_to_u64(res.get("value", "0")), target[1])
+            except Exception:
+                pass
+        self.store.create(self.registers)
+
+    async def after_step(self, pc: int):
+        """Called after every step with the new PC."""
+        target = await self._write_target(pc)
+        cmds = [f"-data-list-register-values x {' '.join(self.numbers)}"]
+        if target:
+            cmds.append(f'-data-evaluate-expression "{_quote(target[0])}"')
+        results = await self.gdb.execute_many(cmds, timeout=4.0, return_exceptions=True)
+
+        regs_res = results[0]
+        if isinstance(regs_res, BaseException):
+            raise regs_res
+        values = {r["number"]: r["value"] for r in regs_res.get("register-values", [])}
+        regs = [_to_u64(values.get(n, "0")) for n in self.numbers]
+
+        write_addr, write_size = self._write or (0, 0)
+        self.store.append(self._pc, write_addr, write_size, regs)
+
+        self._pc = pc
+        self._write = None
+        if target and not isinstance(results[1], BaseException):
+            self._write = (_to_u64(results[1].get("value", "0")), target[1])
+
+    async def _write_target(self, pc: int):
+        insns = await self.gdb.disassembly.get(pc, 1)
+        if not insns:
+            return None
+        return write_target(insns[0], self.gdb.disassembly_flavor, self.ptr_size)
+
+
+def _quote(expr: str) -> str:
+    return expr.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _to_u64(value: str) -> int:
+    token = value.split()[0] if value.split() else "0"
+    try:
+        return int(token, 0) & 0xFFFFFFFFFFFFFFFF
+    except ValueError:
+        return 0
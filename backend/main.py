@@ -1,12 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from gdb import gdb
-from app.state import get_db_manager
+from gdb import sessions, SessionClosed
+from app.middleware import SessionMiddleware
+from db_manager import DBClosed
 from settings_manager import SettingsManager
 
 # Import Routers
-from app.routers import session, control, memory, settings, websocket
+from app.routers import session, control, memory, settings, websocket, trace, logs
 
 # Global Managers Init
 settings_manager = SettingsManager()
@@ -16,14 +18,21 @@ async def lifespan(app: FastAPI):
     # Startup logic
     await settings_manager.init_db()
     
-    # We might want to init helper state here if needed
+    # Pre-spawn idle GDB processes so the first session load is already warm
+    sessions.pool.fill()
+    sessions.start_reaper()
     
     yield
     # Shutdown logic
-    await gdb.stop()
+    await sessions.stop_reaper()
+    await sessions.close_all()
+    await sessions.pool.close()
 
 app = FastAPI(lifespan=lifespan)
 
+# Every request runs in a debugging session (gdb/sessions.py)
+app.add_middleware(SessionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -31,9 +40,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(SessionClosed)
+async def session_closed(request: Request, exc: SessionClosed):
+    # The request's session went away while it ran (DELETE /sessions/<id> or reaped)
+    return JSONResponse(status_code=410, content={"error": str(exc)})
+
+@app.exception_handler(DBClosed)
+async def db_closed(request: Request, exc: DBClosed):
+    # The target was unloaded under the request: same answer as the routes' own check
+    return JSONResponse(content={"error": str(exc)})
+
 # Include Routers
 app.include_router(session.router)
 app.include_router(control.router)
 app.include_router(memory.router)
 app.include_router(settings.router)
 app.include_router(websocket.router)
+app.include_router(trace.router)
+app.include_router(logs.router)
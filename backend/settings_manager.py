@@ -21,8 +21,32 @@ class SettingsManager:
                 value TEXT
             )
         ''')
+        # Target fingerprints, valid as long as the file's stat identity is unchanged
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                path TEXT PRIMARY KEY,
+                inode INTEGER,
+                size INTEGER,
+                mtime_ns INTEGER,
+                digest TEXT
+            )
+        ''')
         self.conn.commit()
 
+    async def get_fingerprint(self, path: str, inode: int, size: int, mtime_ns: int):
+        """Cached digest of `path`, or None if the file changed since it was hashed."""
+        if not self.conn: await self.init_db()
+        rows = await asyncio.to_thread(self._query,
+            "SELECT digest FROM fingerprints WHERE path = ? AND inode = ? AND size = ? AND mtime_ns = ?",
+            (path, inode, size, mtime_ns))
+        return rows[0][0] if rows else None
+
+    async def save_fingerprint(self, path: str, inode: int, size: int, mtime_ns: int, digest: str):
+        if not self.conn: await self.init_db()
+        await asyncio.to_thread(self._execute,
+            "INSERT OR REPLACE INTO fingerprints (path, inode, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?)",
+            (path, inode, size, mtime_ns, digest))
+
     async def get_all_settings(self):
         if not self.conn: await self.init_db()
         rows = await asyncio.to_thread(self._query, "SELECT key, value FROM settings")
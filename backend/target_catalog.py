@@ -0,0 +1,236 @@
+import os
+import struct
+import asyncio
+
+HEADER_SIZE = 4096        # enough for the ELF/PE/Mach-O headers we look at
+MAX_TABLE_SIZE = 1 << 20  # sanity cap for section/program/load command tables
+
+ELF_MACHINES = {
+    3: "Intel 80386", 8: "MIPS", 20: "PowerPC", 21: "64-bit PowerPC",
+    40: "ARM", 62: "x86-64", 183: "ARM aarch64", 243: "RISC-V",
+}
+ELF_TYPES = {1: "relocatable", 2: "executable", 3: "shared object", 4: "core file"}
+
+PE_MACHINES = {
+    0x14c: "Intel 80386", 0x8664: "x86-64", 0x1c0: "ARM", 0x1c4: "ARMv7 Thumb", 0xaa64: "Aarch64",
+}
+
+MACHO_MACHINES = {
+    7: "i386", 0x01000007: "x86_64", 12: "arm", 0x0100000c: "arm64",
+    18: "ppc", 0x01000012: "ppc64",
+}
+MACHO_TYPES = {1: "object", 2: "executable", 6: "dynamically linked shared library", 8: "bundle"}
+
+
+def _elf(f, head: bytes) -> dict:
+    bits = 64 if head[4] == 2 else 32
+    endian = "<" if head[5] == 1 else ">"
+    e_type, e_machine = struct.unpack_from(endian + "HH", head, 16)
+    if bits == 64:
+        phoff, shoff = struct.unpack_from(endian + "QQ", head, 32)
+        phentsize, phnum, shentsize, shnum = struct.unpack_from(endian + "HHHH", head, 54)
+    else:
+        phoff, shoff = struct.unpack_from(endian + "II", head, 28)
+        phentsize, phnum, shentsize, shnum = struct.unpack_from(endian + "HHHH", head, 42)
+
+    # ET_DYN with an interpreter is a PIE executable, not a library
+    kind = ELF_TYPES.get(e_type, "unknown")
+    # entsize has to cover the field read from each entry (p_type, sh_type)
+    if e_type == 3 and phnum and phentsize >= 4 and phentsize * phnum <= MAX_TABLE_SIZE:
+        f.seek(phoff)
+        table = f.read(phentsize * phnum)
+        p_types = [struct.unpack_from(endian + "I", table, i * phentsize)[0]
+                   for i in range(len(table) // phentsize)]
+        if 3 in p_types:  # PT_INTERP
+            kind = "pie executable"
+
+    # Not stripped = has a SHT_SYMTAB section
+    stripped = True
+    if shnum and shentsize >= 8 and shentsize * shnum <= MAX_TABLE_SIZE:
+        f.seek(shoff)
+        table = f.read(shentsize * shnum)
+        stripped = not any(struct.unpack_from(endian + "I", table, i * shentsize + 4)[0] == 2
+                           for i in range(len(table) // shentsize))
+
+    machine = ELF_MACHINES.get(e_machine, f"machine {e_machine}")
+    byte_order = "LSB" if endian == "<" else "MSB"
+    return {
+        "format": "ELF",
+        "bits": bits,
+        "endian": byte_order,
+        "machine": machine,
+        "type": kind,
+        "stripped": stripped,
+        "fileType": f"ELF {bits}-bit {byte_order} {kind}, {machine}",
+    }
+
+
+def _pe(f, head: bytes) -> dict:
+    lfanew = struct.unpack_from("<I", head, 0x3c)[0]
+    f.seek(lfanew)
+    coff = f.read(4 + 20 + 2)
+    if len(coff) < 26 or coff[:4] != b"PE\0\0":
+        return _dos()
+    machine, _, _, _, nsyms, _, characteristics, magic = struct.unpack_from("<HHIIIHHH", coff, 4)
+    bits = 64 if magic == 0x20b else 32
+    kind = "DLL" if characteristics & 0x2000 else "executable"
+    arch = PE_MACHINES.get(machine, f"machine 0x{machine:x}")
+    return {
+        "format": "PE",
+        "bits": bits,
+        "endian": "LSB",
+        "machine": arch,
+        "type": kind,
+        "stripped": nsyms == 0,
+        "fileType": f"PE32{'+' if bits == 64 else ''} {kind}, {arch}",
+    }
+
+
+def _dos() -> dict:
+    return {"format": "MZ", "bits": 16, "endian": "LSB", "machine": "Intel 8086",
+            "type": "executable", "stripped": None, "fileType": "MS-DOS executable"}
+
+
+def _macho(f, head: bytes) -> dict:
+    magic = head[:4]
+    endian = "<" if magic in (b"\xce\xfa\xed\xfe", b"\xcf\xfa\xed\xfe") else ">"
+    bits = 64 if magic in (b"\xcf\xfa\xed\xfe", b"\xfe\xed\xfa\xcf") else 32
+    cputype, _, filetype, ncmds, sizeofcmds = struct.unpack_from(endian + "iiIII", head, 4)
+
+    # Not stripped = LC_SYMTAB with symbols
+    stripped = True
+    if sizeofcmds <= MAX_TABLE_SIZE:
+        f.seek(32 if bits == 64 else 28)
+        cmds = f.read(sizeofcmds)
+        pos = 0
+        for _ in range(ncmds):
+            if pos + 16 > len(cmds):
+                break
+            cmd, cmdsize = struct.unpack_from(endian + "II", cmds, pos)
+            if cmd == 2:  # LC_SYMTAB
+                stripped = struct.unpack_from(endian + "I", cmds, pos + 12)[0] == 0
+                break
+            if cmdsize < 8:
+                break
+            pos += cmdsize
+
+    arch = MACHO_MACHINES.get(cputype & 0xffffffff, f"cpu {cputype}")
+    kind = MACHO_TYPES.get(filetype, "unknown")
+    return {
+        "format": "Mach-O",
+        "bits": bits,
+        "endian": "LSB" if endian == "<" else "MSB",
+        "machine": arch,
+        "type": kind,
+        "stripped": stripped,
+        "fileType": f"Mach-O {bits}-bit {kind}, {arch}",
+    }
+
+
+def _other(head: bytes) -> dict:
+    info = {"format": None, "bits": None, "endian": None, "machine": None, "type": None, "stripped": None}
+    if head[:4] == b"\xca\xfe\xba\xbe" and 0 < struct.unpack_from(">I", head, 4)[0] < 20:
+        info.update(format="Mach-O", fileType="Mach-O universal binary")
+    elif not head:
+        info["fileType"] = "empty"
+    elif all(32 <= b < 127 or b in (9, 10, 13) for b in head[:512]):
+        info["fileType"] = "ASCII text"
+    else:
+        info["fileType"] = "data"
+    return info
+
+
+def sniff(path: str) -> dict:
+    """Header-only identification of a binary (a small in-process `file`)."""
+    with open(path, "rb") as f:
+        head = f.read(HEADER_SIZE)
+        try:
+            if head[:4] == b"\x7fELF" and len(head) >= 64:
+                return _elf(f, head)
+            if head[:4] in (b"\xce\xfa\xed\xfe", b"\xcf\xfa\xed\xfe",
+                            b"\xfe\xed\xfa\xce", b"\xfe\xed\xfa\xcf") and len(head) >= 28:
+                return _macho(f, head)
+            if head[:2] == b"MZ" and len(head) >= 0x40:
+                return _pe(f, head)
+        except Exception:
+            pass  # truncated / corrupt header: one bad file must not break the listing
+        return _other(head)
+
+
+class TargetCatalog:
+    """
+    Cached index of a targets directory.
+    Headers are only parsed again when a file's (inode, size, mtime) changes,
+    so after the first scan a refresh is one scandir + stat per file, run in a
+    worker thread.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.entries = {}   # name -> entry dict
+        self.keys = {}      # name -> (inode, size, mtime_ns)
+        self.sniffed = 0    # headers parsed in total (cache misses)
+        self._sorted = []
+        self._lock = asyncio.Lock()
+
+    async def refresh(self):
+        async with self._lock:
+            await asyncio.to_thread(self._scan)
+
+    def _scan(self):
+        seen = set()
+        changed = False
+        with os.scandir(self.directory) as it:
+            for item in it:
+                try:
+                    if not item.is_file():
+                        continue
+                    st = item.stat()
+                except OSError:
+                    continue
+
+                seen.add(item.name)
+                key = (st.st_ino, st.st_size, st.st_mtime_ns)
+                executable = os.access(item.path, os.X_OK)
+                entry = self.entries.get(item.name)
+
+                if entry is None or self.keys[item.name] != key:
+                    try:
+                        info = sniff(item.path)
+                    except OSError:
+                        info = {"fileType": ""}
+                    self.sniffed += 1
+                    entry = {"name": item.name, "size": st.st_size, "executable": executable, **info}
+                    self.entries[item.name] = entry
+                    self.keys[item.name] = key
+                    changed = True
+                elif entry["executable"] != executable:
+                    entry["executable"] = executable  # chmod doesn't touch mtime
+
+        for name in set(self.entries) - seen:
+            del self.entries[name]
+            del self.keys[name]
+            changed = True
+
+        if changed:
+            self._sorted = sorted(self.entries.values(), key=lambda e: e["name"])
+
+    def query(self, offset: int = 0, limit: int = None, name: str = None,
+              fmt: str = None, machine: str = None, executable: bool = None,
+              stripped: bool = None) -> dict:
+        files = self._sorted
+        if name:
+            needle = name.lower()
+            files = [e for e in files if needle in e["name"].lower()]
+        if fmt:
+            files = [e for e in files if (e.get("format") or "").lower() == fmt.lower()]
+        if machine:
+            files = [e for e in files if machine.lower() in (e.get("machine") or "").lower()]
+        if executable is not None:
+            files = [e for e in files if e["executable"] == executable]
+        if stripped is not None:
+            files = [e for e in files if e.get("stripped") == stripped]
+
+        total = len(files)
+        end = None if limit is None else offset + limit
+        return {"files": files[offset:end], "total": total, "offset": offset}
@@ -0,0 +1,29 @@
+from gdb.disassembly import InsnCache, PAGE_SHIFT
+
+PAGE = 1 << PAGE_SHIFT
+
+
+def insns(page: int, n: int = 4) -> dict:
+    base = page * PAGE
+    return {base + i: {"address": hex(base + i), "opcodes": "90"} for i in range(n)}
+
+
+def test_evicts_least_recently_used_page():
+    cache = InsnCache(max_pages=2)
+    assert cache.update(insns(0)) == []
+    assert cache.update(insns(1)) == []
+    assert cache.get(0) is not None      # page 0 is now the most recent
+    assert cache.update(insns(2)) == [1 * PAGE]
+    assert cache.get(PAGE) is None
+    assert cache.get(0) is not None and cache.get(2 * PAGE) is not None
+    assert len(cache) == 8
+
+
+def test_discard_and_overwrite_keep_count():
+    cache = InsnCache()
+    cache.update(insns(0))
+    cache.update(insns(0, 2))
+    assert len(cache) == 4
+    cache.discard(1)
+    cache.discard(1)
+    assert cache.get(1) is None and len(cache) == 3
@@ -0,0 +1,15 @@
+import ctypes
+import os
+from gdb.memory_backend import ProcMemory
+
+
+def test_read_returns_bytes():
+    data = ctypes.create_string_buffer(b"gdbolly" * 100)
+    memory = ProcMemory(os.getpid())
+    try:
+        result = memory.read_sync(ctypes.addressof(data), 700)
+    finally:
+        memory.close()
+    assert type(result) is bytes
+    assert result == b"gdbolly" * 100
+    hash(result)
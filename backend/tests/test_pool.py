@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from gdb.pool import GDBPool
+
+
+class FakeStdin:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+class FakeStdout:
+    def __init__(self, process):
+        self.process = process
+
+    async def readline(self) -> bytes:
+        # Replies to every command written so far, in order
+        if not self.process.replies:
+            sent = self.process.stdin.data.decode().splitlines()
+            for line in sent:
+                token = line[:len(line) - len(line.lstrip("0123456789"))]
+                self.process.replies.append(self.process.reply(token, line[len(token):]))
+            self.process.stdin.data = b""
+        return self.process.replies.pop(0).encode() + b"\n" if self.process.replies else b""
+
+
+class FakeProcess:
+    def __init__(self, reject: str = None):
+        self.reject = reject
+        self.stdin = FakeStdin()
+        self.stdout = FakeStdout(self)
+        self.replies = []
+        self.terminated = False
+
+    def terminate(self):
+        self.terminated = True
+
+    async def wait(self):
+        return 0
+
+    def reply(self, token: str, cmd: str) -> str:
+        if self.reject and self.reject in cmd:
+            return f'{token}^error,msg="No symbol \\"{self.reject}\\" in current context."'
+        return f"{token}^done"
+
+
+def test_run_consumes_done_replies():
+    pool = GDBPool(size=0)
+    asyncio.run(pool._run(FakeProcess(), ["-gdb-set confirm off", "-gdb-set width 0"]))
+
+
+def test_run_raises_on_error_reply():
+    pool = GDBPool(size=0)
+    with pytest.raises(Exception, match='No symbol "bogus"'):
+        asyncio.run(pool._run(FakeProcess(reject="bogus"), ["-gdb-set confirm off", "-gdb-set bogus 1"]))
+
+
+def test_apply_does_not_record_rejected_setting():
+    pool = GDBPool(size=0)
+    pool.settings = {"confirm": "off", "bogus": "1"}
+    applied = {}
+    with pytest.raises(Exception):
+        asyncio.run(pool._apply(FakeProcess(reject="bogus"), applied))
+    assert applied == {}
+
+
+def test_reapply_kills_process_on_error():
+    pool = GDBPool(size=0)
+    pool.settings = {"confirm": "off", "bogus": "1"}
+    process = FakeProcess(reject="bogus")
+    assert asyncio.run(pool._reapply(process, {})) is False
+    assert process.terminated
+    assert 'No symbol "bogus"' in pool.last_error
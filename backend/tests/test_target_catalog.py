@@ -0,0 +1,22 @@
+import struct
+import pytest
+from target_catalog import sniff
+
+
+def elf_header(phentsize: int, phnum: int, shentsize: int, shnum: int) -> bytes:
+    head = bytearray(64)
+    head[:6] = b"\x7fELF\x02\x01"
+    struct.pack_into("<HH", head, 16, 3, 62)           # ET_DYN, x86-64
+    struct.pack_into("<QQ", head, 32, 64, 64)          # phoff, shoff
+    struct.pack_into("<HHHH", head, 54, phentsize, phnum, shentsize, shnum)
+    return bytes(head) + bytes(256)
+
+
+@pytest.mark.parametrize("phentsize, phnum, shentsize, shnum", [
+    (0, 1, 0, 1),      # entsize 0 with entries
+    (2, 3, 4, 2),      # entries smaller than the field read from them
+])
+def test_bad_entsize_does_not_raise(tmp_path, phentsize, phnum, shentsize, shnum):
+    path = tmp_path / "bad"
+    path.write_bytes(elf_header(phentsize, phnum, shentsize, shnum))
+    assert sniff(str(path))["format"] == "ELF"
@@ -0,0 +1,48 @@
+import pytest
+from gdb.trace import write_target
+
+PC = "0x401000"
+
+
+def insn(text: str, opcodes: str = "00 00 00 00") -> dict:
+    return {"address": PC, "inst": text, "opcodes": opcodes}
+
+
+@pytest.mark.parametrize("flavor, text, expected", [
+    # Branches: the target is not a write
+    ("att", "jne    0x401136 <main+16>", None),
+    ("intel", "jne    0x401136 <main+16>", None),
+    ("att", "jmp    0x401136 <main+16>", None),
+    ("att", "jmp    *0x8(%rax)", None),
+    ("intel", "jmp    QWORD PTR [rax+0x8]", None),
+    ("att", "loop   0x401136 <main+16>", None),
+    ("intel", "jrcxz  0x401136 <main+16>", None),
+    ("att", "bnd jmp 0x401136 <main+16>", None),
+    # call only writes its return address
+    ("att", "call   0x401136 <foo>", ("(long)$sp - 8", 8)),
+    ("intel", "call   QWORD PTR [rip+0x2fe2]", ("(long)$sp - 8", 8)),
+    # Read-only memory operands
+    ("att", "cmpl   $0x0,-0x4(%rbp)", None),
+    ("intel", "cmp    DWORD PTR [rbp-0x4],0x0", None),
+    ("att", "testb  $0x1,(%rax)", None),
+    ("att", "btl    $0x3,(%rax)", None),
+    ("att", "lea    -0x10(%rbp),%rax", None),
+    ("att", "nopw   0x0(%rax,%rax,1)", None),
+    # ... but their writing look-alikes do write
+    ("att", "lock cmpxchg %ecx,(%rdx)", ("0 + (long)$rdx", 4)),
+    ("intel", "lock cmpxchg DWORD PTR [rdx],ecx", ("(long)$rdx", 4)),
+    ("att", "lock cmpxchg8b (%rdi)", ("0 + (long)$rdi", 8)),
+    ("intel", "lock cmpxchg16b XMMWORD PTR [rdi]", ("(long)$rdi", 16)),
+    ("att", "btsl   $0x3,(%rax)", ("0 + (long)$rax", 4)),
+    ("att", "lock cmpxchg16b (%rdi)", ("0 + (long)$rdi", 16)),
+    ("intel", "btr    DWORD PTR [rax],0x3", ("(long)$rax", 4)),
+    ("att", "btc    %esi,0x10(%rax)", ("0x10 + (long)$rax", 4)),
+    # Plain stores
+    ("att", "movl   $0x1,-0x4(%rbp)", ("-0x4 + (long)$rbp", 4)),
+    ("intel", "mov    DWORD PTR [rbp-0x4],0x1", ("(long)$rbp-0x4", 4)),
+    ("att", "mov    %eax,0x601040", ("0x601040", 4)),
+    ("att", "push   %rbp", ("(long)$sp - 8", 8)),
+    ("att", "mov    %rsp,%rbp", None),
+])
+def test_write_target(flavor, text, expected):
+    assert write_target(insn(text), flavor, 8) == expected
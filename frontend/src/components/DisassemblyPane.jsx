@@ -9,6 +9,7 @@ import {
 } from '../store/debuggerSlice';
 import { parseInstruction } from '../utils/asmFormatter';
 import { offsetAddress, normalizeAddress } from '../utils/addressUtils';
+import { useAPI } from '../hooks/useAPI';
 import DisassemblyRow from './DisassemblyRow';
 
 const PaneContainer = styled.div`
@@ -75,6 +76,7 @@ const ResizeTooltip = styled.div`
 
 const DisassemblyPane = ({ onContextMenu }) => {
   const dispatch = useDispatch();
+  const { apiCall } = useAPI();
   const instructions = useSelector(state => state.debug.disassembly);
   const selectedAddresses = useSelector(state => state.debug.selectedAddresses);
   const lastSelected = useSelector(state => state.debug.lastSelectedAddress);
@@ -140,10 +142,15 @@ const DisassemblyPane = ({ onContextMenu }) => {
     if (instructions.length === 0) return;
 
     if (el.scrollTop < 10) {
-      // Scrolled to top, try to fetch previous
+      // Scrolled to top: ask the backend for the exact instruction boundary ~16 instructions back
       isFetchingRef.current = true;
-      const prev = offsetAddress(instructions[0].address, -64); // ~16 instructions
-      dispatch(setViewStartAddress(prev));
+      const first = instructions[0].address;
+      apiCall('/memory/disassemble', { start: first, count: 0, before: 16 }, 'POST', false).then(res => {
+        const prev = (res && res.instructions && res.instructions.length > 0)
+          ? res.instructions[0].address
+          : offsetAddress(first, -64);
+        dispatch(setViewStartAddress(prev));
+      });
     } else if (el.scrollHeight - el.scrollTop - el.clientHeight < 10) {
       // Scrolled to bottom
       isFetchingRef.current = true;
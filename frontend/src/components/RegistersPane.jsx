@@ -18,7 +18,7 @@ const RegName = styled.div`
 `;
 
 const RegVal = styled.div`
-  color: #000000;
+  color: ${props => props.$changed ? '#ff0000' : '#000000'};
 `;
 
 const ScrollableContainer = styled.div`
@@ -36,7 +36,7 @@ const RegistersPane = () => {
       {regs.map((r) => (
         <RegRow key={r.number}>
           <RegName>{r.name || REG_NAMES[r.number] || `r${r.number}`}</RegName>
-          <RegVal>{r.value}</RegVal>
+          <RegVal $changed={r.changed}>{r.value}</RegVal>
         </RegRow>
       ))}
     </ScrollableContainer>
@@ -2,6 +2,7 @@
 import React, { useRef, useState, useEffect } from 'react';
 import styled from 'styled-components';
 import { useSelector } from 'react-redux';
+import { useServerLogs } from '../hooks/useServerLogs';
 
 
 
@@ -82,6 +83,7 @@ const LogRow = ({ log, index, isSelected, onClick }) => {
 
 const SystemLogWindow = ({ onClose }) => {
   const logs = useSelector(state => state.debug.systemLogs);
+  const { loadOlder } = useServerLogs();
   const [selectedIndices, setSelectedIndices] = useState(new Set());
   const lastSelectedIndex = useRef(null);
   const containerRef = useRef(null);
@@ -116,6 +118,16 @@ const SystemLogWindow = ({ onClose }) => {
     setSelectedIndices(newSelection);
   };
 
+  const handleScroll = async (e) => {
+    // Scrolled to the top: pull the previous page from the server buffer
+    if (e.currentTarget.scrollTop > 0) return;
+    const container = containerRef.current;
+    const height = container.scrollHeight;
+    if (await loadOlder()) {
+      container.scrollTop = container.scrollHeight - height;
+    }
+  };
+
   const handleKeyDown = (e) => {
     if (e.key === 'Escape') {
       e.preventDefault();
@@ -141,7 +153,7 @@ const SystemLogWindow = ({ onClose }) => {
 
   return (
     <WinContainer tabIndex="0" onKeyDown={handleKeyDown}>
-      <TableContainer ref={containerRef}>
+      <TableContainer ref={containerRef} onScroll={handleScroll}>
         <Table>
           <thead style={{ height: '20px' }}>
             <tr>
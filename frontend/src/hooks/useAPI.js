@@ -1,8 +1,9 @@
 
 import { useDispatch } from 'react-redux';
 import { addSystemLog } from '../store/debuggerSlice';
+import { SESSION_ID } from '../utils/session';
 
-const API_URL = `/api`; 
+const API_URL = SESSION_ID ? `/api/sessions/${encodeURIComponent(SESSION_ID)}` : `/api`;
 
 export const useAPI = () => {
     const dispatch = useDispatch();
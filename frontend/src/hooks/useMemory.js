@@ -1,6 +1,7 @@
-import { useState, useEffect } from 'react';
-import { useSelector } from 'react-redux';
+import { useState, useEffect, useRef } from 'react';
+import { useSelector, useDispatch } from 'react-redux';
 import { offsetAddress } from '../utils/addressUtils';
+import { updateDisassembly, setViewportAnnotations } from '../store/debuggerSlice';
 import { useSessionManager } from './useSessionManager';
 import { usePatcher } from './usePatcher';
 import { useClipboardLogic } from './useClipboardLogic';
@@ -21,10 +22,30 @@ export const useMemory = (apiCall, setActiveModal, getCurrentIP) => {
     } = useSessionManager(apiCall);
 
     // Helper for Disassembly
+    const dispatch = useDispatch();
+    const disasmRequestId = useRef(0);
     const refreshDisassembly = (addr) => {
         const target = addr || getCurrentIP();
         if (target && target !== '0x0' && target !== '0') {
-            apiCall('/memory/disassemble', { start: target, count: 100 }, 'POST', false);
+            const requestId = ++disasmRequestId.current;
+            apiCall('/memory/disassemble', { start: target, count: 100 }, 'POST', false).then(res => {
+                // Ignore replies overtaken by a newer request
+                if (!res || !res.instructions || requestId !== disasmRequestId.current) return;
+                dispatch(updateDisassembly(res.instructions));
+
+                // Comments and patches are fetched for the visible range only
+                const insns = res.instructions;
+                if (insns.length === 0) return;
+                const last = insns[insns.length - 1];
+                const lastSize = last.opcodes ? last.opcodes.split(' ').filter(x => x).length : 1;
+                const start = insns[0].address;
+                const end = offsetAddress(last.address, lastSize);
+                apiCall(`/session/annotations?start=${start}&end=${end}`, null, 'GET', false).then(ann => {
+                    if (ann && !ann.error && requestId === disasmRequestId.current) {
+                        dispatch(setViewportAnnotations(ann));
+                    }
+                });
+            });
         }
     };
 
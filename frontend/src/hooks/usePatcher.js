@@ -47,11 +47,27 @@ export const usePatcher = (apiCall, setActiveModal, refreshDisassembly) => {
 
         dispatch(addSystemLog(`Action: Revert ${bytesToRevert.length} bytes`));
 
-        for (let addr of bytesToRevert) {
-            const res = await apiCall('/memory/revert', { address: addr });
-            if (res && res.status === 'reverted') {
-                dispatch(removePatch(addr));
+        // Contiguous bytes become one range, the backend reverts them all in one batch
+        const sorted = bytesToRevert.map(a => BigInt(a)).sort((a, b) => (a < b ? -1 : a > b ? 1 : 0));
+        const ranges = [];
+        sorted.forEach(addr => {
+            const last = ranges[ranges.length - 1];
+            if (last && last.start + BigInt(last.length) === addr) {
+                last.length++;
+            } else {
+                ranges.push({ start: addr, length: 1 });
             }
+        });
+
+        const res = await apiCall('/memory/revert', {
+            ranges: ranges.map(r => ({ address: '0x' + r.start.toString(16), length: r.length }))
+        });
+        if (res && res.ranges) {
+            const reverted = [];
+            res.ranges.forEach(r => {
+                for (let i = 0; i < r.length; i++) reverted.push(offsetAddress(r.address, i));
+            });
+            dispatch(removePatch(reverted));
         }
         refreshDisassembly(viewStartAddress);
     };
@@ -0,0 +1,40 @@
+import { useEffect, useRef } from 'react';
+import { useDispatch, useSelector } from 'react-redux';
+import { useAPI } from './useAPI';
+import { addServerLogs } from '../store/debuggerSlice';
+
+const PAGE_SIZE = 500;
+
+// Pulls the server-side log buffer (/logs) while the System Log window is open.
+// The socket only announces the newest seq (log_tail); nothing is pushed line by line.
+export const useServerLogs = () => {
+    const dispatch = useDispatch();
+    const { apiCall } = useAPI();
+    const tail = useSelector(state => state.debug.serverLogTail);
+    const pulled = useSelector(state => state.debug.serverLogSeq);
+    const first = useSelector(state => state.debug.serverLogFirst);
+    const busy = useRef(false);
+
+    useEffect(() => {
+        if (busy.current || (pulled && pulled >= tail)) return;
+        busy.current = true;
+        // First open: newest page only, older ones on demand
+        const query = pulled ? `?after=${pulled}&limit=${PAGE_SIZE}` : `?limit=${PAGE_SIZE}`;
+        apiCall(`/logs${query}`, null, 'GET', false).then(page => {
+            busy.current = false;
+            if (page && page.entries) dispatch(addServerLogs({ entries: page.entries, older: false }));
+        });
+    }, [tail, pulled]);
+
+    const loadOlder = async () => {
+        if (busy.current || first === null) return false;
+        busy.current = true;
+        const page = await apiCall(`/logs?before=${first}&limit=${PAGE_SIZE}`, null, 'GET', false);
+        busy.current = false;
+        if (!page || !page.entries || !page.entries.length) return false;
+        dispatch(addServerLogs({ entries: page.entries, older: true }));
+        return true;
+    };
+
+    return { loadOlder };
+};
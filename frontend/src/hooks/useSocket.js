@@ -2,13 +2,17 @@
 import { useEffect, useRef } from 'react';
 import { useDispatch } from 'react-redux';
 import {
-  setStatus, setThreadId, updateRegisters,
-  setRegisterNames, updateDisassembly, addSystemLog, addDebugLog,
-  setProgress
+  setStatus, setThreadId, updateRegisters, applyRegisterDelta,
+  applyStopSnapshot, setRegisterNames, updateDisassembly, addSystemLog, addDebugLog,
+  setServerLogTail, setProgress
 } from '../store/debuggerSlice';
+import { decodeFrame } from '../utils/wireProtocol';
+import { SESSION_ID } from '../utils/session';
 
 const WS_PROTOCOL = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-const WS_URL = `${WS_PROTOCOL}//${window.location.host}/ws`;
+// Binary frames for registers and stop snapshots, JSON for the rest (see utils/wireProtocol.js)
+const WS_URL = `${WS_PROTOCOL}//${window.location.host}/ws?binary=1`
+  + (SESSION_ID ? `&session=${encodeURIComponent(SESSION_ID)}` : '');
 
 export const useSocket = () => {
   const dispatch = useDispatch();
@@ -16,20 +20,28 @@ export const useSocket = () => {
 
   useEffect(() => {
     ws.current = new WebSocket(WS_URL);
+    ws.current.binaryType = 'arraybuffer';
     ws.current.onmessage = (event) => {
       try {
-        const msg = JSON.parse(event.data);
+        const msg = typeof event.data === 'string' ? JSON.parse(event.data) : decodeFrame(event.data);
+        if (msg.type === 'protocol') console.log("WS protocol:", msg.payload);
         // console.log("WS RX:", msg.type, msg.payload); // Debug Log
         if (msg.type === 'status') dispatch(setStatus(msg.payload));
         if (msg.type === 'thread-update') dispatch(setThreadId(msg.payload));
         if (msg.type === 'registers') dispatch(updateRegisters(msg.payload));
+        if (msg.type === 'registers_delta') dispatch(applyRegisterDelta(msg.payload));
+        if (msg.type === 'stop_snapshot') dispatch(applyStopSnapshot(msg.payload));
         if (msg.type === 'register_names') {
           console.log("WS RX: register_names received", msg.payload);
           dispatch(setRegisterNames(msg.payload));
         }
         if (msg.type === 'disassembly') dispatch(updateDisassembly(msg.payload));
         if (msg.type === 'progress') dispatch(setProgress(msg.payload));
-        if (msg.type === 'system_log') dispatch(addSystemLog(`[LOG] ${msg.payload}`));
+        if (msg.type === 'step_result') {
+          const r = msg.payload;
+          dispatch(addSystemLog(`[STEP] ${r.reason} after ${r.steps} steps at ${r.pc} (${r.elapsedMs} ms)`));
+        }
+        if (msg.type === 'log_tail') dispatch(setServerLogTail(msg.payload));
         if (msg.type === 'target_log') dispatch(addDebugLog(msg.payload));
       } catch (e) {
         console.error("WS Parse error", e);
@@ -8,9 +8,14 @@ const initialState = {
     registers: [],
     registerNames: [], // Array of names, index = number
     disassembly: [],
+    stack: null, // { address, bytes } window at $sp from the last stop
+    frame: null,
 
     // Array of objects { id, timestamp, message, type }
     systemLogs: [],
+    serverLogTail: 0, // newest seq in the server log buffer (log_tail)
+    serverLogSeq: 0,  // newest seq pulled from /logs
+    serverLogFirst: null, // oldest seq pulled, for scrolling back
     debugLogs: [], // Target application output
 
     // Metadata: PID, Arch, ImageBase
@@ -63,8 +68,7 @@ const initialState = {
     }
 };
 
-const formatTime = () => {
-    const now = new Date();
+const formatTime = (now = new Date()) => {
     const h = now.getHours().toString().padStart(2, '0');
     const m = now.getMinutes().toString().padStart(2, '0');
     const s = now.getSeconds().toString().padStart(2, '0');
@@ -81,6 +85,8 @@ export const debuggerSlice = createSlice({
             state.currentThreadId = null;
             state.registers = [];
             state.disassembly = [];
+            state.stack = null;
+            state.frame = null;
             state.viewStartAddress = null;
             state.historyPast = [];
             state.historyFuture = [];
@@ -101,6 +107,36 @@ export const debuggerSlice = createSlice({
                 name: state.registerNames[parseInt(reg.number)] || null
             }));
         },
+        applyRegisterDelta: (state, action) => {
+            // Only the registers that changed since the last stop
+            const changes = {};
+            action.payload.registers.forEach(reg => { changes[reg.number] = reg.value; });
+            state.registers.forEach(reg => {
+                reg.changed = reg.number in changes;
+                if (reg.changed) reg.value = changes[reg.number];
+            });
+        },
+        applyStopSnapshot: (state, action) => {
+            // Everything read on one stop: thread, frame, registers, stack, code at the PC
+            const snap = action.payload;
+            state.currentThreadId = snap.thread;
+            state.frame = snap.frame;
+            if (snap.registers) {
+                debuggerSlice.caseReducers.updateRegisters(state, { payload: snap.registers });
+            } else {
+                debuggerSlice.caseReducers.applyRegisterDelta(state, { payload: { registers: snap.registersDelta || [] } });
+            }
+            if (snap.stack) state.stack = snap.stack;
+
+            const pc = snap.frame?.addr ? normalizeAddress(snap.frame.addr) : null;
+            if (pc && snap.disassembly?.length && !state.disassembly.some(i => i.address === pc)) {
+                state.disassembly = snap.disassembly.map(item => ({
+                    ...item,
+                    address: normalizeAddress(item.address)
+                }));
+                state.viewStartAddress = pc;
+            }
+        },
         setRegisterNames: (state, action) => {
             state.registerNames = action.payload;
             // Backfill names if registers already exist (race condition fix)
@@ -149,6 +185,30 @@ export const debuggerSlice = createSlice({
             };
             state.systemLogs.push(entry);
         },
+        setServerLogTail: (state, action) => {
+            state.serverLogTail = action.payload;
+        },
+        addServerLogs: (state, action) => {
+            // Pages of /logs: appended when following the tail, prepended when scrolling back
+            const { entries, older } = action.payload;
+            if (!entries.length) return;
+            const rows = entries.map(e => ({
+                id: `srv-${e.seq}`,
+                timestamp: formatTime(new Date(e.time * 1000)),
+                message: `[LOG] ${e.message}`,
+                type: e.level === 'error' || e.level === 'warning' ? e.level : 'info'
+            }));
+            if (older) {
+                state.systemLogs = rows.concat(state.systemLogs);
+            } else {
+                state.systemLogs.push(...rows);
+                state.serverLogSeq = Math.max(state.serverLogSeq, entries[entries.length - 1].seq);
+                if (state.systemLogs.length > 2000) state.systemLogs.splice(0, state.systemLogs.length - 2000);
+            }
+            if (state.serverLogFirst === null || entries[0].seq < state.serverLogFirst) {
+                state.serverLogFirst = entries[0].seq;
+            }
+        },
         addDebugLog: (state, action) => {
             if (state.debugLogs.length > 5000) state.debugLogs.shift();
             state.debugLogs.push({
@@ -234,8 +294,9 @@ export const debuggerSlice = createSlice({
             }
         },
         removePatch: (state, action) => {
-            const addr = normalizeAddress(action.payload);
-            state.modifiedAddresses = state.modifiedAddresses.filter(a => a !== addr);
+            const payload = Array.isArray(action.payload) ? action.payload : [action.payload];
+            const removed = new Set(payload.map(normalizeAddress));
+            state.modifiedAddresses = state.modifiedAddresses.filter(a => !removed.has(a));
         },
         setPatches: (state, action) => {
             state.modifiedAddresses = (action.payload || []).map(normalizeAddress);
@@ -259,6 +320,29 @@ export const debuggerSlice = createSlice({
             }
             state.userComments = normalized;
         },
+        setViewportAnnotations: (state, action) => {
+            // Replaces comments/patches inside [start, end) with the server's view of that range
+            const { start, end, comments, patches } = action.payload;
+            const lo = BigInt(start);
+            const hi = BigInt(end);
+            const inView = (addr) => {
+                try {
+                    const a = BigInt(addr);
+                    return a >= lo && a < hi;
+                } catch (e) {
+                    return false;
+                }
+            };
+            Object.keys(state.userComments).forEach(k => {
+                if (inView(k)) delete state.userComments[k];
+            });
+            Object.keys(comments || {}).forEach(k => {
+                state.userComments[normalizeAddress(k)] = comments[k];
+            });
+            state.modifiedAddresses = state.modifiedAddresses
+                .filter(a => !inView(a))
+                .concat((patches || []).map(normalizeAddress));
+        },
         updateSettings: (state, action) => {
             state.settings = { ...state.settings, ...action.payload };
         },
@@ -267,10 +351,10 @@ export const debuggerSlice = createSlice({
 
 export const {
     resetDebuggerState,
-    setStatus, setThreadId, updateRegisters, setRegisterNames, updateDisassembly,
-    addSystemLog, addDebugLog, clearSystemLogs, setProgress, setMetadata,
+    setStatus, setThreadId, updateRegisters, applyRegisterDelta, applyStopSnapshot, setRegisterNames, updateDisassembly,
+    addSystemLog, addDebugLog, setServerLogTail, addServerLogs, clearSystemLogs, setProgress, setMetadata,
     selectAddress, toggleAddressSelection, selectAddressRange,
-    setUserComment, setComments, updateSettings,
+    setUserComment, setComments, setViewportAnnotations, updateSettings,
     setViewStartAddress, pushHistory, navigateBack, navigateForward, clearHistory,
     markAddressModified, removePatch, setPatches
 } = debuggerSlice.actions;
@@ -0,0 +1,4 @@
+// Debugging session of this tab: ?session=<id> in the page URL, the server's default one otherwise.
+// Each session has its own GDB, events and DB on the backend (gdb/sessions.py); it has to be
+// created first (POST /sessions {id}), unknown IDs get a 404.
+export const SESSION_ID = new URLSearchParams(window.location.search).get('session');
@@ -0,0 +1,90 @@
+// Decoder of the binary WebSocket frames (backend/app/utils/wire.py).
+// Every frame is turned back into the same { type, payload } a JSON client gets,
+// except memory blocks, which stay a Uint8Array view of the frame.
+
+const MEMORY = 1;
+const REGISTERS = 2;
+const SNAPSHOT = 3;
+
+const MEMORY_HEADER = 24;
+const REGISTERS_HEADER = 12;
+const SNAPSHOT_HEADER = 8;
+
+const FLAG_DELTA = 1;
+
+const textDecoder = new TextDecoder();
+const pad8 = (n) => (n + 7) & ~7;
+const hex64 = (big) => `0x${big.toString(16)}`;
+
+const decodeMemory = (buffer, offset) => {
+    const view = new DataView(buffer, offset);
+    const length = view.getUint32(16, true);
+    return {
+        id: view.getUint32(4, true),
+        address: hex64(view.getBigUint64(8, true)),
+        length,
+        epoch: view.getUint32(20, true),
+        bytes: new Uint8Array(buffer, offset + MEMORY_HEADER, length)
+    };
+};
+
+const decodeRegisters = (buffer, offset) => {
+    const view = new DataView(buffer, offset);
+    const flags = view.getUint8(1);
+    const count = view.getUint16(2, true);
+    const thread = view.getUint32(4, true);
+    const extraLength = view.getUint32(8, true);
+
+    const numbersAt = REGISTERS_HEADER;
+    const valuesAt = numbersAt + pad8(count * 2);
+    const registers = [];
+    for (let i = 0; i < count; i++) {
+        registers.push({
+            number: String(view.getUint16(numbersAt + i * 2, true)),
+            value: hex64(view.getBigUint64(valuesAt + i * 8, true))
+        });
+    }
+    if (extraLength) {
+        const extraAt = offset + valuesAt + count * 8;
+        registers.push(...JSON.parse(textDecoder.decode(new Uint8Array(buffer, extraAt, extraLength))));
+    }
+    return { delta: (flags & FLAG_DELTA) !== 0, thread: thread ? String(thread) : null, registers };
+};
+
+export const decodeFrame = (buffer) => {
+    const kind = new DataView(buffer).getUint8(0);
+
+    if (kind === MEMORY) {
+        return { type: 'memory', payload: decodeMemory(buffer, 0) };
+    }
+
+    if (kind === REGISTERS) {
+        const regs = decodeRegisters(buffer, 0);
+        return regs.delta
+            ? { type: 'registers_delta', payload: { thread: regs.thread, registers: regs.registers } }
+            : { type: 'registers', payload: regs.registers };
+    }
+
+    if (kind === SNAPSHOT) {
+        const view = new DataView(buffer);
+        const jsonLength = view.getUint32(4, true);
+        const payload = JSON.parse(textDecoder.decode(new Uint8Array(buffer, SNAPSHOT_HEADER, jsonLength)));
+
+        let pos = SNAPSHOT_HEADER + jsonLength;
+        const regsLength = view.getUint32(pos, true);
+        pos += 4;
+        if (regsLength) {
+            const regs = decodeRegisters(buffer, pos);
+            payload[regs.delta ? 'registersDelta' : 'registers'] = regs.registers;
+        }
+        pos += pad8(regsLength);
+        if (pos < buffer.byteLength) {
+            const stack = decodeMemory(buffer, pos);
+            // Goes into the store: plain array (256 bytes)
+            payload.stack = { address: stack.address, bytes: Array.from(stack.bytes) };
+        }
+        return { type: 'stop_snapshot', payload };
+    }
+
+    throw new Error(`Unknown frame kind ${kind}`);
+};